@@ -16,27 +16,8 @@ ERROR="${RED}[ERROR]${NC}"
 WARN="${YELLOW}[WARN]${NC}"
 SUCCESS="${GREEN}[SUCCESS]${NC}"
 
-# Single instance (prevent multiple runs of launcher)
-LOCK_DIR="$SCRIPT_DIR/.run.lock"
-if mkdir "$LOCK_DIR" 2>/dev/null; then
-    trap 'rm -rf "$LOCK_DIR"' EXIT
-else
-    echo -e "${WARN} Another instance of the launcher is already running."
-    exit 1
-fi
-
-# Also prevent launching if the Python app is already running (parity with Windows batch)
-APP_LOCK="${TMPDIR:-/tmp}/convert_img_pdf.lock"
-if [ -f "$APP_LOCK" ]; then
-    RUN_PID="$(cat "$APP_LOCK" 2>/dev/null || true)"
-    if [[ "$RUN_PID" =~ ^[0-9]+$ ]] && kill -0 "$RUN_PID" 2>/dev/null; then
-        echo -e "${WARN} Application is already running (PID $RUN_PID). Close it first."
-        exit 0
-    else
-        # Stale lock file; remove it
-        rm -f "$APP_LOCK" 2>/dev/null || true
-    fi
-fi
+# No single-instance lock: several instances (and CLI batch jobs) may run at
+# the same time and share the CPU through init.py's local job scheduler
 
 # Venv paths
 VENV_ROOT=".venv"
@@ -102,43 +83,63 @@ fi
 # Activate virtual environment
 source "$VENV_ACTIVATE"
 
-# Ensure dependencies are up to date each run (in case requirements changed)
-echo -e "${INFO} Ensuring Python dependencies..."
-pip install --upgrade pip >/dev/null 2>&1
-pip install -r requirements.txt >/dev/null 2>&1 || pip install -r requirements.txt
-
-# System-level tkinter check and installation (required for venv to inherit it)
-echo -e "${INFO} ${YELLOW}Checking for system tkinter...${NC}"
-if ! python3 -c "import tkinter" 2>/dev/null; then
-    echo -e "${YELLOW}System tkinter not found. Attempting to install...${NC}"
-    if command -v apt-get &> /dev/null; then
-        echo -e "${INFO} ${GREEN}Installing tkinter via apt (Ubuntu/Debian)...${NC}"
-        sudo apt-get update && sudo apt-get install -y python3-tk
-    elif command -v dnf &> /dev/null; then
-        echo -e "${INFO} ${GREEN}Installing tkinter via dnf (Fedora)...${NC}"
-        sudo dnf install -y python3-tkinter
-    elif command -v yum &> /dev/null; then
-        echo -e "${INFO} ${GREEN}Installing tkinter via yum (CentOS/RHEL)...${NC}"
-        sudo yum install -y python3-tkinter
-    elif command -v brew &> /dev/null; then
-        echo -e "${INFO} ${GREEN}tkinter should come with Python on macOS...${NC}"
+# Dependency check is cached: pip and the tkinter check only run when
+# requirements.txt or the venv's Python changed since the last good setup
+DEPS_STAMP="$VENV_ROOT/.deps_hash"
+
+hash_stdin() {
+    if command -v sha256sum &> /dev/null; then
+        sha256sum | cut -d' ' -f1
     else
-        echo -e "${RED}ERROR: Could not detect package manager${NC}"
-        echo "Please install tkinter manually:"
-        echo "  Ubuntu/Debian: sudo apt-get install python3-tk"
-        echo "  Fedora: sudo dnf install python3-tkinter"
-        echo "  CentOS: sudo yum install python3-tkinter"
-        exit 1
+        shasum -a 256 | cut -d' ' -f1
     fi
-    
-    # Verify installation
+}
+
+DEPS_HASH="$({ cat requirements.txt; "$VENV_PY" --version 2>&1; } | hash_stdin)"
+
+if [ -f "$DEPS_STAMP" ] && [ "$(cat "$DEPS_STAMP" 2>/dev/null)" = "$DEPS_HASH" ]; then
+    echo -e "${INFO} Dependencies up to date (cached)"
+else
+    # Ensure dependencies are up to date (requirements changed or first run)
+    echo -e "${INFO} Ensuring Python dependencies..."
+    pip install --upgrade pip >/dev/null 2>&1
+    pip install -r requirements.txt >/dev/null 2>&1 || pip install -r requirements.txt || exit 1
+
+    # System-level tkinter check and installation (required for venv to inherit it)
+    echo -e "${INFO} ${YELLOW}Checking for system tkinter...${NC}"
     if ! python3 -c "import tkinter" 2>/dev/null; then
-        echo -e " ${ERROR} Failed to install tkinter${NC}"
-        exit 1
+        echo -e "${YELLOW}System tkinter not found. Attempting to install...${NC}"
+        if command -v apt-get &> /dev/null; then
+            echo -e "${INFO} ${GREEN}Installing tkinter via apt (Ubuntu/Debian)...${NC}"
+            sudo apt-get update && sudo apt-get install -y python3-tk
+        elif command -v dnf &> /dev/null; then
+            echo -e "${INFO} ${GREEN}Installing tkinter via dnf (Fedora)...${NC}"
+            sudo dnf install -y python3-tkinter
+        elif command -v yum &> /dev/null; then
+            echo -e "${INFO} ${GREEN}Installing tkinter via yum (CentOS/RHEL)...${NC}"
+            sudo yum install -y python3-tkinter
+        elif command -v brew &> /dev/null; then
+            echo -e "${INFO} ${GREEN}tkinter should come with Python on macOS...${NC}"
+        else
+            echo -e "${RED}ERROR: Could not detect package manager${NC}"
+            echo "Please install tkinter manually:"
+            echo "  Ubuntu/Debian: sudo apt-get install python3-tk"
+            echo "  Fedora: sudo dnf install python3-tkinter"
+            echo "  CentOS: sudo yum install python3-tkinter"
+            exit 1
+        fi
+
+        # Verify installation
+        if ! python3 -c "import tkinter" 2>/dev/null; then
+            echo -e " ${ERROR} Failed to install tkinter${NC}"
+            exit 1
+        fi
+        echo -e "${SUCCESS}tkinter installed successfully!${NC}"
+    else
+        echo -e "${INFO} ${GREEN}System tkinter is available${NC}"
     fi
-    echo -e "${SUCCESS}tkinter installed successfully!${NC}"
-else
-    echo -e "${INFO} ${GREEN}System tkinter is available${NC}"
+
+    echo "$DEPS_HASH" > "$DEPS_STAMP"
 fi
 
 echo ""
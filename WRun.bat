@@ -26,7 +26,7 @@ set "ERROR=%RED%[ERROR]%NC%"
 set "VENV_ROOT=.venv"
 set "VENV_SCRIPTS=%VENV_ROOT%\Scripts"
 set "VENV_PY=%VENV_SCRIPTS%\python.exe"
-set "DEPS_MARKER=%VENV_ROOT%\.deps_installed"
+set "DEPS_STAMP=%VENV_ROOT%\.deps_hash"
 
 echo =======================================
 echo %GREEN%  IMAGE TO PDF CONVERTER - GUI MODE%NC%
@@ -35,26 +35,8 @@ echo.
 
 echo %INFO% Initializing environment...
 
-:: Prevent launching if the app is already running (checked via Python lock file)
-@REM set "APP_LOCK=%TEMP%\convert_img_pdf.lock"
-@REM if exist "%APP_LOCK%" (
-@REM     set "RUN_PID="
-@REM     set /p RUN_PID=<"%APP_LOCK%"
-@REM     set "TASKLINE="
-@REM     if defined RUN_PID (
-@REM         for /f "usebackq tokens=* delims=" %%L in (`tasklist /FI "PID eq %RUN_PID%" /FO CSV /NH 2^>nul`) do set "TASKLINE=%%~L"
-@REM     )
-@REM     if defined TASKLINE (
-@REM         rem If TASKLINE does not start with INFO:, a process exists with this PID
-@REM         set "_HDR=!TASKLINE:~0,5!"
-@REM         if /I not "!_HDR!"=="INFO:" (
-@REM             echo %WARN% Application is already running (PID %RUN_PID%). Close it first.
-@REM             exit /b 0
-@REM         )
-@REM     )
-@REM     rem Stale lock; remove
-@REM     del "%APP_LOCK%" >nul 2>nul
-@REM )
+:: No single-instance lock: several instances may run at the same time and
+:: share the CPU through init.py's local job scheduler
 
 :: Detect Python 3.8+
 set "PY_CMD="
@@ -93,15 +75,21 @@ if not exist "%VENV_PY%" (
     call :create_venv || exit /b 1
 )
 
-if not exist "%DEPS_MARKER%" (
-    echo %WARN% Dependencies not installed
+:: Dependency install is cached: pip only runs when the SHA-256 of
+:: requirements.txt differs from the one stored after the last good install
+set "REQ_HASH="
+for /f "usebackq delims=" %%H in (`certutil -hashfile "requirements.txt" SHA256 ^| findstr /v ":"`) do (
+    if not defined REQ_HASH set "REQ_HASH=%%H"
+)
+if defined REQ_HASH (set "REQ_HASH=%REQ_HASH: =%") else (set "REQ_HASH=nohash")
+set "OLD_HASH="
+if exist "%DEPS_STAMP%" set /p OLD_HASH=<"%DEPS_STAMP%"
+
+if not "%REQ_HASH%"=="%OLD_HASH%" (
+    echo %WARN% Dependencies not installed or requirements.txt changed
     call :install_deps || exit /b 1
 ) else (
-    rem Optionally ensure updated requirements are present without forcing every run
-    for /f "usebackq tokens=* delims=" %%R in ("requirements.txt") do (
-        rem Touch marker if requirements file is newer/changed is complex; users can delete marker to force reinstall
-        rem Keeping as-is for performance.
-    )
+    echo %INFO% Dependencies up to date ^(cached^)
 )
 
 :: Run application (USE VENV PYTHON!!)
@@ -158,7 +146,7 @@ echo %INFO% Installing pip...
 echo %INFO% Installing dependencies from requirements.txt...
 "%VENV_PY%" -m pip install -r requirements.txt || exit /b 1
 
-echo. > "%DEPS_MARKER%"
+>"%DEPS_STAMP%" echo %REQ_HASH%
 echo %INFO% Dependencies installed successfully
 
 exit /b 0
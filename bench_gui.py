@@ -0,0 +1,287 @@
+"""Benchmark responsivitas GUI CONVERT_IMG_PDF saat konversi berjalan
+
+    xvfb-run python bench_gui.py           # Tk asli
+    python bench_gui.py [FOLDER]           # tanpa display: event loop stub
+
+Exit 1 jika salah satu batas di bawah dilewati.
+"""
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from PIL import Image
+
+import init
+
+# ---------------------------------------------------------------------------
+# The conversion runs in a worker thread; the Tk main loop must keep
+# handling events while it does. run_gui_benchmark converts a folder (or a
+# generated one of BENCH_IMAGES small images, several seconds of work)
+# through the real ImageToPDFConverter and measures:
+#   latency     - how late a heartbeat scheduled every BENCH_HEARTBEAT_MS
+#                 with root.after actually fires (main-loop stalls)
+#   queue depth - UI updates waiting in the worker -> main loop queue per flush
+#   coalescing  - update_status/update_progress/update_eta calls counted at
+#                 the call site, against the widget redraws _flush_ui did
+#                 for them. Drawing every value would give a ratio of 1.
+#   thread      - every Tcl/widget call made outside the main thread
+# Under Xvfb the real Tk is used, with its Tcl interpreter wrapped; without
+# a display a stub event loop with inert widgets stands in, which still
+# measures the scheduling and the update traffic.
+# ---------------------------------------------------------------------------
+
+BENCH_HEARTBEAT_MS = 10
+BENCH_IMAGES = 3000
+BENCH_MAX_P95_LATENCY_MS = 100
+BENCH_MAX_QUEUE_DEPTH_P95 = 1000
+BENCH_MIN_UPDATES_PER_REDRAW = 5
+
+
+class _MainThreadCheck:
+    """Catat nama widget/Tcl call yang dijalankan di luar main thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.offenders = []
+
+    def __call__(self, name):
+        thread = threading.current_thread()
+        if thread is not threading.main_thread():
+            with self._lock:
+                self.offenders.append(f"{name} ({thread.name})")
+
+
+class _ThreadCheckedTcl:
+    """Bungkus interpreter Tcl root: setiap call dicek oleh _MainThreadCheck"""
+
+    def __init__(self, tcl, check):
+        self._tcl = tcl
+        self._check = check
+
+    def __getattr__(self, name):
+        attr = getattr(self._tcl, name)
+        if not callable(attr):
+            return attr
+
+        def checked(*args, **kwargs):
+            self._check(args[0] if name == "call" and args else name)
+            return attr(*args, **kwargs)
+        return checked
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class _StubRoot:
+    """Pengganti tk.Tk tanpa display: event loop after() nyata, sisanya inert"""
+
+    def __init__(self, inert, check):
+        import heapq
+        self._heapq = heapq
+        self._timers = []
+        self._sequence = itertools.count()
+        self._running = False
+        self._inert = inert
+        self._check = check
+
+    def __getattr__(self, name):
+        # title(), geometry(), protocol(), winfo_*() ... do nothing here
+        return getattr(self._inert, name)
+
+    def after(self, ms, func=None, *args):
+        self._check("after")
+        due = time.perf_counter() + ms / 1000
+        self._heapq.heappush(self._timers, (due, next(self._sequence), func, args))
+
+    def mainloop(self):
+        self._running = True
+        while self._running and self._timers:
+            due, _seq, func, args = self._heapq.heappop(self._timers)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            func(*args)
+
+    def quit(self):
+        self._running = False
+
+    def destroy(self):
+        self._timers.clear()
+
+
+def _stub_tk_modules(check):
+    """(tk, ttk, inert) pengganti: widget inert dan variabel Tk yang berfungsi
+
+    Setiap method widget dan variabel melapor ke `check`, jadi pemanggilan
+    dari worker thread ketahuan.
+    """
+    from unittest import mock
+
+    class Widget(mock.MagicMock):
+        # Child mocks (widgets, their methods) are Widgets too
+        def _mock_call(self, *args, **kwargs):
+            check(self._extract_mock_name())
+            return super()._mock_call(*args, **kwargs)
+
+    class Variable:
+        def __init__(self, master=None, value=None, name=None):
+            self._value = value
+
+        def get(self):
+            check("Variable.get")
+            return self._value
+
+        def set(self, value):
+            check("Variable.set")
+            self._value = value
+
+    stub_tk = Widget(name="tk")
+    stub_tk.StringVar = stub_tk.BooleanVar = stub_tk.IntVar = Variable
+    stub_tk.TclError = init.tk.TclError
+    return stub_tk, Widget(name="ttk"), Widget(name="root")
+
+
+class _SilentMessagebox:
+    """messagebox tanpa dialog (dialog modal akan menahan benchmark)"""
+
+    def __init__(self, check):
+        self._check = check
+
+    def __getattr__(self, name):
+        def show(*args, **kwargs):
+            self._check(f"messagebox.{name}")
+            return True
+        return show
+
+
+def _count_updates(app):
+    """Hitung panggilan update_* di app; return fungsi yang memberi jumlahnya"""
+    counter = itertools.count()  # next() is atomic, safe from the worker thread
+    for name in ("update_progress", "update_status", "update_eta"):
+        method = getattr(app, name)
+
+        def counted(*args, _method=method, **kwargs):
+            next(counter)
+            return _method(*args, **kwargs)
+        setattr(app, name, counted)
+    return lambda: next(counter)
+
+
+def _generate_images(folder, count):
+    os.makedirs(folder, exist_ok=True)
+    noise = Image.effect_noise((96, 72), 40).convert("RGB")
+    for index in range(count):
+        noise.rotate(index % 360).save(os.path.join(folder, f"img_{index:05d}.jpg" if index % 2 else f"img_{index:05d}.png"))
+
+
+def run_gui_benchmark(folder=None, images=BENCH_IMAGES):
+    """Jalankan konversi lewat GUI sambil mengukur responsivitas; return (lolos, hasil)"""
+    real_modules = (init.tk, init.ttk, init.messagebox)
+    workdir = tempfile.mkdtemp(prefix="convert_img_pdf_bench_")
+    try:
+        if folder is None:
+            folder = os.path.join(workdir, "input")
+            _generate_images(folder, images)
+        check = _MainThreadCheck()
+        try:
+            root = init.tk.Tk()
+            # Widgets copy root.tk, so every Tcl call made through them is checked
+            root.tk = _ThreadCheckedTcl(root.tk, check)
+            mode = "tk"
+        except init.tk.TclError:
+            init.tk, init.ttk, inert = _stub_tk_modules(check)
+            root = _StubRoot(inert, check)
+            mode = "stub"
+        init.messagebox = _SilentMessagebox(check)
+        app = init.ImageToPDFConverter(root)
+        app.input_folder.set(folder)
+        app.output_folder.set(os.path.join(workdir, "output"))
+        app.run_log = init.RunLog()
+        posted = _count_updates(app)
+        lateness = []
+        started = time.perf_counter()
+
+        def heartbeat(expected):
+            lateness.append(max(0.0, time.perf_counter() - expected))
+            worker = app.worker_thread
+            if app.is_converting or (worker is not None and worker.is_alive()):
+                root.after(BENCH_HEARTBEAT_MS, heartbeat, time.perf_counter() + BENCH_HEARTBEAT_MS / 1000)
+            else:
+                root.quit()
+
+        def start():
+            app.start_conversion()
+            root.after(BENCH_HEARTBEAT_MS, heartbeat, time.perf_counter() + BENCH_HEARTBEAT_MS / 1000)
+
+        root.after(0, start)
+        root.mainloop()
+        seconds = time.perf_counter() - started
+        app._flush_ui()
+        root.destroy()
+    finally:
+        init.tk, init.ttk, init.messagebox = real_modules
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stats = app.ui_stats
+    updates = posted()
+    result = {
+        "mode": mode,
+        "seconds": round(seconds, 3),
+        "latency_ms": {
+            "p50": round(_percentile(lateness, 50) * 1000, 2),
+            "p95": round(_percentile(lateness, 95) * 1000, 2),
+            "p99": round(_percentile(lateness, 99) * 1000, 2),
+            "max": round(max(lateness, default=0) * 1000, 2),
+        },
+        "queue_depth": {
+            "p50": _percentile(stats.depths, 50),
+            "p95": _percentile(stats.depths, 95),
+            "max": max(stats.depths, default=0),
+        },
+        "ui_updates": updates,
+        "redraws": stats.redraws,
+        "updates_per_redraw": round(updates / stats.redraws, 1) if stats.redraws else None,
+        "flushes": stats.flushes,
+        "off_main_thread_calls": len(check.offenders),
+    }
+    failures = []
+    if check.offenders:
+        names = sorted(set(check.offenders))
+        failures.append(f"widget calls outside the main thread: {', '.join(names[:5])}"
+                        + (f" (+{len(names) - 5})" if len(names) > 5 else ""))
+    if result["latency_ms"]["p95"] > BENCH_MAX_P95_LATENCY_MS:
+        failures.append(f"latency p95 {result['latency_ms']['p95']} ms > {BENCH_MAX_P95_LATENCY_MS} ms")
+    if result["queue_depth"]["p95"] > BENCH_MAX_QUEUE_DEPTH_P95:
+        failures.append(f"queue depth p95 {result['queue_depth']['p95']} > {BENCH_MAX_QUEUE_DEPTH_P95}")
+    # The queue also carries _call_in_ui entries, so it holds at least the
+    # counted updates; fewer means updates bypassed the queue
+    if stats.updates < updates:
+        failures.append(f"{updates - stats.updates} updates did not go through the UI queue")
+    if stats.redraws * BENCH_MIN_UPDATES_PER_REDRAW > updates:
+        failures.append(f"{stats.redraws} redraws for {updates} updates: "
+                        f"less than {BENCH_MIN_UPDATES_PER_REDRAW} updates coalesced per redraw")
+    result["failures"] = failures
+    return not failures, result
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) > 1 or (args and not os.path.isdir(args[0])):
+        print("pemakaian: python bench_gui.py [FOLDER]", file=sys.stderr)
+        return 2
+    passed, result = run_gui_benchmark(args[0] if args else None)
+    print(json.dumps(result, indent=1))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,4124 @@
 import os
+import io
+import re
+import zlib
+import sys
+import itertools
+import contextlib
+import json
+import queue
+from collections import deque
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
-import imageio.v2 as imageio
+from PIL import Image
 import shutil
 from datetime import datetime
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
-# Enable HEIC/HEIF support via pillow-heif when available
-try:
-    from pillow_heif import register_heif_opener  # type: ignore
-    register_heif_opener()
-    HEIF_SUPPORTED = True
-except Exception:
-    HEIF_SUPPORTED = False
+# Heavy codecs are imported on first use so the window opens fast:
+# pillow-heif when the first HEIC file shows up, imageio (and numpy) only
+# when HEIC has to be decoded without pillow-heif.
+_heif_supported = None
+_heif_lock = threading.Lock()
+# libheif decode threads per HEIC file, per thread: encoder pool workers get
+# their share of the cores (see encoder_pool), everything else gets all of them
+_decode_share = threading.local()
+
+
+def heif_supported():
+    """Aktifkan HEIC/HEIF via pillow-heif saat pertama dibutuhkan; True jika tersedia"""
+    global _heif_supported
+    with _heif_lock:
+        if _heif_supported is None:
+            try:
+                import pillow_heif  # type: ignore
+                # Portrait-mode depth maps and auxiliary images are never used
+                pillow_heif.options.DEPTH_IMAGES = False
+                pillow_heif.options.AUX_IMAGES = False
+                pillow_heif.register_heif_opener()
+                _heif_supported = True
+            except Exception:
+                _heif_supported = False
+        return _heif_supported
+
+
+def decode_threads():
+    """Jumlah thread decode HEIC untuk thread ini (lihat encoder_pool)"""
+    return getattr(_decode_share, "threads", None) or os.cpu_count() or 1
+
+
+def _set_decode_threads(threads):
+    _decode_share.threads = threads
+
+
+def encoder_pool(workers, **kwargs):
+    """ThreadPoolExecutor untuk decode/encode; tiap worker dapat bagian core yang sama untuk decode HEIC"""
+    share = max(1, (os.cpu_count() or 1) // workers)
+    return ThreadPoolExecutor(max_workers=workers, initializer=_set_decode_threads, initargs=(share,), **kwargs)
+
+
+def read_with_imageio(path):
+    """Fallback HEIC tanpa pillow-heif lewat imageio"""
+    import imageio.v2 as imageio
+    arr = imageio.imread(path)
+    if getattr(arr, "size", 0) == 0:
+        raise ValueError("Gagal membaca file HEIC (kosong). Coba konversi ke JPG/PNG atau pasang pillow-heif.")
+    return Image.fromarray(arr)
+
+
+SUPPORTED_FORMATS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".heic")
+
+
+def is_supported_image(name):
+    return name.lower().endswith(SUPPORTED_FORMATS)
+
+
+def list_folder_images(folder, pdfs=False):
+    """Gambar (dan PDF jika `pdfs`) langsung di dalam folder, urut nama (folder tak terbaca = kosong)"""
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError:
+        return []
+    paths = []
+    for name in names:
+        file_path = os.path.join(folder, name)
+        if (is_supported_image(name) or (pdfs and name.lower().endswith(".pdf"))) and os.path.isfile(file_path):
+            paths.append(file_path)
+    return paths
+
+
+def list_folder_items(folder):
+    """Item folder mode: (jenis, nama, daftar gambar) per file di root dan per subfolder
+
+    Setiap item menjadi 1 PDF. Urut nama supaya hasilnya deterministik.
+    """
+    items = []
+    for item_name in sorted(os.listdir(folder)):
+        item_path = os.path.join(folder, item_name)
+        if os.path.isfile(item_path) and is_supported_image(item_name):
+            items.append(("file", item_name, [item_path]))
+        elif os.path.isdir(item_path):
+            items.append(("folder", item_name, list_folder_images(item_path)))
+    return items
+
+
+def item_pdf_names(items):
+    """Nama PDF tiap item folder mode, dipesan sebelum item dikerjakan paralel
+
+    "foto.jpg" di root dan subfolder "foto" sama-sama ingin "foto.pdf": yang
+    lebih dulu di urutan item mendapatkannya, berikutnya "foto(1).pdf", dst.
+    Dibandingkan tanpa huruf besar/kecil (Windows, macOS). Item tanpa gambar
+    tidak menghasilkan PDF dan mendapat None.
+    """
+    names = []
+    taken = set()
+    for item_type, item_name, image_paths in items:
+        if not image_paths:
+            names.append(None)
+            continue
+        base = os.path.splitext(item_name)[0] if item_type == "file" else item_name
+        name, counter = f"{base}.pdf", 0
+        while name.lower() in taken:
+            counter += 1
+            name = f"{base}({counter}).pdf"
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def load_image(path):
+    """Buka gambar sebagai RGB (HEIC lewat pillow-heif, fallback ke imageio)"""
+    if is_heif(path) and not heif_supported():
+        img = read_with_imageio(path.data if isinstance(path, ArchiveMember) else path)
+        return img if img.mode == "RGB" else img.convert("RGB")
+    return open_image(path).convert("RGB")
+
+
+# ---------------------------------------------------------------------------
+# Archive input
+#
+# A ZIP or TAR can be used in place of a folder. Members are read one at a
+# time straight into memory and never extracted to disk; TARs (also .tar.gz
+# etc.) are read as a stream, so each member is read exactly once in archive
+# order. JPEG members keep their compressed bytes and go through the usual
+# DCT pass-through. In folder mode each top-level directory of the archive
+# becomes one PDF (including its nested folders) and each image at the root
+# becomes its own PDF, like subfolders and root files of a real folder.
+# ---------------------------------------------------------------------------
+
+ARCHIVE_FORMATS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_FORMATS) and os.path.isfile(path)
+
+
+class ArchiveMember:
+    """Satu gambar di dalam arsip; dipakai di tempat path file biasa"""
+
+    def __init__(self, archive, name, data):
+        self.name = name
+        self.path = os.path.join(archive, *name.split("/"))  # for display and logs only
+        self.data = data
+        self.size = len(data)
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"ArchiveMember({self.path!r})"
+
+    def open(self):
+        return io.BytesIO(self.data)
+
+
+# Pillow's decompression-bomb limit is a module global read inside
+# Image.open. It stays at Pillow's default and is only lifted, under this
+# lock, for an open whose size already passed ResourceGovernor.check_pixels
+_pixel_limit_lock = threading.Lock()
+
+
+def open_image(source, size_checked=False):
+    """Image.open untuk path file atau ArchiveMember
+
+    Batas decompression-bomb Pillow tetap berlaku, kecuali `size_checked`
+    (ukuran dari header sudah lolos check_pixels job, lihat open_checked).
+    """
+    with _pixel_limit_lock:
+        default_limit = Image.MAX_IMAGE_PIXELS
+        if size_checked:
+            Image.MAX_IMAGE_PIXELS = None
+        try:
+            if not isinstance(source, ArchiveMember):
+                return Image.open(source)
+            try:
+                return Image.open(source.open())
+            except Image.UnidentifiedImageError:
+                # Name the member instead of the anonymous in-memory buffer
+                raise Image.UnidentifiedImageError(f"cannot identify image file {source.path!r}") from None
+        finally:
+            Image.MAX_IMAGE_PIXELS = default_limit
+
+
+def source_size(source):
+    return source.size if isinstance(source, ArchiveMember) else os.path.getsize(source)
+
+
+def _archive_image_name(name):
+    """Nama member yang dipakai (tanpa './'), atau None untuk non-gambar dan sampah macOS"""
+    name = name.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    name = name.lstrip("/")
+    parts = name.split("/")
+    if parts[0] == "__MACOSX" or parts[-1].startswith("._") or not is_supported_image(parts[-1]):
+        return None
+    return name
+
+
+def iter_archive_images(archive):
+    """Yield ArchiveMember tiap gambar; ZIP urut nama, TAR sesuai urutan stream"""
+    import tarfile
+    import zipfile
+    if archive.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as zf:
+            infos = [(info, _archive_image_name(info.filename)) for info in zf.infolist() if not info.is_dir()]
+            for info, name in sorted((pair for pair in infos if pair[1]), key=lambda pair: pair[1]):
+                yield ArchiveMember(archive, name, zf.read(info))
+        return
+    # "r|*" reads the (possibly compressed) TAR strictly sequentially
+    with tarfile.open(archive, "r|*") as tf:
+        for member in tf:
+            name = _archive_image_name(member.name) if member.isfile() else None
+            if name:
+                yield ArchiveMember(archive, name, tf.extractfile(member).read())
+
+
+def iter_archive_items(archive):
+    """Item folder mode dari arsip: (jenis, nama, iterator member), dibaca berurutan
+
+    Member yang berurutan dengan direktori top-level sama menjadi 1 item.
+    Iterator member harus dihabiskan sebelum item berikutnya diambil.
+    """
+    def item_key(member):
+        top, _, rest = member.name.partition("/")
+        return ("folder", top) if rest else ("file", top)
+
+    for (item_type, item_name), members in itertools.groupby(iter_archive_images(archive), item_key):
+        yield item_type, item_name, members
+
+
+def iter_sources(paths):
+    """Path gambar apa adanya; arsip diganti dengan gambar-gambar di dalamnya"""
+    for path in paths:
+        if is_archive(path):
+            yield from iter_archive_images(path)
+        else:
+            yield path
+
+
+class ConversionCancelled(BaseException):
+    """Konversi dibatalkan user
+
+    Turunan BaseException (seperti asyncio.CancelledError) supaya tidak
+    tertelan oleh `except Exception` yang menangani error per file.
+    """
+
+
+class CancelToken:
+    """Token pembatalan kooperatif; dicek di antara halaman dan band"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise ConversionCancelled()
+
+
+def check_cancel(cancel):
+    if cancel is not None:
+        cancel.check()
+
+
+# ---------------------------------------------------------------------------
+# Input validation (header sniffing)
+#
+# Empty, cut-off and mislabelled files are caught by reading a few KB of
+# each file before a decoder, a RAM budget or a worker slot is spent on it.
+# The format comes from the magic bytes, not the extension, and the header
+# structure is walked just far enough to find the dimensions and to notice
+# a file that ends before the data its own headers point to (an interrupted
+# copy or download). End markers are only looked for in the last TAIL_BYTES:
+# a missing PNG IEND or GIF trailer is tolerated (many encoders omit them
+# and Pillow decodes such files), only data that is provably cut off is
+# rejected. Rejected files go through the usual on_error path and show up in
+# the run log as InvalidImageError.
+# ---------------------------------------------------------------------------
+
+SNIFF_BYTES = 4096
+TAIL_BYTES = 64 * 1024
+HEIF_BRANDS = (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1")
+# SOFn markers (C4, C8 and CC are DHT, JPG and DAC)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class InvalidImageError(ValueError):
+    """File gambar kosong, rusak, terpotong, atau isinya bukan format yang didukung"""
+
+
+def _truncated(what):
+    return InvalidImageError(f"File {what} terpotong (truncated)")
+
+
+def sniff_format(head):
+    """Format dari magic bytes (nama format Pillow), atau None jika tidak dikenali"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head.startswith(b"BM"):
+        return "BMP"
+    if head[:4] in (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"):
+        return "TIFF"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "HEIF"
+    return None
+
+
+def _check_jpeg(f, size, head):
+    """Jalani segmen marker sampai SOS (ukuran dari SOF), lalu cari marker EOI"""
+    pos, dimensions = 2, None
+    while True:
+        f.seek(pos)
+        marker = f.read(4)
+        if len(marker) < 4:
+            raise _truncated("JPEG")
+        if marker[0] != 0xFF:
+            raise InvalidImageError("Struktur marker JPEG rusak")
+        code = marker[1]
+        if code == 0xFF:
+            pos += 1  # fill byte
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            pos += 2
+            continue
+        length = int.from_bytes(marker[2:4], "big")
+        if length < 2 or code == 0xD9:
+            raise InvalidImageError("Struktur marker JPEG rusak")
+        if code in _JPEG_SOF:
+            sof = f.read(5)
+            if len(sof) < 5:
+                raise _truncated("JPEG")
+            dimensions = int.from_bytes(sof[3:5], "big"), int.from_bytes(sof[1:3], "big")
+        pos += 2 + length
+        if code == 0xDA:
+            if dimensions is None:
+                raise InvalidImageError("JPEG tanpa header ukuran (SOF)")
+            if pos >= size or _has_jpeg_eoi(f, size, pos) is False:
+                raise _truncated("JPEG")
+            return dimensions
+
+
+def _has_jpeg_eoi(f, size, scan_start):
+    """True jika ada EOI setelah SOS (di TAIL_BYTES terakhir), False jika file terpotong, None jika tidak pasti"""
+    start = max(scan_start, size - TAIL_BYTES)
+    f.seek(start)
+    window = f.read()
+    if b"\xff\xd9" in window:
+        return True
+    if start == scan_start:
+        return False  # everything after SOS was read: no EOI at all
+    # Phones append trailers (motion photo video, maker data) after EOI, which
+    # can be longer than the window. Entropy-coded data only has FF followed
+    # by 00 (stuffing), D0-D7 (restart) or FF (fill): any other pair means the
+    # window is trailer data, not a scan that was cut off.
+    if re.search(rb"\xff[^\x00\xd0-\xd7\xff]", window):
+        return None
+    return False
+
+
+def _tail(f, size, count=TAIL_BYTES):
+    """Byte terakhir file"""
+    f.seek(max(0, size - count))
+    return f.read()
+
+
+def _check_png(f, size, head):
+    """IEND di akhir file, atau rantai chunk yang utuh sampai akhir file"""
+    if head[12:16] != b"IHDR" or len(head) < 24:
+        raise InvalidImageError("PNG tanpa header IHDR")
+    if b"IEND" not in _tail(f, size):
+        # Trailing data after IEND, or no IEND at all: walk the chunk headers
+        pos = 8
+        while pos < size:
+            f.seek(pos)
+            header = f.read(8)
+            if len(header) < 8 or not header[4:8].isalpha():
+                break  # data after the last chunk
+            pos += 12 + int.from_bytes(header[:4], "big")
+            if pos > size:
+                raise _truncated("PNG")
+            if header[4:8] == b"IEND":
+                break
+    return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+
+
+def _check_gif(f, size, head):
+    # The ";" trailer is not required: Pillow decodes GIFs without it
+    if len(head) < 13:
+        raise _truncated("GIF")
+    return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+
+
+def _check_bmp(f, size, head):
+    if len(head) < 26:
+        raise _truncated("BMP")
+    data_offset = int.from_bytes(head[10:14], "little")
+    if int.from_bytes(head[14:18], "little") == 12:
+        # OS/2 BITMAPCOREHEADER
+        width = int.from_bytes(head[18:20], "little")
+        height = int.from_bytes(head[20:22], "little")
+        bits, compression = int.from_bytes(head[24:26], "little"), 0
+    else:
+        width = int.from_bytes(head[18:22], "little", signed=True)
+        height = abs(int.from_bytes(head[22:26], "little", signed=True))  # negative = top-down
+        bits = int.from_bytes(head[28:30], "little")
+        compression = int.from_bytes(head[30:34], "little")
+    if compression in (0, 3):
+        # Uncompressed rows are padded to 4 bytes, so the exact size is known
+        needed = data_offset + (width * bits + 31) // 32 * 4 * height
+    else:
+        needed = data_offset + 1
+    if needed > size:
+        raise _truncated("BMP")
+    return width, height
+
+
+def _check_tiff(f, size, head):
+    """IFD pertama: ukuran dan strip/tile harus ada di dalam file"""
+    if head[2:4] in (b"+\x00", b"\x00+"):
+        return None  # BigTIFF: left to the decoder
+    order = "little" if head[:2] == b"II" else "big"
+    ifd = int.from_bytes(head[4:8], order)
+    f.seek(ifd)
+    count = int.from_bytes(f.read(2), order)
+    entries = f.read(count * 12)
+    if ifd + 2 > size or len(entries) < count * 12:
+        raise _truncated("TIFF")
+    tags = {}
+    for i in range(0, len(entries), 12):
+        tag = int.from_bytes(entries[i:i + 2], order)
+        kind = int.from_bytes(entries[i + 2:i + 4], order)
+        n = int.from_bytes(entries[i + 4:i + 8], order)
+        width = {3: 2, 4: 4}.get(kind)
+        if width is None or tag not in (256, 257, 273, 279, 324, 325):
+            continue
+        raw = entries[i + 8:i + 12]
+        if n * width > 4:
+            f.seek(int.from_bytes(raw, order))
+            raw = f.read(n * width)
+            if len(raw) < n * width:
+                raise _truncated("TIFF")
+        tags[tag] = [int.from_bytes(raw[j:j + width], order) for j in range(0, n * width, width)]
+    if 256 not in tags or 257 not in tags:
+        raise InvalidImageError("TIFF tanpa ukuran gambar")
+    offsets, counts = tags.get(273, tags.get(324, [])), tags.get(279, tags.get(325, []))
+    if any(offset + length > size for offset, length in zip(offsets, counts)):
+        raise _truncated("TIFF")
+    return tags[256][0], tags[257][0]
+
+
+def _check_webp(f, size, head):
+    if int.from_bytes(head[4:8], "little") + 8 > size:
+        raise _truncated("WebP")
+    return None
+
+
+def _check_heif(f, size, head):
+    """Box top-level (ftyp, meta, mdat, ...) harus muat di dalam file"""
+    pos = 0
+    while pos + 8 <= size:
+        f.seek(pos)
+        header = f.read(16)
+        box_size = int.from_bytes(header[:4], "big")
+        if box_size == 0:
+            break  # last box runs to the end of the file
+        if box_size == 1:
+            box_size = int.from_bytes(header[8:16], "big")
+        if box_size < 8:
+            raise InvalidImageError("Struktur box HEIF rusak")
+        pos += box_size
+    if pos > size:
+        raise _truncated("HEIF")
+    return None
+
+
+_FORMAT_CHECKS = {
+    "JPEG": _check_jpeg,
+    "PNG": _check_png,
+    "GIF": _check_gif,
+    "BMP": _check_bmp,
+    "TIFF": _check_tiff,
+    "WEBP": _check_webp,
+    "HEIF": _check_heif,
+}
+
+
+def image_header(source):
+    """(nama format, (lebar, tinggi) atau None) dari header; lihat validate_image"""
+    with source.open() if isinstance(source, ArchiveMember) else open(source, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            raise InvalidImageError("File kosong (0 byte)")
+        f.seek(0)
+        head = f.read(SNIFF_BYTES)
+        format = sniff_format(head)
+        if format is None:
+            raise InvalidImageError(f"Isi file bukan gambar yang dikenali (diawali {head[:8].hex(' ')})")
+        dimensions = _FORMAT_CHECKS[format](f, size, head)
+    if dimensions is not None and min(dimensions) <= 0:
+        raise InvalidImageError(f"Ukuran gambar tidak valid ({dimensions[0]}x{dimensions[1]})")
+    return format, dimensions
+
+
+def validate_image(source):
+    """Cek cepat sebelum decode (magic bytes, ukuran, file terpotong); return nama format
+
+    Raise InvalidImageError untuk file yang pasti gagal dibuka.
+    """
+    format = image_header(source)[0]
+    # Content wins over the extension: a HEIC saved as .jpg is opened by
+    # Pillow once pillow-heif is registered
+    if format == "HEIF" and not heif_supported() and not os.fspath(source).lower().endswith(".heic"):
+        raise InvalidImageError("Isi file HEIC dengan ekstensi lain; pasang pillow-heif untuk membacanya")
+    return format
+
+
+def iter_valid_images(paths, on_error=None):
+    """Yield path yang lolos validate_image; yang gagal langsung ke on_error"""
+    for path in paths:
+        try:
+            validate_image(path)
+        except (InvalidImageError, OSError) as e:
+            if on_error is None:
+                raise
+            on_error(path, e)
+            continue
+        yield path
+
+
+# ---------------------------------------------------------------------------
+# Resource governor
+#
+# Decoded images are far bigger than the files on disk (a 200 MP TIFF needs
+# ~1.2 GB as RGB). Before decoding, each image's footprint is estimated from
+# its header and admitted against a shared RAM budget: workers simply wait
+# while the budget is taken, so effective parallelism drops on its own when
+# images are large. An image that alone exceeds the budget runs by itself and
+# is decoded at reduced resolution instead of getting the process OOM-killed.
+# ---------------------------------------------------------------------------
+
+DEFAULT_MAX_IMAGE_PIXELS = 1_000_000_000
+MEMORY_BUDGET_ENV = "CONVERT_IMG_PDF_MEMORY_MB"
+
+
+def physical_memory_bytes():
+    """Total RAM fisik, atau None jika tidak bisa dideteksi"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        pass
+    if os.name == "nt":
+        try:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys
+        except Exception:
+            pass
+    return None
+
+
+def default_memory_budget():
+    """Budget RAM default: env CONVERT_IMG_PDF_MEMORY_MB, atau 1/4 RAM fisik"""
+    env = os.environ.get(MEMORY_BUDGET_ENV, "").strip()
+    if env.isdigit() and int(env) > 0:
+        return int(env) * 1024 * 1024
+    total = physical_memory_bytes()
+    if not total:
+        return 1024 * 1024 * 1024
+    return max(256 * 1024 * 1024, total // 4)
+
+
+def decoded_cost(img):
+    """Perkiraan byte saat decode + konversi ke mode halaman, dihitung dari header saja"""
+    bands = len(img.getbands())
+    if has_alpha(img):
+        # RGBA copy for the blend plus the RGB page
+        return img.width * img.height * (bands + 4 + 3)
+    if img.mode in ("RGB", "L", "P"):
+        return img.width * img.height * bands
+    return img.width * img.height * (bands + 3)
+
+
+class ResourceGovernor:
+    """Atur memori decode dan batas pixel untuk satu job konversi"""
+
+    def __init__(self, memory_budget=None, max_workers=None, max_image_pixels=DEFAULT_MAX_IMAGE_PIXELS):
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_image_pixels = max_image_pixels
+        self._in_use = 0
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def check_pixels(self, size):
+        """Tolak gambar yang melebihi batas pixel job ini sebelum di-decode"""
+        pixels = size[0] * size[1]
+        if self.max_image_pixels and pixels > self.max_image_pixels:
+            raise Image.DecompressionBombError(
+                f"Gambar terlalu besar: {pixels} pixel (batas {self.max_image_pixels})"
+            )
+
+    def reduce_factor(self, cost):
+        """Faktor perkecil (1, 2, 4, ...) agar satu gambar muat di budget"""
+        factor = 1
+        while cost // (factor * factor) > self.memory_budget:
+            factor *= 2
+        return factor
+
+    @contextlib.contextmanager
+    def admit(self, cost, cancel=None):
+        """Tunggu sampai `cost` byte muat di budget, lalu jalankan blok"""
+        cost = min(cost, self.memory_budget)
+        with self._cond:
+            # An oversized item is capped to the whole budget, i.e. it runs alone
+            while self._active and self._in_use + cost > self.memory_budget:
+                check_cancel(cancel)
+                self._cond.wait(0.25)
+            check_cancel(cancel)
+            self._in_use += cost
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use -= cost
+                self._active -= 1
+                self._cond.notify_all()
+
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+
+
+def default_governor():
+    """Governor bersama untuk semua konversi di proses ini"""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            _default_governor = ResourceGovernor()
+        return _default_governor
+
+
+def open_checked(source, governor):
+    """open_image untuk decode yang diatur governor
+
+    Batas pixel job (check_pixels) menggantikan batas Pillow hanya jika
+    ukurannya sudah terbaca dari header sebelum Image.open.
+    """
+    size = image_header(source)[1]
+    if size is not None:
+        governor.check_pixels(size)
+    img = open_image(source, size_checked=size is not None)
+    governor.check_pixels(img.size)
+    return img
+
+
+def decode_within_budget(img, governor):
+    """Decode ke mode halaman (lihat flatten_for_page), diperkecil jika melebihi budget"""
+    factor = governor.reduce_factor(decoded_cost(img))
+    if factor > 1:
+        target = (max(1, img.width // factor), max(1, img.height // factor))
+        # JPEG can scale down inside the decoder (1/2 .. 1/8), other formats
+        # are reduced right after decoding, before the RGB copy is made
+        img.draft(img.mode, target)
+        if img.width > target[0]:
+            if img.mode in ("P", "PA"):
+                # Pillow cannot reduce palette images; resampling needs real colours
+                img = img.convert("RGBA" if has_alpha(img) else "RGB")
+            img = img.reduce(max(1, img.width // target[0]))
+    return flatten_for_page(img)
+
+
+# ---------------------------------------------------------------------------
+# Local job scheduler
+#
+# Several instances (two users on one server, a GUI next to a batch job) may
+# convert at the same time. Instead of refusing to start, every instance is
+# a job of one machine-wide pool of SCHEDULER_SLOTS execution slots. The
+# first instance to bind SCHEDULER_PORT on localhost hosts the slot server;
+# the others connect to it. Before decoding and encoding an image, a worker
+# thread asks for a slot and gives it back afterwards. Waiting requests are
+# granted round-robin over the connected jobs, so a 10,000-image backfill
+# cannot starve a small job started after it. If the host exits, the
+# remaining instances reconnect and one of them takes over as host: a
+# refused or reset connection, or one closed during the hello, means the
+# host is going away, so the client retries bind-or-connect with a short
+# backoff until SCHEDULER_TIMEOUT_SECONDS have passed.
+#
+#   client -> host:  SCHEDULER_HELLO first, then "A\n" acquire one slot,
+#                    "R\n" release one slot, "P\n" ping
+#   host -> client:  SCHEDULER_HELLO (same version), "G\n" one slot granted,
+#                    "P\n" ping answer
+#
+# A peer that does not open with the same hello line is dropped, whichever
+# side it is on. A host that stays silent for SCHEDULER_TIMEOUT_SECONDS
+# (during the handshake, or while a slot is awaited even though pings are
+# sent) is treated as hung, e.g. stopped or another program on the port:
+# the instance prints a warning and continues unscheduled instead of
+# blocking. After SCHEDULER_RETRY_SECONDS it tries to rejoin, so a host
+# that was only stopped for a while does not leave the others unscheduled
+# for the rest of their run. Set SCHEDULER_ENV=off to run unscheduled from
+# the start (then only ResourceGovernor limits the work inside the process).
+# ---------------------------------------------------------------------------
+
+SCHEDULER_ENV = "CONVERT_IMG_PDF_SCHEDULER"
+SCHEDULER_PORT_ENV = "CONVERT_IMG_PDF_SCHEDULER_PORT"
+SCHEDULER_PORT = 47681
+SCHEDULER_SLOTS = os.cpu_count() or 1
+SCHEDULER_HELLO = b"CONVERT_IMG_PDF scheduler 1"  # bump the number on protocol changes
+SCHEDULER_PING_SECONDS = 1.0
+SCHEDULER_TIMEOUT_SECONDS = 5.0
+SCHEDULER_RETRY_SECONDS = 60.0
+
+
+class SchedulerMismatchError(OSError):
+    """Port scheduler dipakai program lain, versi lain, atau host yang hang"""
+
+
+class _SlotServer:
+    """Server slot di instance host; grant round-robin antar koneksi (job)"""
+
+    def __init__(self, listener, slots):
+        import selectors
+        self._listener = listener
+        self._slots = slots
+        self._in_use = 0
+        self._jobs = {}  # socket -> {"hello": bool, "waiting": n, "held": n, "buffer": bytes}
+        self._turn = deque()  # jobs in round-robin order
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ)
+
+    def serve_forever(self):
+        while True:
+            for key, _events in self._selector.select():
+                if key.fileobj is self._listener:
+                    self._accept()
+                else:
+                    self._read(key.fileobj)
+            self._grant()
+
+    def _accept(self):
+        import selectors
+        import socket
+        with contextlib.suppress(OSError):
+            conn, _addr = self._listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._jobs[conn] = {"hello": False, "waiting": 0, "held": 0, "buffer": b""}
+            self._turn.append(conn)
+            self._selector.register(conn, selectors.EVENT_READ)
+
+    def _read(self, conn):
+        job = self._jobs[conn]
+        try:
+            data = conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            # Job finished or crashed: everything it held is free again
+            self._drop(conn)
+            return
+        job["buffer"] += data
+        *lines, job["buffer"] = job["buffer"].split(b"\n")
+        if not job["hello"] and len(job["buffer"]) > len(SCHEDULER_HELLO):
+            lines.append(job["buffer"])  # no newline where the hello should end
+        for line in lines:
+            if not job["hello"]:
+                if line != SCHEDULER_HELLO:
+                    self._drop(conn)  # not one of ours, or another protocol version
+                    return
+                job["hello"] = True
+                self._reply(conn, SCHEDULER_HELLO + b"\n")
+            elif line == b"A":
+                job["waiting"] += 1
+            elif line == b"R" and job["held"]:
+                job["held"] -= 1
+                self._in_use -= 1
+            elif line == b"P":
+                self._reply(conn, b"P\n")
+
+    def _reply(self, conn, data):
+        with contextlib.suppress(OSError):
+            conn.sendall(data)
+
+    def _drop(self, conn):
+        self._in_use -= self._jobs[conn]["held"]
+        self._selector.unregister(conn)
+        self._turn.remove(conn)
+        del self._jobs[conn]
+        conn.close()
+
+    def _grant(self):
+        while self._in_use < self._slots:
+            for _ in range(len(self._turn)):
+                conn = self._turn[0]
+                self._turn.rotate(-1)
+                job = self._jobs[conn]
+                if job["waiting"]:
+                    job["waiting"] -= 1
+                    job["held"] += 1
+                    self._in_use += 1
+                    self._reply(conn, b"G\n")
+                    break
+            else:
+                return  # nobody is waiting
+
+
+class JobScheduler:
+    """Klien scheduler untuk instance ini; slot() membungkus pekerjaan berat"""
+
+    def __init__(self, port=None, slots=SCHEDULER_SLOTS):
+        self._port = port or int(os.environ.get(SCHEDULER_PORT_ENV, SCHEDULER_PORT))
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._granted = threading.Semaphore(0)
+        self._sock = None
+        self._waiting = 0  # acquires sent and not yet granted
+        self._abandoned = 0  # grants that a cancelled waiter no longer wants
+        self._heard = 0.0  # time.monotonic() of the last message from the host
+        self._pinged = 0.0
+        self.is_host = False
+        self.disabled = False  # host hung or unusable: slot() does not wait until _retry_at
+        self._retry_at = 0.0
+
+    def _connect(self):
+        """Sambung ke host, atau jadi host jika belum ada; dipanggil dengan _lock"""
+        deadline = time.monotonic() + SCHEDULER_TIMEOUT_SECONDS
+        delay = 0.05
+        while True:
+            try:
+                self._connect_once()
+                return
+            except SchedulerMismatchError:
+                raise
+            except OSError:
+                # Refused, reset or closed during the hello: the host is gone
+                # or going. Take over if the port is free, else wait for the
+                # instance that did.
+                if time.monotonic() + delay > deadline:
+                    raise
+            if not self._host():
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+    def _connect_once(self):
+        import socket
+        sock = socket.create_connection(("127.0.0.1", self._port), timeout=1)
+        try:
+            # Messages are a few bytes each: send them now, not after a delayed ACK
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            buffer = self._handshake(sock)
+            sock.settimeout(None)
+            if self._waiting:
+                # Requests that were pending at a host that went away
+                sock.sendall(b"A\n" * self._waiting)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._heard = time.monotonic()
+        threading.Thread(target=self._read_grants, args=(sock, buffer), daemon=True).start()
+
+    def _handshake(self, sock):
+        """Tukar hello dengan host; return sisa data setelahnya
+
+        SchedulerMismatchError jika host tidak cocok atau tidak menjawab,
+        OSError biasa jika koneksi ditutup (host sedang berhenti).
+        """
+        import socket
+        sock.settimeout(SCHEDULER_TIMEOUT_SECONDS)
+        sock.sendall(SCHEDULER_HELLO + b"\n")
+        buffer = b""
+        while b"\n" not in buffer and len(buffer) <= len(SCHEDULER_HELLO):
+            try:
+                data = sock.recv(64)
+            except socket.timeout as e:
+                raise SchedulerMismatchError(f"host scheduler tidak menjawab dalam {SCHEDULER_TIMEOUT_SECONDS:g} detik") from e
+            if not data:
+                raise ConnectionResetError("host scheduler menutup koneksi saat handshake")
+            buffer += data
+        line, _newline, rest = buffer.partition(b"\n")
+        if line != SCHEDULER_HELLO:
+            raise SchedulerMismatchError(f"port {self._port} dipakai program lain atau versi scheduler yang berbeda")
+        return rest
+
+    def _host(self):
+        """Coba jadi host; False jika port sudah dipakai"""
+        import socket
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name != "nt":
+            # Allow rebinding right after the previous host exited (TIME_WAIT)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listener.bind(("127.0.0.1", self._port))
+        except OSError:
+            listener.close()
+            return False  # another instance won the race; connect to it
+        listener.listen(64)
+        self.is_host = True
+        server = _SlotServer(listener, self._slots)
+        threading.Thread(target=server.serve_forever, name="job-scheduler", daemon=True).start()
+        return True
+
+    def _read_grants(self, sock, buffer):
+        while True:
+            try:
+                data = sock.recv(4096)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            self._heard = time.monotonic()
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line != b"G":
+                    continue
+                with self._lock:
+                    if self._sock is not sock:
+                        break  # disabled meanwhile: the count was reset
+                    self._waiting -= 1
+                    if self._abandoned:
+                        self._abandoned -= 1
+                        self._send(b"R\n")
+                        continue
+                self._granted.release()
+        # Host went away: reconnect (possibly becoming the host)
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+                try:
+                    self._connect()
+                except OSError as e:
+                    self._disable(e)
+
+    def _send(self, data):
+        """Kirim ke host; dipanggil dengan _lock. Host yang tidak bisa dihubungi mematikan scheduler"""
+        if self.disabled:
+            return
+        if self._sock is None:
+            try:
+                self._connect()
+            except OSError as e:
+                self._disable(e)
+                return
+        with contextlib.suppress(OSError):
+            self._sock.sendall(data)
+
+    def _disable(self, error):
+        """Lanjut tanpa scheduler sampai SCHEDULER_RETRY_SECONDS lewat; dipanggil dengan _lock"""
+        if self.disabled:
+            return
+        self.disabled = True
+        self._retry_at = time.monotonic() + SCHEDULER_RETRY_SECONDS
+        print(f"[WARN] Scheduler lokal tidak bisa dipakai ({error}); lanjut tanpa scheduler, "
+              f"dicoba lagi dalam {SCHEDULER_RETRY_SECONDS:g} detik", file=sys.stderr)
+        if self._sock is not None:
+            with contextlib.suppress(OSError):
+                self._sock.close()
+            self._sock = None
+        # Waiters return unscheduled; start from a clean count when rejoining
+        self._waiting = self._abandoned = 0
+        while self._granted.acquire(blocking=False):
+            pass
+
+    def _rejoin_due(self):
+        """Aktifkan lagi scheduler yang dimatikan jika waktunya; dipanggil dengan _lock"""
+        if self.disabled and time.monotonic() >= self._retry_at:
+            self.disabled = False
+
+    def _await_grant(self, cancel):
+        """Tunggu "G"; False jika scheduler dimatikan selama menunggu (lanjut tanpa slot)"""
+        while not self._granted.acquire(timeout=QUEUE_POLL_SECONDS):
+            if cancel is not None and cancel.cancelled:
+                with self._lock:
+                    if self._granted.acquire(blocking=False):
+                        self._send(b"R\n")  # granted just now: give it straight back
+                    else:
+                        self._abandoned += 1
+                raise ConversionCancelled()
+            with self._lock:
+                if self.disabled:
+                    return False
+                now = time.monotonic()
+                silent = now - self._heard
+                if silent > SCHEDULER_TIMEOUT_SECONDS:
+                    self._disable(f"host tidak menjawab selama {silent:.0f} detik")
+                    return False
+                if silent > SCHEDULER_PING_SECONDS and now - self._pinged > SCHEDULER_PING_SECONDS:
+                    # A busy host still answers; only a hung one stays silent
+                    self._pinged = now
+                    self._send(b"P\n")
+        return True
+
+    @contextlib.contextmanager
+    def slot(self, cancel=None):
+        """Tunggu giliran satu slot, jalankan blok, lalu kembalikan slotnya
+
+        Jika host hang atau tidak cocok, blok dijalankan tanpa slot.
+        """
+        with self._lock:
+            self._rejoin_due()
+            # Sent before counting: a reconnect inside _send re-sends the pending count
+            self._send(b"A\n")
+            scheduled = not self.disabled
+            if scheduled:
+                self._waiting += 1
+        if not scheduled or not self._await_grant(cancel):
+            yield
+            return
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._send(b"R\n")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def job_scheduler():
+    """Scheduler bersama untuk proses ini, atau None jika dimatikan/tidak tersedia"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            if os.environ.get(SCHEDULER_ENV, "").strip().lower() in ("0", "off", "no", "false"):
+                _scheduler = False
+            else:
+                _scheduler = JobScheduler()
+                with _scheduler._lock:
+                    try:
+                        _scheduler._connect()
+                    except OSError as e:
+                        # e.g. no loopback networking, or a hung/foreign host on the port
+                        _scheduler._disable(e)
+        return _scheduler or None
+
+
+def job_slot(cancel=None):
+    """Context manager: satu slot scheduler mesin ini (no-op jika tidak aktif)"""
+    scheduler = job_scheduler()
+    if scheduler is None:
+        return contextlib.nullcontext()
+    return scheduler.slot(cancel)
+
+
+# ---------------------------------------------------------------------------
+# Header pre-scan and progress
+#
+# Before converting, every input is opened header-only (no pixel decode) to
+# learn its dimensions, format and frame count. That gives the total page
+# count and an output size estimate up front, and lets progress be weighted
+# by the real work per image instead of counting a 2,000-photo subfolder the
+# same as a single file.
+# ---------------------------------------------------------------------------
+
+# Rough DCT output size for decoded (non pass-through) pages, bytes per pixel
+ESTIMATED_JPEG_BYTES_PER_PIXEL = 0.25
+
+
+class ImageInfo:
+    """Hasil scan header satu file gambar"""
+
+    def __init__(self, path, file_size, width=0, height=0, format=None, frames=1, error=None):
+        self.path = path
+        self.file_size = file_size
+        self.width = width
+        self.height = height
+        self.format = format
+        self.frames = frames
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def passthrough(self):
+        return self.format == "JPEG"
+
+    @property
+    def work(self):
+        """Bobot kerja untuk progress: byte yang disalin atau pixel yang di-decode"""
+        if not self.ok:
+            return 1
+        if self.passthrough:
+            return max(1, self.file_size)
+        return max(1, self.width * self.height * 3)
+
+    @property
+    def estimated_output_bytes(self):
+        if not self.ok:
+            return 0
+        if self.passthrough:
+            return self.file_size
+        return int(self.width * self.height * ESTIMATED_JPEG_BYTES_PER_PIXEL)
+
+
+def scan_image(path):
+    """Baca header saja: ukuran, format dan jumlah frame"""
+    try:
+        file_size = source_size(path)
+    except OSError as e:
+        return ImageInfo(path, 0, error=e)
+    try:
+        validate_image(path)
+    except (InvalidImageError, OSError) as e:
+        return ImageInfo(path, file_size, error=e)
+    heic_fallback = is_heif(path) and not heif_supported()
+    try:
+        with open_checked(path, default_governor()) as probe:
+            return ImageInfo(
+                path, file_size, probe.width, probe.height, probe.format,
+                getattr(probe, "n_frames", 1)
+            )
+    except Exception as e:
+        if heic_fallback:
+            # imageio has no header-only mode; assume ~10:1 compression
+            return ImageInfo(path, file_size, format="HEIF", width=int((file_size * 10 / 3) ** 0.5),
+                             height=int((file_size * 10 / 3) ** 0.5))
+        return ImageInfo(path, file_size, error=e)
+
+
+def scan_images(paths, max_workers=8):
+    """Scan header banyak file sekaligus (I/O bound, jadi pakai thread)"""
+    paths = list(paths)
+    if len(paths) < 2:
+        return [scan_image(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(scan_image, paths))
+
+
+class ScanSummary:
+    """Ringkasan hasil pre-scan: total halaman, pixel dan perkiraan ukuran output"""
+
+    def __init__(self, infos):
+        self.infos = {info.path: info for info in infos}
+        readable = [info for info in infos if info.ok]
+        self.pages = len(readable)
+        self.unreadable = len(infos) - len(readable)
+        self.input_bytes = sum(info.file_size for info in infos)
+        self.pixels = sum(info.width * info.height for info in readable)
+        self.estimated_output_bytes = sum(info.estimated_output_bytes for info in readable)
+        self.total_work = sum(info.work for info in infos)
+
+    def work_of(self, path):
+        info = self.infos.get(path)
+        return info.work if info is not None else 1
+
+    def describe(self):
+        text = f"{self.pages} halaman, perkiraan output ±{format_bytes(self.estimated_output_bytes)}"
+        if self.unreadable:
+            text += f" ({self.unreadable} file tidak terbaca)"
+        return text
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressTracker:
+    """Progress berbobot dengan ETA dari throughput bergulir (EWMA)"""
+
+    def __init__(self, summary, smoothing=0.3):
+        self.summary = summary
+        self.done_work = 0
+        self.done_pages = 0
+        self.smoothing = smoothing
+        self._rate = None  # work units per second
+        self._last_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def advance(self, path):
+        """Tandai satu gambar selesai; return (persen, detik ETA atau None)"""
+        work = self.summary.work_of(path)
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(now - self._last_time, 1e-6)
+            self._last_time = now
+            rate = work / elapsed
+            if self._rate is None:
+                self._rate = rate
+            else:
+                self._rate = self.smoothing * rate + (1 - self.smoothing) * self._rate
+            self.done_work += work
+            self.done_pages += 1
+            total = max(self.summary.total_work, 1)
+            percent = min(100.0, self.done_work * 100.0 / total)
+            remaining = max(total - self.done_work, 0)
+            eta = remaining / self._rate if self._rate else None
+            return percent, eta
+
+    def describe(self, eta):
+        return f"{self.done_pages}/{self.summary.pages} halaman • ETA {format_eta(eta)}"
+
+
+# ---------------------------------------------------------------------------
+# Streaming PDF writer
+#
+# Pillow's PDF plugin needs a seekable file and keeps every page image alive
+# until save() returns. The writer below emits each page as soon as it is
+# encoded and only counts the bytes it has written, so it works on any
+# writable binary stream (regular files, sys.stdout.buffer, pipes, sockets).
+# ---------------------------------------------------------------------------
+
+class PdfName(str):
+    """PDF name object (/Name)"""
+
+
+class PdfRef:
+    """Indirect reference to object `num`"""
+    __slots__ = ("num",)
+
+    def __init__(self, num):
+        self.num = num
+
+
+# Bytes that must be written as #xx inside a name (imported PDFs may use them)
+_PDF_NAME_SPECIAL = re.compile(rb"[^\x21-\x7e]|[#()<>\[\]{}/%]")
+
+
+def _pdf_text(value):
+    try:
+        raw = value.encode("latin-1")
+    except UnicodeEncodeError:
+        return b"<" + (b"\xfe\xff" + value.encode("utf-16-be")).hex().encode("ascii") + b">"
+    raw = raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + raw.replace(b"\r", b"\\r").replace(b"\n", b"\\n") + b")"
+
+
+def _pdf_name(value):
+    raw = value.encode("latin-1")
+    if _PDF_NAME_SPECIAL.search(raw):
+        raw = _PDF_NAME_SPECIAL.sub(lambda m: b"#%02X" % m.group()[0], raw)
+    return b"/" + raw
+
+
+def pdf_serialize(value):
+    if isinstance(value, PdfName):
+        return _pdf_name(value)
+    if isinstance(value, PdfRef):
+        return b"%d 0 R" % value.num
+    if value is None:
+        return b"null"
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int):
+        return b"%d" % value
+    if isinstance(value, float):
+        text = ("%.4f" % value).rstrip("0").rstrip(".")
+        return (text if text not in ("", "-0") else "0").encode("ascii")
+    if isinstance(value, str):
+        return _pdf_text(value)
+    if isinstance(value, bytes):
+        return b"<" + value.hex().encode("ascii") + b">"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b" ".join(pdf_serialize(v) for v in value) + b"]"
+    if isinstance(value, dict):
+        return b"<<" + b"".join(
+            _pdf_name(key) + b" " + pdf_serialize(v) for key, v in value.items()
+        ) + b">>"
+    raise TypeError(f"Tipe tidak didukung di PDF: {type(value).__name__}")
+
+
+EXIF_ORIENTATION = 0x0112
+
+# EXIF orientation -> (mirror horizontally, clockwise page /Rotate).
+# Mirroring is done in the content stream matrix and rotation via /Rotate,
+# so orientation never needs the pixels to be decoded or rotated.
+ORIENTATION_TRANSFORMS = {
+    1: (False, 0),
+    2: (True, 0),
+    3: (False, 180),
+    4: (True, 180),
+    5: (True, 270),
+    6: (False, 90),
+    7: (True, 90),
+    8: (False, 270),
+}
+
+
+def read_orientation(img):
+    """Ambil tag EXIF Orientation (1-8) dari header, tanpa decode pixel"""
+    try:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+    except Exception:
+        return 1
+    return orientation if orientation in ORIENTATION_TRANSFORMS else 1
+
+
+class EncodedPage:
+    """Satu halaman yang sudah di-encode dan siap ditulis ke PDF"""
+
+    def __init__(self, width, height, image_dict, data, orientation=1):
+        self.width = width
+        self.height = height
+        self.image_dict = image_dict  # XObject dictionary without /Length
+        self.data = data  # bytes, or an iterable of chunks streamed by the writer
+        self.orientation = orientation  # EXIF orientation, applied by the writer
+        # Timings for the run log; lazily streamed data is timed by write_pdf
+        self.decode_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.text_layer = None  # OCR result, see attach_text_layers
+        self.ocr_input = None  # (PNG bytes, size) of the decoded page for OCR, see ocr_page_input
+        self.icc_profile = None  # source ICC profile, embedded by the writer when it matches
+
+
+# ---------------------------------------------------------------------------
+# Transparency and palette images
+#
+# convert("RGB") simply drops the alpha channel, so transparent areas show
+# whatever colour the invisible pixels happen to hold (usually black). Images
+# with alpha are instead blended onto a page background colour (white by
+# default, see PAGE_BACKGROUND_ENV / --background); the blend is a single
+# Image.paste with the alpha as mask, done in C. Palette images without
+# transparency stay 1 byte (or less) per pixel as an /Indexed XObject
+# instead of being expanded to 24-bit RGB and JPEG-compressed.
+# ---------------------------------------------------------------------------
+
+PAGE_BACKGROUND_ENV = "CONVERT_IMG_PDF_BACKGROUND"
+_page_background = None
+
+
+def set_page_background(color):
+    """Set warna background untuk gambar transparan ("white", "#F0F0F0", ...)"""
+    from PIL import ImageColor
+    global _page_background
+    _page_background = ImageColor.getrgb(color)[:3]
+
+
+def page_background():
+    """Warna background aktif: set_page_background, env CONVERT_IMG_PDF_BACKGROUND, atau putih"""
+    if _page_background is None:
+        set_page_background(os.environ.get(PAGE_BACKGROUND_ENV, "").strip() or "white")
+    return _page_background
+
+
+def has_alpha(img):
+    return img.mode in ("RGBA", "RGBa", "LA", "La", "PA") or "transparency" in img.info
+
+
+def flatten_for_page(img):
+    """Mode yang bisa ditulis ke PDF: P tetap palette, alpha di-blend, CMYK tetap, sisanya RGB/L"""
+    if has_alpha(img):
+        rgba = img if img.mode == "RGBA" else img.convert("RGBA")
+        page = Image.new("RGB", img.size, page_background())
+        page.paste(rgba, mask=rgba)
+        # Image.new starts with empty info; keep the profile for the writer
+        # (a grey profile from LA no longer matches and is dropped there)
+        if img.info.get("icc_profile"):
+            page.info["icc_profile"] = img.info["icc_profile"]
+        return page
+    if img.mode in ("P", "RGB", "L", "CMYK"):
+        return img
+    return img.convert("RGB")
+
+
+def header_palette(img):
+    """Palette RGB gambar mode P tanpa decode (getpalette() me-load seluruh gambar)"""
+    if img.palette is None:
+        return img.getpalette() or [0, 0, 0]
+    rawmode, data = img.palette.getdata()
+    holder = Image.new("P", (1, 1))
+    holder.putpalette(data, rawmode)
+    return holder.getpalette()
+
+
+def palette_colorspace(img, colors=None):
+    """/Indexed colour space dan bit per pixel untuk gambar mode P
+
+    `colors` membatasi palette ke entri pertama yang dipakai; default seluruh palette.
+    """
+    palette = header_palette(img)
+    if colors is None:
+        colors = len(palette) // 3
+    bits = 1 if colors <= 2 else 2 if colors <= 4 else 4 if colors <= 16 else 8
+    lookup = bytes(palette[:colors * 3]).ljust(colors * 3, b"\0")
+    return [PdfName("Indexed"), PdfName("DeviceRGB"), colors - 1, lookup], bits
+
+
+def encode_indexed(img):
+    """Encode gambar palette jadi XObject /Indexed + FlateDecode (tanpa ekspansi RGB)"""
+    # Only the entries actually used are written, so the bit depth follows the
+    # real colour count; Pillow pads palettes (quantize output too) to 256
+    used = [index for index, count in enumerate(img.histogram()) if count]
+    if used and used[-1] >= len(used):
+        img = img.remap_palette(used)  # close the gaps: used colours become 0..n-1
+    colorspace, bits = palette_colorspace(img, max(1, len(used)))
+    data = img.tobytes("raw", "P" if bits == 8 else f"P;{bits}")
+    return EncodedPage(img.width, img.height, {
+        "Type": PdfName("XObject"),
+        "Subtype": PdfName("Image"),
+        "Width": img.width,
+        "Height": img.height,
+        "ColorSpace": colorspace,
+        "BitsPerComponent": bits,
+        "Filter": PdfName("FlateDecode"),
+    }, zlib.compress(data, 6))
+
+
+# ---------------------------------------------------------------------------
+# Colour management (ICC profiles)
+#
+# convert("RGB") drops the embedded ICC profile and PDF viewers then read the
+# pixels as plain sRGB: Display P3 photos from iPhones look dull and CMYK
+# scans, forced through Pillow's naive CMYK->RGB formula, come out far too
+# bright. Instead the source profile travels with the page and the writer
+# embeds it once per PDF as an /ICCBased colour space, so the viewer does
+# the colour conversion. CMYK stays CMYK: CMYK JPEGs are copied as they are
+# like RGB ones and other CMYK images are encoded with four channels. A
+# profile is only used when its colour space matches the written pixels (a
+# page reduced to gray keeps DeviceGray).
+# ---------------------------------------------------------------------------
+
+DEVICE_COLORSPACES = {1: "DeviceGray", 3: "DeviceRGB", 4: "DeviceCMYK"}
+_MODE_COLORSPACES = {"L": "DeviceGray", "RGB": "DeviceRGB", "CMYK": "DeviceCMYK"}
+_ICC_COMPONENTS = {b"GRAY": 1, b"RGB ": 3, b"CMYK": 4}
+
+
+def icc_components(profile):
+    """Jumlah komponen warna profil ICC (1, 3 atau 4), atau None jika tidak dikenali"""
+    if not profile or len(profile) < 128 or int.from_bytes(profile[:4], "big") > len(profile):
+        return None
+    return _ICC_COMPONENTS.get(bytes(profile[16:20]))
+
+
+def device_colorspace(mode):
+    """/DeviceGray, /DeviceRGB atau /DeviceCMYK untuk mode L, RGB atau CMYK"""
+    return PdfName(_MODE_COLORSPACES[mode])
+
+
+def cmyk_decode(img):
+    """/Decode untuk CMYK JPEG: data Adobe (juga buatan Pillow) tersimpan terbalik"""
+    return [1, 0] * 4 if "adobe" in img.info else None
+
+
+# ---------------------------------------------------------------------------
+# Adaptive codec selection
+#
+# One codec does not suit every page: DCT (JPEG) is small for photos but
+# smears text and UI edges, while Flate is lossless and tiny for scans and
+# screenshots with flat colour areas yet several times larger on photos.
+# classify_image looks at a small nearest-neighbour copy of the page and
+# computes its statistics in Pillow's C code: distinct colours, and the
+# entropy of the difference between horizontally adjacent pixels. That edge
+# entropy approximates the bits per pixel a lossless predictor coder needs:
+# near 0 for flat areas with sharp edges, several bits for photo texture and
+# scanner noise. Per page it picks:
+#   bilevel  - pure black/white (text scans): 1 bit per pixel, Flate
+#   graphics - low edge entropy (screenshots, charts): lossless, as an
+#              /Indexed palette when the page has at most 256 colours,
+#              otherwise Flate with PNG predictors
+#   photo    - everything else: DCT
+# Pages whose colour channels are equal are written as DeviceGray. JPEG
+# files that are copied as they are, and banded huge pages, are unaffected.
+# ---------------------------------------------------------------------------
+
+CLASSIFY_SIZE = 256
+LOSSLESS_MAX_EDGE_ENTROPY = 2.5  # bits per pixel; above this DCT is smaller
+PHOTO_GRAY_TOLERANCE = 8  # max channel difference still treated as gray for DCT pages
+
+
+def _classify_sample(img):
+    if img.width * img.height <= CLASSIFY_SIZE * CLASSIFY_SIZE:
+        return img
+    scale = CLASSIFY_SIZE / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    # NEAREST keeps the sample's colours a subset of the page's colours
+    return img.resize(size, Image.NEAREST)
+
+
+def _channel_spread(img):
+    """Selisih terbesar antar channel R, G, B (0 = gambar abu-abu murni)"""
+    from PIL import ImageChops
+    r, g, b = img.split()
+    return max(ImageChops.difference(r, g).getextrema()[1], ImageChops.difference(g, b).getextrema()[1])
+
+
+def classify_image(img):
+    """Tentukan (jenis, grayscale) untuk gambar L/RGB; jenis: bilevel, indexed, graphics atau photo"""
+    from PIL import ImageChops
+    sample = _classify_sample(img)
+    gray = img.mode == "L" or _channel_spread(sample) <= PHOTO_GRAY_TOLERANCE
+    if gray and _is_black_white(sample) and _is_black_white(img):
+        return "bilevel", True
+    luma = sample if sample.mode == "L" else sample.convert("L")
+    edges = ImageChops.subtract_modulo(luma, ImageChops.offset(luma, 1, 0))
+    if edges.entropy() > LOSSLESS_MAX_EDGE_ENTROPY:
+        return "photo", gray
+    # Lossless from here on, so a tint the sample tolerated must not be dropped
+    gray = img.mode == "L" or (gray and _channel_spread(img) == 0)
+    if not gray and sample.getcolors(256) is not None and img.getcolors(256) is not None:
+        return "indexed", False
+    return "graphics", gray
+
+
+def _is_black_white(img):
+    colors = img.getcolors(2)
+    return colors is not None and {value for _count, value in colors} <= {0, 255, (0, 0, 0), (255, 255, 255)}
+
+
+def _png_idat(img):
+    """Data zlib (dengan filter PNG per baris) dari encoder PNG Pillow"""
+    buf = io.BytesIO()
+    img.save(buf, "PNG", compress_level=6)
+    png = buf.getbuffer()
+    idat, pos = [], 8
+    while pos < len(png):
+        length = int.from_bytes(png[pos:pos + 4], "big")
+        if png[pos + 4:pos + 8] == b"IDAT":
+            idat.append(bytes(png[pos + 8:pos + 8 + length]))
+        pos += 12 + length
+    return b"".join(idat)
+
+
+def encode_flate(img):
+    """Encode gambar 1/L/RGB/CMYK lossless: Flate + PNG predictor (PDF /Predictor 15)"""
+    bits, colors = (1, 1) if img.mode == "1" else (8, len(img.getbands()))
+    image_dict = {
+        "Type": PdfName("XObject"),
+        "Subtype": PdfName("Image"),
+        "Width": img.width,
+        "Height": img.height,
+        "ColorSpace": PdfName(DEVICE_COLORSPACES[colors]),
+        "BitsPerComponent": bits,
+        "Filter": PdfName("FlateDecode"),
+    }
+    if img.mode == "CMYK":
+        # PNG has no CMYK, so there is no predictor data to borrow
+        return EncodedPage(img.width, img.height, image_dict, zlib.compress(img.tobytes(), 6))
+    image_dict["DecodeParms"] = {"Predictor": 15, "Colors": colors, "BitsPerComponent": bits, "Columns": img.width}
+    return EncodedPage(img.width, img.height, image_dict, _png_idat(img))
+
+
+def encode_dct(img):
+    """Encode gambar L/RGB/CMYK sebagai JPEG (DCTDecode)"""
+    buf = io.BytesIO()
+    img.save(buf, "JPEG")
+    image_dict = {
+        "Type": PdfName("XObject"),
+        "Subtype": PdfName("Image"),
+        "Width": img.width,
+        "Height": img.height,
+        "ColorSpace": device_colorspace(img.mode),
+        "BitsPerComponent": 8,
+        "Filter": PdfName("DCTDecode"),
+    }
+    if img.mode == "CMYK":
+        image_dict["Decode"] = [1, 0] * 4  # Pillow writes Adobe-style inverted CMYK
+    return EncodedPage(img.width, img.height, image_dict, buf.getvalue())
+
+
+def encode_image(img):
+    """Encode gambar Pillow jadi EncodedPage dengan codec yang dipilih classify_image
+
+    Profil ICC gambar ikut ke halaman (lihat icc_components).
+    """
+    page = _encode_page(flatten_for_page(img))
+    page.icc_profile = img.info.get("icc_profile")
+    return page
+
+
+def _encode_page(img):
+    if img.mode == "P":
+        return encode_indexed(img)
+    if img.mode == "CMYK":
+        # Only the small sample is converted to classify; the page stays CMYK
+        kind, _gray = classify_image(_classify_sample(img).convert("RGB"))
+        return encode_dct(img) if kind == "photo" else encode_flate(img)
+    kind, gray = classify_image(img)
+    if gray and img.mode != "L":
+        img = img.convert("L")
+    if kind == "bilevel":
+        return encode_flate(img.convert("1", dither=Image.Dither.NONE))
+    if kind == "indexed":
+        # Exact: the page has at most 256 colours, so nothing is merged
+        return encode_indexed(img.quantize(256, Image.Quantize.MAXCOVERAGE))
+    if kind == "graphics":
+        return encode_flate(img)
+    return encode_dct(img)
+
+
+# ---------------------------------------------------------------------------
+# Scan pre-processing
+#
+# Scanned pages often need the dark scanner border cropped, a small skew
+# straightened and washed-out contrast stretched. Doing that in a separate
+# tool costs a second decode and encode per image, so it runs here on the
+# decoded image right before encode_image. Each operation measures on a
+# reduced grayscale copy (at most ANALYSIS_SIZE px, as NumPy arrays) and then
+# makes a single Pillow call at full resolution (crop, rotate or a point
+# lookup table), so the full-size pixels are touched once per operation.
+#
+# Operations are chosen with set_preprocessing, PREPROCESS_ENV or the CLI
+# option --preprocess, and run in the given order. While any is active, JPEG
+# files are decoded instead of copied as they are; huge pages written band
+# by band are never pre-processed.
+# ---------------------------------------------------------------------------
+
+PREPROCESS_ENV = "CONVERT_IMG_PDF_PREPROCESS"
+ANALYSIS_SIZE = 1024
+BORDER_MIN_CONTRAST = 48  # gray levels between scanner border and paper
+MAX_SKEW_DEGREES = 5.0
+SKEW_COARSE_STEP = 0.5
+SKEW_FINE_STEP = 0.05
+SKEW_MAX_POINTS = 50_000
+CONTRAST_CLIP_PERCENT = 0.5  # darkest/brightest share mapped to black/white
+_preprocessing = None
+
+
+def _analysis_copy(img):
+    """(salinan kecil, array grayscale-nya, faktor skala) untuk pengukuran"""
+    import numpy as np
+    factor = max(1, -(-max(img.size) // ANALYSIS_SIZE))
+    small = img.reduce(factor) if factor > 1 else img
+    return small, np.asarray(small if small.mode == "L" else small.convert("L"), dtype=np.int16), factor
+
+
+def _paper_color(small):
+    """Warna kertas (median per channel) dalam mode gambar"""
+    from PIL import ImageStat
+    median = [int(v) for v in ImageStat.Stat(small).median]
+    return median[0] if len(median) == 1 else tuple(median)
+
+
+def auto_crop(img):
+    """Potong tepi scanner yang gelap/kontras di sekeliling kertas"""
+    import numpy as np
+    _small, gray, factor = _analysis_copy(img)
+    h, w = gray.shape
+    ring = max(1, min(h, w) // 50)
+    border = np.median(np.concatenate([
+        gray[:ring].ravel(), gray[-ring:].ravel(), gray[:, :ring].ravel(), gray[:, -ring:].ravel(),
+    ]))
+    paper = np.median(gray[h // 4:h * 3 // 4, w // 4:w * 3 // 4])
+    if abs(paper - border) < BORDER_MIN_CONTRAST:
+        return img  # no visible scanner border
+    # A row/column belongs to the page when most of its pixels look like paper
+    is_paper = np.abs(gray - paper) < np.abs(gray - border)
+    rows = np.flatnonzero(is_paper.mean(axis=1) > 0.5)
+    cols = np.flatnonzero(is_paper.mean(axis=0) > 0.5)
+    if not len(rows) or not len(cols):
+        return img
+    box = (
+        int(cols[0]) * factor,
+        int(rows[0]) * factor,
+        min(img.width, (int(cols[-1]) + 1) * factor),
+        min(img.height, (int(rows[-1]) + 1) * factor),
+    )
+    if box == (0, 0, img.width, img.height):
+        return img
+    return img.crop(box)
+
+
+def _best_skew(ys, xs, degrees):
+    """Sudut (derajat) yang membuat profil proyeksi baris paling tajam"""
+    import numpy as np
+    angles = np.radians(degrees)[:, None]
+    # Row of every ink point after rotating by each candidate angle, all at once
+    proj = np.rint(ys * np.cos(angles) - xs * np.sin(angles)).astype(np.int64)
+    proj -= proj.min()
+    span = int(proj.max()) + 1
+    counts = np.bincount((proj + np.arange(len(degrees))[:, None] * span).ravel(),
+                         minlength=len(degrees) * span).reshape(len(degrees), span)
+    # Text lines lined up with the rows give a few tall peaks: maximal sum of squares
+    return float(degrees[np.argmax((counts.astype(np.float64) ** 2).sum(axis=1))])
+
+
+def deskew(img):
+    """Luruskan halaman yang miring sampai MAX_SKEW_DEGREES"""
+    import numpy as np
+    small, gray, _factor = _analysis_copy(img)
+    paper = np.median(gray)
+    ink = gray < (paper + np.percentile(gray, 1)) / 2
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100 or len(ys) > ink.size // 2:
+        return img  # blank or mostly dark page: nothing reliable to measure
+    if len(ys) > SKEW_MAX_POINTS:
+        keep = np.linspace(0, len(ys) - 1, SKEW_MAX_POINTS).astype(np.int64)
+        ys, xs = ys[keep], xs[keep]
+    ys, xs = ys.astype(np.float64), xs.astype(np.float64)
+    coarse = _best_skew(ys, xs, np.arange(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + 1e-9, SKEW_COARSE_STEP))
+    angle = _best_skew(ys, xs, np.arange(coarse - SKEW_COARSE_STEP, coarse + SKEW_COARSE_STEP + 1e-9, SKEW_FINE_STEP))
+    if abs(angle) < SKEW_FINE_STEP:
+        return img
+    return img.rotate(angle, resample=Image.BICUBIC, fillcolor=_paper_color(small))
+
+
+def normalize_contrast(img):
+    """Regangkan kontras: CONTRAST_CLIP_PERCENT tergelap jadi hitam, terterang jadi putih"""
+    import numpy as np
+    _small, gray, _factor = _analysis_copy(img)
+    low, high = np.percentile(gray, [CONTRAST_CLIP_PERCENT, 100 - CONTRAST_CLIP_PERCENT])
+    if high - low < 16 or (low <= 2 and high >= 253):
+        return img  # flat page, or already using the full range
+    lut = np.clip(np.rint((np.arange(256) - low) * 255.0 / (high - low)), 0, 255).astype(np.uint8)
+    return img.point(lut.tolist() * len(img.getbands()))
+
+
+PREPROCESS_OPERATIONS = {
+    "crop": auto_crop,
+    "deskew": deskew,
+    "contrast": normalize_contrast,
+}
+
+
+def set_preprocessing(names):
+    """Set operasi pre-processing, mis. ["crop", "deskew", "contrast"] ([] = mati)"""
+    global _preprocessing
+    names = tuple(name.strip().lower() for name in names if name.strip())
+    unknown = [name for name in names if name not in PREPROCESS_OPERATIONS]
+    if unknown:
+        raise ValueError(f"Operasi tidak dikenal: {', '.join(unknown)}")
+    if names:
+        import numpy  # noqa: F401 - fail here, not once per image
+    _preprocessing = names
+
+
+def preprocessing():
+    """Operasi aktif: set_preprocessing, env CONVERT_IMG_PDF_PREPROCESS, atau tidak ada"""
+    if _preprocessing is None:
+        set_preprocessing(os.environ.get(PREPROCESS_ENV, "").split(","))
+    return _preprocessing
+
+
+def preprocess_image(img):
+    """Jalankan operasi pre-processing aktif pada gambar yang sudah di-decode"""
+    names = preprocessing()
+    if not names:
+        return img
+    img = flatten_for_page(img)
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+    for name in names:
+        img = PREPROCESS_OPERATIONS[name](img)
+    return img
+
+
+# ---------------------------------------------------------------------------
+# HEIC pipeline
+#
+# HEIC is what phones produce, so it has its own path on pillow-heif's image
+# API rather than the generic Pillow plugin route (or the imageio fallback:
+# a full NumPy array, then Image.fromarray, then convert - up to three
+# full-size copies). The primary image's size comes from the container
+# header, so the RAM budget is admitted with the exact cost. libheif decodes
+# once and the Pillow page is built from its buffer (shared as is for RGBA,
+# one packed copy for RGB); the libheif buffer is released before encoding
+# starts. When the budget calls for a smaller page, an embedded thumbnail
+# that is large enough is decoded instead of the full image. libheif drops
+# the GIL, so the parallel encoder decodes several HEIC files at once; the
+# cores are split between those decodes instead of each image also starting
+# libheif's own threads.
+# ---------------------------------------------------------------------------
+
+
+def is_heif(source):
+    """True jika isi file HEIC/HEIF (dari magic bytes, bukan ekstensi)"""
+    if isinstance(source, ArchiveMember):
+        head = source.data[:12]
+    else:
+        with open(source, "rb") as f:
+            head = f.read(12)
+    return sniff_format(head) == "HEIF"
+
+
+def open_heif_image(source):
+    """HeifImage utama (header saja, belum di-decode); pillow-heif diaktifkan lewat heif_supported"""
+    import pillow_heif
+    if isinstance(source, ArchiveMember):
+        data = source.data
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    # DECODE_THREADS is a module global read when the file is opened; the
+    # lock keeps another thread from changing it in between
+    with _heif_lock:
+        pillow_heif.options.DECODE_THREADS = decode_threads()
+        # Rows keep libheif's padding; frombuffer takes the stride, so no repacking copy
+        heif = pillow_heif.open_heif(data, convert_hdr_to_8bit=True, remove_stride=False)
+    return heif[heif.primary_index]
+
+
+def heif_thumbnail(image, target):
+    """Thumbnail tertanam terkecil yang minimal `target` dengan rasio sama, atau None"""
+    get_thumbnail = getattr(image, "get_thumbnail", None)  # pillow-heif >= 1.0
+    if get_thumbnail is None:
+        return None
+    width, height = image.size
+    best = None
+    for index in range(len(image.info.get("thumbnails", []))):
+        try:
+            thumbnail = get_thumbnail(index)
+        except Exception:
+            continue
+        t_width, t_height = thumbnail.size
+        if (thumbnail.mode != image.mode or t_width < target[0] or t_height < target[1] or t_width >= width
+                or abs(t_width * height - t_height * width) > 2 * max(width, height)):
+            continue
+        if best is None or t_width < best.size[0]:
+            best = thumbnail
+    return best
+
+
+def heif_to_pillow(image, target=None, icc_profile=None):
+    """Decode HeifImage (atau thumbnail) jadi Image Pillow, diperkecil sampai `target`"""
+    data = image.data  # decodes; the size is final only afterwards
+    img = Image.frombuffer(image.mode, image.size, data, "raw", image.mode, image.stride, 1)
+    if target is not None and img.width > target[0]:
+        img = img.reduce(max(1, img.width // target[0]))
+    if icc_profile:
+        img.info["icc_profile"] = icc_profile
+    return img
+
+
+def encode_heif_file(path, governor, cancel=None):
+    """Encode file HEIC/HEIF: biaya dari header, decode sekali, thumbnail jika cukup
+
+    libheif sudah menerapkan rotasi/mirror HEIF (irot/imir) saat decode, jadi
+    orientasi EXIF tidak dipakai.
+    """
+    image = open_heif_image(path)
+    governor.check_pixels(image.size)
+    width, height = image.size
+    icc_profile = image.info.get("icc_profile")
+    # libheif's buffer plus the Pillow page built from it (RGB is 4 bytes per pixel there)
+    bytes_per_pixel = len(image.mode.split(";")[0]) + 4
+    factor = governor.reduce_factor(width * height * bytes_per_pixel)
+    target = None
+    if factor > 1:
+        target = (max(1, width // factor), max(1, height // factor))
+        image = heif_thumbnail(image, target) or image
+    pending = [image]
+    del image
+    with governor.admit(pending[0].size[0] * pending[0].size[1] * bytes_per_pixel, cancel):
+        # pop() drops the last reference, so libheif's buffer is freed once
+        # the Pillow page exists, before encoding starts
+        page = timed_encode(lambda: heif_to_pillow(pending.pop(), target, icc_profile), (width, height))
+    return page
+
+
+# ---------------------------------------------------------------------------
+# Strip-wise pipeline for very large images
+#
+# A 30000x20000 scan needs ~1.8 GB as one RGB image, plus the encoder's
+# copy. Large pages are therefore written as a FlateDecode XObject whose
+# data is produced band by band while the writer streams it out. When the
+# raster is stored uncompressed (plain TIFF strips, BMP, PPM) each band is
+# read straight from the file, so peak memory is a single band; other
+# formats are decoded once but converted and compressed per band.
+# ---------------------------------------------------------------------------
+
+TILED_MIN_PIXELS = 64_000_000
+BAND_BYTES = 16 * 1024 * 1024
+_RAW_BAND_MODES = ("1", "L", "P", "RGB", "RGBA", "CMYK")
+
+
+def raw_band_reader(img):
+    """Fungsi (y, rows) -> Image yang membaca band langsung dari file, atau None
+
+    Hanya untuk raster tanpa kompresi yang disimpan sebagai satu blok "raw".
+    """
+    if getattr(img, "n_frames", 1) != 1 or len(img.tile) != 1 or img.mode not in _RAW_BAND_MODES:
+        return None
+    codec, extents, offset, args = img.tile[0][:4]
+    if codec != "raw" or tuple(extents) != (0, 0, img.width, img.height):
+        return None
+    if not isinstance(args, tuple):
+        args = (args,)
+    rawmode = args[0]
+    stride = args[1] if len(args) > 1 else 0
+    orientation = args[2] if len(args) > 2 else 1
+    if not stride:
+        bits = 1 if img.mode == "1" else len(img.getbands()) * 8
+        stride = (img.width * bits + 7) // 8
+    fp = img.fp
+    palette = header_palette(img) if img.mode == "P" else None
+
+    def read_band(y, rows):
+        # Bottom-up rasters (BMP) store the last row first
+        first_row = y if orientation >= 0 else img.height - y - rows
+        fp.seek(offset + first_row * stride)
+        data = fp.read(rows * stride)
+        if len(data) < rows * stride:
+            raise ValueError("File gambar terpotong (truncated)")
+        band = Image.frombytes(img.mode, (img.width, rows), data, "raw", rawmode, stride, orientation)
+        if palette is not None:
+            band.putpalette(palette)
+        if "transparency" in img.info:
+            band.info["transparency"] = img.info["transparency"]
+        return band
+
+    return read_band
+
+
+def iter_flate_bands(path, out_mode, band_rows, governor, cost, cancel=None):
+    """Hasilkan data FlateDecode gambar band demi band (dipanggil saat ditulis)"""
+    with governor.admit(cost, cancel), open_image(path, size_checked=True) as img:
+        read_band = raw_band_reader(img)
+        if read_band is None:
+            img.load()
+        compressor = zlib.compressobj(6)
+        for y in range(0, img.height, band_rows):
+            check_cancel(cancel)
+            rows = min(band_rows, img.height - y)
+            if read_band is not None:
+                band = read_band(y, rows)
+            else:
+                band = img.crop((0, y, img.width, y + rows))
+            if has_alpha(band):
+                band = flatten_for_page(band)
+            if band.mode != out_mode:
+                band = band.convert(out_mode)
+            chunk = compressor.compress(band.tobytes())
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+
+def encode_tiled(path, probe, governor, cancel=None):
+    """EncodedPage yang datanya di-stream per band, atau None jika tidak cocok"""
+    if probe.width * probe.height < TILED_MIN_PIXELS or getattr(probe, "n_frames", 1) != 1:
+        return None
+    if probe.mode in ("1", "L"):
+        out_mode, colorspace, bands = "L", PdfName("DeviceGray"), 1
+    elif probe.mode == "P" and not has_alpha(probe):
+        # Band rows are written as 8-bit indices into the original palette
+        out_mode, colorspace, bands = "P", palette_colorspace(probe)[0], 1
+    elif probe.mode == "CMYK":
+        out_mode, colorspace, bands = "CMYK", PdfName("DeviceCMYK"), 4
+    else:
+        out_mode, colorspace, bands = "RGB", PdfName("DeviceRGB"), 3
+    band_rows = max(1, BAND_BYTES // (probe.width * bands))
+    band_cost = 2 * band_rows * probe.width * bands
+    if raw_band_reader(probe) is not None:
+        cost = band_cost
+    else:
+        cost = probe.width * probe.height * len(probe.getbands()) + band_cost
+        if cost > governor.memory_budget:
+            # Cannot be decoded at full size at all; use the reduced-decode path
+            return None
+    page = EncodedPage(probe.width, probe.height, {
+        "Type": PdfName("XObject"),
+        "Subtype": PdfName("Image"),
+        "Width": probe.width,
+        "Height": probe.height,
+        "ColorSpace": colorspace,
+        "BitsPerComponent": 8,
+        "Filter": PdfName("FlateDecode"),
+    }, iter_flate_bands(path, out_mode, band_rows, governor, cost, cancel))
+    page.icc_profile = probe.info.get("icc_profile")
+    return page
+
+
+def timed_encode(decode, page_size=None):
+    """encode_image(preprocess_image(decode())); pre-processing dihitung sebagai waktu encode
+
+    `page_size` adalah ukuran pixel asli: jika decode() memperkecil gambar
+    (budget memori), halaman tetap seukuran aslinya dan hanya resolusi
+    sample gambar yang turun.
+    """
+    started = time.perf_counter()
+    img = decode()
+    decoded = time.perf_counter()
+    scale = (page_size[0] / img.width, page_size[1] / img.height) if page_size else (1, 1)
+    processed = preprocess_image(img)
+    page = encode_image(processed)
+    if ocr_language():
+        page.ocr_input = ocr_page_input(img, processed)
+    if scale != (1, 1):
+        page.width = max(1, round(page.width * scale[0]))
+        page.height = max(1, round(page.height * scale[1]))
+    page.decode_seconds = decoded - started
+    page.encode_seconds = time.perf_counter() - decoded
+    return page
+
+
+def encode_image_file(path, governor=None, cancel=None):
+    """Encode satu file gambar; JPEG RGB/Gray/CMYK disalin apa adanya tanpa decode"""
+    governor = governor or default_governor()
+    if is_heif(path):
+        if heif_supported():
+            return encode_heif_file(path, governor, cancel)
+        # imageio gives no header-only access; assume ~10:1 compression
+        with governor.admit(source_size(path) * 10, cancel):
+            return timed_encode(lambda: load_image(path))
+    with open_checked(path, governor) as probe:
+        orientation = read_orientation(probe)
+        if probe.format == "JPEG" and probe.mode in ("RGB", "L", "CMYK") and not preprocessing():
+            if isinstance(path, ArchiveMember):
+                data = path.data
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+            image_dict = {
+                "Type": PdfName("XObject"),
+                "Subtype": PdfName("Image"),
+                "Width": probe.width,
+                "Height": probe.height,
+                "ColorSpace": device_colorspace(probe.mode),
+                "BitsPerComponent": 8,
+                "Filter": PdfName("DCTDecode"),
+            }
+            decode = cmyk_decode(probe) if probe.mode == "CMYK" else None
+            if decode:
+                image_dict["Decode"] = decode
+            page = EncodedPage(probe.width, probe.height, image_dict, data, orientation)
+            page.icc_profile = probe.info.get("icc_profile")
+            return page
+        page = encode_tiled(path, probe, governor, cancel)
+        if page is not None:
+            page.orientation = orientation
+            return page
+        with governor.admit(decoded_cost(probe), cancel):
+            page = timed_encode(lambda: decode_within_budget(probe, governor), probe.size)
+    page.orientation = orientation
+    return page
+
+
+def scheduled_encode(path, governor=None, cancel=None):
+    """encode_image_file di dalam satu slot scheduler lokal"""
+    with job_slot(cancel):
+        return encode_image_file(path, governor, cancel)
+
+
+def iter_encoded_pages(paths, on_error=None, governor=None, cancel=None):
+    """Yield (path, EncodedPage) per file; file yang gagal dilaporkan ke on_error"""
+    for path in iter_valid_images(paths, on_error):
+        check_cancel(cancel)
+        try:
+            page = scheduled_encode(path, governor, cancel)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(path, e)
+            continue
+        yield path, page
+
+
+# Pages encoded ahead of the writer per worker; bounds the reorder buffer
+REORDER_WINDOW_PER_WORKER = 2
+
+
+def iter_encoded_pages_parallel(paths, on_error=None, governor=None, cancel=None, workers=None):
+    """Seperti iter_encoded_pages, tapi decode/encode jalan paralel
+
+    Hasil tetap di-yield sesuai urutan `paths`: future disimpan di antrian
+    berurutan (reorder buffer) berukuran terbatas, jadi halaman yang selesai
+    lebih dulu menunggu giliran tanpa menumpuk di memori. on_error juga
+    dipanggil berurutan dari thread pemanggil.
+    """
+    governor = governor or default_governor()
+    workers = workers or governor.max_workers
+    if workers <= 1:
+        yield from iter_encoded_pages(paths, on_error, governor, cancel)
+        return
+    paths = iter(paths)
+    pending = deque()
+    with encoder_pool(workers) as pool:
+        def submit_next():
+            for path in itertools.islice(paths, 1):
+                try:
+                    validate_image(path)
+                except (InvalidImageError, OSError) as e:
+                    # Fails in order like any other page, without a worker
+                    future = Future()
+                    future.set_exception(e)
+                else:
+                    future = pool.submit(scheduled_encode, path, governor, cancel)
+                pending.append((path, future))
+
+        try:
+            for _ in range(workers * REORDER_WINDOW_PER_WORKER):
+                submit_next()
+            while pending:
+                path, future = pending.popleft()
+                # Keep the window full while the writer waits for this page
+                submit_next()
+                check_cancel(cancel)
+                try:
+                    page = future.result()
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(path, e)
+                    continue
+                yield path, page
+        finally:
+            # Stopped early (error, cancel or consumer gone): drop queued work
+            for _path, future in pending:
+                future.cancel()
+
+
+# ---------------------------------------------------------------------------
+# OCR text layer
+#
+# OCR takes seconds per page where conversion takes milliseconds, so it must
+# not run inline in the encode loop. When enabled, attach_text_layers sits in
+# front of the writer: every encoded page is handed to a shared, bounded pool
+# (OCR_WORKERS tesseract processes at a time, each limited to one thread)
+# and the writer only waits for the page at the head of a bounded window,
+# while encoding and OCR of the following pages keep running. Results are
+# cached on disk by the hash of the image bytes, so re-running a folder does
+# not OCR it again. A page whose source tesseract cannot read as it is (or a
+# pre-processed page) is saved as PNG by timed_encode from the image it has
+# already decoded, so OCR never decodes the source a second time. The words are written as invisible text (render mode 3)
+# over the image, which makes the PDF searchable and selectable.
+#
+# tesseract is an optional external program: found on PATH or via
+# TESSERACT_ENV. Imported PDF pages and huge banded pages get no text layer.
+# ---------------------------------------------------------------------------
+
+OCR_LANGUAGE_ENV = "CONVERT_IMG_PDF_OCR"
+TESSERACT_ENV = "CONVERT_IMG_PDF_TESSERACT"
+DEFAULT_OCR_LANGUAGE = "eng"
+OCR_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+OCR_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "convert_img_pdf", "ocr")
+# Formats passed to tesseract as they are; anything else (or a pre-processed
+# page) is sent as PNG so the OCR sees exactly the pixels on the page
+OCR_NATIVE_FORMATS = ("JPEG", "PNG", "TIFF", "BMP")
+_ocr_language = None
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def tesseract_path():
+    """Path program tesseract, atau None jika tidak terpasang"""
+    return os.environ.get(TESSERACT_ENV, "").strip() or shutil.which("tesseract")
+
+
+def set_ocr_language(language):
+    """Aktifkan OCR dengan bahasa tesseract (mis. "eng", "ind+eng"); "" = mati"""
+    global _ocr_language
+    language = (language or "").strip()
+    if language and tesseract_path() is None:
+        raise FileNotFoundError("tesseract tidak ditemukan")
+    _ocr_language = language
+
+
+def ocr_language():
+    """Bahasa OCR aktif: set_ocr_language, env CONVERT_IMG_PDF_OCR, atau "" (mati)"""
+    if _ocr_language is None:
+        try:
+            set_ocr_language(os.environ.get(OCR_LANGUAGE_ENV, ""))
+        except FileNotFoundError:
+            set_ocr_language("")
+    return _ocr_language
+
+
+def ocr_page_input(decoded, processed):
+    """(PNG, ukuran) dari gambar yang sudah di-decode, atau None jika file sumbernya bisa langsung dipakai
+
+    Dipanggil saat encode, jadi OCR tidak perlu men-decode (dan
+    mem-pre-process) sumbernya lagi.
+    """
+    if not preprocessing() and decoded.format in OCR_NATIVE_FORMATS:
+        return None
+    img = flatten_for_page(processed)
+    buf = io.BytesIO()
+    img.save(buf, "PNG", compress_level=1)
+    return buf.getvalue(), img.size
+
+
+def _ocr_input(source, data):
+    """(bytes untuk tesseract, ukuran gambar yang di-OCR) untuk halaman tanpa ocr_input"""
+    with open_image(source) as img:
+        return ocr_page_input(img, preprocess_image(img)) or (data, img.size)
+
+
+def _run_tesseract(data, language, cancel=None):
+    """Jalankan tesseract (output TSV) pada data gambar; bisa dibatalkan"""
+    import subprocess
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")
+    proc = subprocess.Popen(
+        [tesseract_path(), "stdin", "stdout", "-l", language, "tsv"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+    )
+    try:
+        stdout, stderr = proc.communicate(data, timeout=QUEUE_POLL_SECONDS)
+    except subprocess.TimeoutExpired:
+        while True:
+            if cancel is not None and cancel.cancelled:
+                proc.kill()
+                proc.communicate()
+                raise ConversionCancelled()
+            try:
+                stdout, stderr = proc.communicate(timeout=QUEUE_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+    if proc.returncode != 0:
+        raise RuntimeError(f"tesseract gagal: {stderr.decode(errors='replace').strip()}")
+    return stdout.decode("utf-8", errors="replace")
+
+
+def ocr_image(source, language, cancel=None, prepared=None):
+    """OCR satu gambar; return (lebar, tinggi, [[x, y, w, h, teks], ...]) dalam pixel
+
+    `prepared` adalah EncodedPage.ocr_input; tanpa itu gambar dibaca dari `source`.
+    """
+    import hashlib
+    if isinstance(source, ArchiveMember):
+        data = source.data
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    key = hashlib.sha256(data)
+    key.update(f"\0{language}\0{','.join(preprocessing())}".encode("utf-8"))
+    cache_path = os.path.join(OCR_CACHE_DIR, key.hexdigest() + ".json")
+    with contextlib.suppress(OSError, ValueError, KeyError):
+        cached = _read_json(cache_path)
+        return cached["width"], cached["height"], cached["words"]
+    image_data, (width, height) = prepared or _ocr_input(source, data)
+    words = []
+    for line in _run_tesseract(image_data, language, cancel).splitlines()[1:]:
+        fields = line.split("\t")
+        # level 5 = word: level page block par line word left top width height conf text
+        if len(fields) == 12 and fields[0] == "5" and fields[11].strip():
+            words.append([int(fields[6]), int(fields[7]), int(fields[8]), int(fields[9]), fields[11].strip()])
+    with contextlib.suppress(OSError):
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        _write_json_atomic(cache_path, {"width": width, "height": height, "words": words})
+    return width, height, words
+
+
+def _ocr_executor():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # Shared by every output being written, so OCR load stays bounded
+            _ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+        return _ocr_pool
+
+
+def attach_text_layers(pages, language, cancel=None, on_error=None):
+    """Tambahkan hasil OCR (page.text_layer) ke halaman sambil tetap berurutan
+
+    Halaman gagal OCR tetap ditulis, hanya tanpa text layer; errornya
+    dilaporkan ke on_error(path, exception).
+    """
+    from concurrent.futures import wait
+    pool = _ocr_executor()
+    pages = iter(pages)
+    pending = deque()
+
+    def submit_next():
+        for path, page in itertools.islice(pages, 1):
+            future = None
+            if isinstance(page, EncodedPage) and isinstance(page.data, (bytes, bytearray)):
+                # The future keeps the PNG until OCR is done; the page need not
+                prepared, page.ocr_input = page.ocr_input, None
+                future = pool.submit(ocr_image, path, language, cancel, prepared)
+            pending.append((path, page, future))
+
+    try:
+        for _ in range(OCR_WORKERS * REORDER_WINDOW_PER_WORKER):
+            submit_next()
+        while pending:
+            path, page, future = pending.popleft()
+            submit_next()
+            if future is not None:
+                while not wait([future], timeout=QUEUE_POLL_SECONDS).done:
+                    check_cancel(cancel)
+                check_cancel(cancel)
+                try:
+                    page.text_layer = future.result()
+                except Exception as e:
+                    if on_error is not None:
+                        on_error(path, e)
+            yield path, page
+    finally:
+        for _path, _page, future in pending:
+            if future is not None:
+                future.cancel()
+
+
+def text_layer_content(page, mirror=False):
+    """Operator content stream untuk teks OCR tak terlihat di atas gambar"""
+    ocr_width, ocr_height, words = page.text_layer
+    sx, sy = page.width / ocr_width, page.height / ocr_height
+    ops = [b"BT 3 Tr"]
+    for left, top, width, height, text in words:
+        raw = text.encode("cp1252", errors="replace")
+        size = max(1.0, height * sy)
+        x = page.width - (left + width) * sx if mirror else left * sx
+        y = page.height - (top + height) * sy
+        # Stretch the word to its box; Helvetica averages about half an em per glyph
+        scale = 100.0 * width * sx / (size * 0.5 * len(raw))
+        ops.append(b"/ocr %s Tf %s Tz 1 0 0 1 %s %s Tm %s Tj" % (
+            pdf_serialize(float(size)), pdf_serialize(scale), pdf_serialize(float(x)),
+            pdf_serialize(float(y)), pdf_serialize(raw),
+        ))
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+# Non-stream objects packed per object stream in `object_streams` mode
+OBJECT_STREAM_SIZE = 200
+
+# Page keys that point back into the source document's structure (page
+# tree, annotations, structure tree) and are not copied by a page import
+IMPORT_SKIPPED_PAGE_KEYS = ("Parent", "Annots", "B", "StructParents", "Thumb")
+
+
+class PdfStreamWriter:
+    """Tulis PDF secara bertahap ke stream biner apa pun, tanpa seek
+
+    Dengan `object_streams=True` (PDF 1.5) objek kecil seperti page dict
+    dikemas ke object stream terkompresi dan xref ditulis sebagai xref
+    stream, jadi PDF gabungan ribuan halaman lebih kecil dan cepat dibuka.
+    """
+
+    def __init__(self, stream, cancel=None, object_streams=False):
+        self._stream = stream
+        self._cancel = cancel
+        self._object_streams = object_streams
+        self._offset = 0
+        # num -> byte offset, or (object stream num, index) for packed objects
+        self._offsets = {}
+        self._packed = []
+        self._next_num = 1
+        self._page_refs = []
+        self._outline = []  # (title, page ref), written by close()
+        self.info = {}  # document information dictionary (/Title, /Subject, ...)
+        self._ocr_font_ref = None
+        self._icc_refs = {}  # ICC profile bytes -> ref, so each profile is written once
+        self._pages_ref = self.alloc()
+        self._closed = False
+        version = b"1.5" if object_streams else b"1.4"
+        self._write(b"%PDF-" + version + b"\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self):
+        return len(self._page_refs)
+
+    @property
+    def bytes_written(self):
+        return self._offset
+
+    def alloc(self):
+        ref = PdfRef(self._next_num)
+        self._next_num += 1
+        return ref
+
+    def _write(self, data):
+        self._stream.write(data)
+        self._offset += len(data)
+
+    def write_object(self, ref, value, data=None):
+        """Tulis objek `ref`; jika `data` diberikan, objek ditulis sebagai stream
+
+        `data` boleh berupa iterable chunk bytes; panjangnya lalu ditulis
+        sebagai objek /Length terpisah setelah stream selesai.
+        """
+        if data is None and self._object_streams:
+            self._packed.append((ref.num, pdf_serialize(value)))
+            if len(self._packed) >= OBJECT_STREAM_SIZE:
+                self._flush_object_stream()
+            return
+        self._offsets[ref.num] = self._offset
+        if data is None:
+            self._write(b"%d 0 obj\n" % ref.num + pdf_serialize(value) + b"\nendobj\n")
+            return
+        if isinstance(data, (bytes, bytearray)):
+            value = dict(value, Length=len(data))
+            self._write(b"%d 0 obj\n" % ref.num + pdf_serialize(value) + b"\nstream\n")
+            self._write(data)
+            self._write(b"\nendstream\nendobj\n")
+            return
+        length_ref = self.alloc()
+        value = dict(value, Length=length_ref)
+        self._write(b"%d 0 obj\n" % ref.num + pdf_serialize(value) + b"\nstream\n")
+        length = 0
+        for chunk in data:
+            self._write(chunk)
+            length += len(chunk)
+        self._write(b"\nendstream\nendobj\n")
+        self.write_object(length_ref, length)
+
+    def _flush_object_stream(self):
+        """Tulis objek yang tertunda sebagai satu /ObjStm terkompresi"""
+        if not self._packed:
+            return
+        stream_ref = self.alloc()
+        header, body = [], []
+        position = 0
+        for index, (num, serialized) in enumerate(self._packed):
+            header.append(b"%d %d" % (num, position))
+            body.append(serialized)
+            position += len(serialized) + 1
+            self._offsets[num] = (stream_ref.num, index)
+        header = b" ".join(header) + b"\n"
+        data = zlib.compress(header + b"\n".join(body) + b"\n")
+        count = len(self._packed)
+        self._packed = []
+        self.write_object(stream_ref, {
+            "Type": PdfName("ObjStm"),
+            "N": count,
+            "First": len(header),
+            "Filter": PdfName("FlateDecode"),
+        }, data)
+
+    def _write_xref_table(self, catalog_ref, info_ref=None):
+        """Tulis xref table klasik + trailer; return offset-nya"""
+        xref_offset = self._offset
+        size = self._next_num
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for num in range(1, size):
+            offset = self._offsets.get(num)
+            if offset is None:
+                lines.append(b"0000000000 65535 f \n")
+            else:
+                lines.append(b"%010d 00000 n \n" % offset)
+        self._write(b"".join(lines))
+        trailer = {"Size": size, "Root": catalog_ref}
+        if info_ref is not None:
+            trailer["Info"] = info_ref
+        self._write(b"trailer\n" + pdf_serialize(trailer) + b"\n")
+        return xref_offset
+
+    def _write_xref_stream(self, catalog_ref, info_ref=None):
+        """Tulis xref sebagai stream (PDF 1.5); return offset-nya"""
+        xref_ref = self.alloc()
+        xref_offset = self._offset
+        self._offsets[xref_ref.num] = xref_offset
+        size = self._next_num
+        offset_width = max(1, (xref_offset.bit_length() + 7) // 8)
+        rows = [b"\x00" + (0).to_bytes(offset_width, "big") + b"\xff\xff"]
+        for num in range(1, size):
+            entry = self._offsets.get(num)
+            if entry is None:
+                rows.append(b"\x00" + (0).to_bytes(offset_width, "big") + b"\x00\x00")
+            elif isinstance(entry, tuple):
+                rows.append(b"\x02" + entry[0].to_bytes(offset_width, "big") + entry[1].to_bytes(2, "big"))
+            else:
+                rows.append(b"\x01" + entry.to_bytes(offset_width, "big") + b"\x00\x00")
+        trailer = {
+            "Type": PdfName("XRef"),
+            "Size": size,
+            "W": [1, offset_width, 2],
+            "Root": catalog_ref,
+            "Filter": PdfName("FlateDecode"),
+        }
+        if info_ref is not None:
+            trailer["Info"] = info_ref
+        self.write_object(xref_ref, trailer, zlib.compress(b"".join(rows)))
+        return xref_offset
+
+    def add_page(self, page):
+        check_cancel(self._cancel)
+        if isinstance(page, ImportedPage):
+            return self._finish_page(self._add_imported_page(page))
+        image_ref = self.alloc()
+        content_ref = self.alloc()
+        page_ref = self.alloc()
+        image_dict = page.image_dict
+        if page.icc_profile:
+            image_dict = dict(image_dict, ColorSpace=self._icc_colorspace(image_dict["ColorSpace"], page.icc_profile))
+        self.write_object(image_ref, image_dict, page.data)
+        mirror, rotate = ORIENTATION_TRANSFORMS.get(page.orientation, (False, 0))
+        if mirror:
+            content = b"q -%d 0 0 %d %d 0 cm /image Do Q" % (page.width, page.height, page.width)
+        else:
+            content = b"q %d 0 0 %d 0 0 cm /image Do Q" % (page.width, page.height)
+        resources = {"XObject": {"image": image_ref}}
+        if page.text_layer:
+            content += b"\n" + text_layer_content(page, mirror)
+            resources["Font"] = {"ocr": self._ocr_font()}
+        self.write_object(content_ref, {}, content)
+        page_dict = {
+            "Type": PdfName("Page"),
+            "Parent": self._pages_ref,
+            "MediaBox": [0, 0, page.width, page.height],
+            "Resources": resources,
+            "Contents": content_ref,
+        }
+        if rotate:
+            page_dict["Rotate"] = rotate
+        self.write_object(page_ref, page_dict)
+        return self._finish_page(page_ref)
+
+    def _ocr_font(self):
+        """Font untuk text layer OCR, ditulis sekali per PDF"""
+        if self._ocr_font_ref is None:
+            self._ocr_font_ref = self.alloc()
+            self.write_object(self._ocr_font_ref, {
+                "Type": PdfName("Font"),
+                "Subtype": PdfName("Type1"),
+                "BaseFont": PdfName("Helvetica"),
+                "Encoding": PdfName("WinAnsiEncoding"),
+            })
+        return self._ocr_font_ref
+
+    def _icc_colorspace(self, colorspace, profile):
+        """`colorspace` dengan profil ICC sebagai /ICCBased (juga basis /Indexed), jika cocok"""
+        indexed = isinstance(colorspace, list)
+        base = colorspace[1] if indexed else colorspace
+        components = icc_components(profile)
+        if components is None or base != DEVICE_COLORSPACES[components]:
+            return colorspace
+        ref = self._icc_refs.get(profile)
+        if ref is None:
+            ref = self._icc_refs[profile] = self.alloc()
+            self.write_object(ref, {
+                "N": components,
+                "Alternate": base,
+                "Filter": PdfName("FlateDecode"),
+            }, zlib.compress(profile, 6))
+        icc = [PdfName("ICCBased"), ref]
+        return [colorspace[0], icc, *colorspace[2:]] if indexed else icc
+
+    def _add_imported_page(self, page):
+        """Salin page dict dari PDF lain beserta semua objek yang dirujuknya
+
+        Objek yang rusak di sumber menjadi PdfImportError. Objek yang sudah
+        tersalin tetap ada di output tanpa dirujuk halaman mana pun.
+        """
+        page.bytes_in = 0
+        try:
+            page_dict = {
+                key: self._import_value(page, value) for key, value in page.page_dict.items()
+                if key not in IMPORT_SKIPPED_PAGE_KEYS
+            }
+        except PDF_READ_ERRORS as e:
+            raise PdfImportError(f"Halaman PDF tidak bisa disalin: {e}") from e
+        page_dict["Parent"] = self._pages_ref
+        page_ref = self.alloc()
+        self.write_object(page_ref, page_dict)
+        return page_ref
+
+    def _import_value(self, page, value):
+        if isinstance(value, PdfRef):
+            ref = page.memo.get(value.num)
+            if ref is None:
+                # Remember the new number first so reference cycles terminate
+                ref = page.memo[value.num] = self.alloc()
+                obj, data = page.source.load(value.num)
+                if data is not None:
+                    # Streams keep their filters and bytes; /Length is recomputed
+                    obj = {k: v for k, v in obj.items() if k != "Length"}
+                    page.bytes_in += len(data)
+                self.write_object(ref, self._import_value(page, obj), data)
+            return ref
+        if isinstance(value, dict):
+            return {key: self._import_value(page, v) for key, v in value.items()}
+        if isinstance(value, list):
+            return [self._import_value(page, v) for v in value]
+        return value
+
+    def _finish_page(self, page_ref):
+        self._page_refs.append(page_ref)
+        # Let pipe readers start consuming the page immediately
+        flush = getattr(self._stream, "flush", None)
+        if flush is not None:
+            flush()
+        return page_ref
+
+    def add_outline_item(self, title, page_ref):
+        """Tambah bookmark level atas ke halaman `page_ref` (ditulis saat close)"""
+        self._outline.append((title, page_ref))
+
+    def _write_outline(self):
+        """Tulis /Outlines dari bookmark yang dikumpulkan; return ref-nya atau None"""
+        if not self._outline:
+            return None
+        outlines_ref = self.alloc()
+        item_refs = [self.alloc() for _ in self._outline]
+        for index, (title, page_ref) in enumerate(self._outline):
+            item = {
+                "Title": title,
+                "Parent": outlines_ref,
+                "Dest": [page_ref, PdfName("Fit")],
+            }
+            if index > 0:
+                item["Prev"] = item_refs[index - 1]
+            if index + 1 < len(item_refs):
+                item["Next"] = item_refs[index + 1]
+            self.write_object(item_refs[index], item)
+        self.write_object(outlines_ref, {
+            "Type": PdfName("Outlines"),
+            "First": item_refs[0],
+            "Last": item_refs[-1],
+            "Count": len(item_refs),
+        })
+        return outlines_ref
+
+    def close(self):
+        """Tulis page tree, bookmark, info, catalog, xref dan trailer (stream tidak ditutup)"""
+        if self._closed:
+            return
+        self._closed = True
+        self.write_object(self._pages_ref, {
+            "Type": PdfName("Pages"),
+            "Kids": self._page_refs,
+            "Count": len(self._page_refs),
+        })
+        catalog = {"Type": PdfName("Catalog"), "Pages": self._pages_ref}
+        outlines_ref = self._write_outline()
+        if outlines_ref is not None:
+            catalog["Outlines"] = outlines_ref
+            catalog["PageMode"] = PdfName("UseOutlines")
+        catalog_ref = self.alloc()
+        self.write_object(catalog_ref, catalog)
+        info_ref = None
+        if self.info:
+            info_ref = self.alloc()
+            self.write_object(info_ref, self.info)
+
+        if self._object_streams:
+            self._flush_object_stream()
+            xref_offset = self._write_xref_stream(catalog_ref, info_ref)
+        else:
+            xref_offset = self._write_xref_table(catalog_ref, info_ref)
+        self._write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+        flush = getattr(self._stream, "flush", None)
+        if flush is not None:
+            flush()
+
+
+def pdf_date(moment=None):
+    """Tanggal format PDF: D:YYYYMMDDHHmmSS+07'00'"""
+    moment = (moment or datetime.now()).astimezone()
+    offset = moment.strftime("%z") or "+0000"
+    return moment.strftime("D:%Y%m%d%H%M%S") + f"{offset[:3]}'{offset[3:]}'"
+
+
+def outline_title(source, root=None):
+    """Judul bookmark: nama subfolder di bawah `root` (atau direktori top-level arsip), selain itu nama file"""
+    if isinstance(source, ArchiveMember):
+        parts = source.name.split("/")
+    else:
+        path = os.fspath(source)
+        relative = os.path.relpath(path, root) if root else os.path.basename(path)
+        parts = [os.path.basename(path)] if relative.startswith(os.pardir) else relative.split(os.sep)
+    return parts[0] if len(parts) > 1 else os.path.splitext(parts[0])[0]
+
+
+def write_pdf(pages, stream, cancel=None, object_streams=False, on_page=None, title=None, outline=None,
+              on_error=None):
+    """Tulis iterable (path, EncodedPage) ke stream; return jumlah halaman
+
+    on_page(path, page, bytes_out) dipanggil setelah tiap halaman ditulis;
+    on_error(path, exception) menerima kegagalan OCR (halamannya tetap ditulis)
+    dan PdfImportError (sisa halaman PDF itu dilewati).
+    outline(path) -> judul membuat 1 bookmark tiap kali judulnya berganti;
+    bookmark dan info (judul, tanggal, jumlah file sumber) ikut ditulis di
+    akhir file yang sama, tanpa pass kedua.
+    """
+    writer = PdfStreamWriter(stream, cancel, object_streams)
+    language = ocr_language()
+    if language:
+        pages = attach_text_layers(pages, language, cancel, on_error)
+    sources = set()
+    broken = set()  # PdfFile objects a page could not be copied from
+    last_title = None
+    for path, page in pages:
+        if isinstance(page, ImportedPage) and page.source in broken:
+            continue
+        offset = writer.bytes_written
+        started = time.perf_counter()
+        try:
+            page_ref = writer.add_page(page)
+        except PdfImportError as e:
+            if on_error is None:
+                raise
+            # Objects the file's pages share may be the broken ones: skip the rest of it
+            broken.add(page.source)
+            on_error(path, e)
+            continue
+        if isinstance(page, EncodedPage) and not isinstance(page.data, (bytes, bytearray)):
+            # Banded pages are decoded and compressed while being written
+            page.encode_seconds += time.perf_counter() - started
+        sources.add(os.fspath(path))
+        if outline is not None:
+            page_title = outline(path)
+            if page_title and page_title != last_title:
+                writer.add_outline_item(page_title, page_ref)
+            last_title = page_title
+        if on_page is not None:
+            on_page(path, page, writer.bytes_written - offset)
+    writer.info = {
+        "Producer": "CONVERT_IMG_PDF",
+        "CreationDate": pdf_date(),
+        "Subject": f"{writer.page_count} halaman dari {len(sources)} file sumber",
+    }
+    if title:
+        writer.info["Title"] = title
+    writer.close()
+    return writer.page_count
+
+
+# ---------------------------------------------------------------------------
+# PDF import (object-level merge)
+#
+# Re-merging PDFs that were already converted must not decode any image
+# again. PdfFile is a small reader for the PDFs this app writes (classic
+# xref tables, xref/object streams, and older Pillow output): it resolves
+# objects lazily from a memory-mapped file. Importing a page copies its
+# dictionary and everything it references into the output under new object
+# numbers; streams are copied byte for byte, still compressed.
+# ---------------------------------------------------------------------------
+
+_PDF_WHITESPACE = b"\x00\t\n\x0c\r "
+_PDF_DELIMITERS = b"()<>[]{}/%"
+_PDF_TOKEN = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]+")
+_PDF_REF_TAIL = re.compile(rb"\s+\d+\s+R(?=[\x00\t\n\x0c\r ()<>\[\]{}/%]|$)")
+_PDF_INHERITED = ("Resources", "MediaBox", "CropBox", "Rotate")
+
+
+class PdfSyntaxError(ValueError):
+    """PDF tidak bisa dibaca oleh PdfFile"""
+
+
+class PdfImportError(PdfSyntaxError):
+    """Halaman PDF sumber tidak bisa disalin (referensi rusak, filter tidak didukung, ...)"""
+
+
+# What a damaged PDF raises while PdfFile parses it (not I/O errors of the output)
+PDF_READ_ERRORS = (ValueError, KeyError, IndexError, TypeError, zlib.error)
+
+
+def _png_unpredict(data, columns, colors=1, bits=8):
+    """Balikkan PNG predictor (/Predictor >= 10) pada data FlateDecode"""
+    bpp = max(1, colors * bits // 8)
+    row_size = (columns * colors * bits + 7) // 8
+    out = bytearray()
+    prev = bytearray(row_size)
+    for start in range(0, len(data), row_size + 1):
+        kind, row = data[start], bytearray(data[start + 1:start + 1 + row_size])
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            up = prev[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif kind == 4:
+                upleft = prev[i - bpp] if i >= bpp else 0
+                p = left + up - upleft
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upleft)
+                row[i] = (row[i] + (left if pa <= pb and pa <= pc else up if pb <= pc else upleft)) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
+
+
+class PdfFile:
+    """Pembaca PDF minimal: xref, objek (termasuk object stream) dan page tree"""
+
+    def __init__(self, path):
+        import mmap
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise PdfSyntaxError("File PDF kosong")
+        self._xref = {}
+        self._objstm_cache = {}
+        try:
+            start = self._buf.rfind(b"startxref")
+            if start < 0:
+                raise PdfSyntaxError("startxref tidak ditemukan")
+            offset, _ = self._parse(start + len(b"startxref"))
+            self.trailer = self._read_xref(offset)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- tokenizer / parser -------------------------------------------------
+
+    def _skip(self, pos):
+        buf = self._buf
+        while pos < len(buf):
+            c = buf[pos]
+            if c in _PDF_WHITESPACE:
+                pos += 1
+            elif c == 0x25:  # % comment
+                end = buf.find(b"\n", pos)
+                pos = len(buf) if end < 0 else end + 1
+            else:
+                break
+        return pos
+
+    def _parse(self, pos):
+        """Parse satu nilai PDF mulai dari `pos`; return (nilai, posisi berikutnya)"""
+        buf = self._buf
+        pos = self._skip(pos)
+        c = buf[pos:pos + 1]
+        if c == b"/":
+            match = _PDF_TOKEN.match(buf, pos + 1)
+            raw = match.group() if match else b""
+            name = re.sub(rb"#([0-9A-Fa-f]{2})", lambda m: bytes([int(m.group(1), 16)]), raw)
+            return PdfName(name.decode("latin-1")), pos + 1 + len(raw)
+        if c == b"<":
+            if buf[pos + 1:pos + 2] == b"<":
+                result, pos = {}, pos + 2
+                while True:
+                    pos = self._skip(pos)
+                    if buf[pos:pos + 2] == b">>":
+                        return result, pos + 2
+                    key, pos = self._parse(pos)
+                    result[key], pos = self._parse(pos)
+            end = buf.find(b">", pos)
+            digits = bytes(buf[pos + 1:end]).translate(None, _PDF_WHITESPACE)
+            return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii")), end + 1
+        if c == b"[":
+            result, pos = [], pos + 1
+            while True:
+                pos = self._skip(pos)
+                if buf[pos:pos + 1] == b"]":
+                    return result, pos + 1
+                value, pos = self._parse(pos)
+                result.append(value)
+        if c == b"(":
+            return self._parse_literal(pos + 1)
+        match = _PDF_TOKEN.match(buf, pos)
+        if not match:
+            raise PdfSyntaxError(f"Token tidak dikenal di offset {pos}")
+        token, end = match.group(), match.end()
+        if token == b"true":
+            return True, end
+        if token == b"false":
+            return False, end
+        if token == b"null":
+            return None, end
+        try:
+            number = int(token)
+        except ValueError:
+            try:
+                return float(token), end
+            except ValueError:
+                return PdfName(token.decode("latin-1")), end  # keyword (obj, stream, R ...)
+        # "num gen R" is an indirect reference
+        ref = _PDF_REF_TAIL.match(buf, end)
+        if ref:
+            return PdfRef(number), ref.end()
+        return number, end
+
+    def _parse_literal(self, pos):
+        buf = self._buf
+        out, depth = bytearray(), 1
+        escapes = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f"}
+        while True:
+            c = buf[pos]
+            pos += 1
+            if c == 0x5C:  # backslash
+                c = buf[pos]
+                pos += 1
+                if c in escapes:
+                    out += escapes[c]
+                elif 0x30 <= c <= 0x37:
+                    digits = bytes([c])
+                    while len(digits) < 3 and 0x30 <= buf[pos] <= 0x37:
+                        digits += bytes([buf[pos]])
+                        pos += 1
+                    out.append(int(digits, 8) & 0xFF)
+                elif c in (0x0D, 0x0A):
+                    if c == 0x0D and buf[pos] == 0x0A:
+                        pos += 1
+                else:
+                    out.append(c)
+                continue
+            if c == 0x28:
+                depth += 1
+            elif c == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return bytes(out), pos
+            out.append(c)
+
+    # -- objects ------------------------------------------------------------
+
+    def _read_xref(self, offset):
+        """Baca xref (table atau stream) mulai dari offset, ikuti /Prev; return trailer"""
+        trailer = None
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            pos = self._skip(offset)
+            if self._buf[pos:pos + 4] == b"xref":
+                section = self._read_xref_table(pos + 4)
+            else:
+                section = self._read_xref_stream(pos)
+            if "Encrypt" in section:
+                # Streams and strings would need the password to decrypt; copied
+                # as-is they would come out as garbage pages
+                raise PdfSyntaxError("PDF terenkripsi tidak didukung")
+            trailer = trailer or section
+            offset = section.get("Prev")
+        return trailer
+
+    def _read_xref_table(self, pos):
+        buf = self._buf
+        while True:
+            pos = self._skip(pos)
+            if buf[pos:pos + 7] == b"trailer":
+                section, _ = self._parse(pos + 7)
+                return section
+            first, pos = self._parse(pos)
+            count, pos = self._parse(pos)
+            for num in range(first, first + count):
+                offset, pos = self._parse(pos)
+                _gen, pos = self._parse(pos)
+                kind, pos = self._parse(pos)
+                if kind == "n" and num not in self._xref:
+                    self._xref[num] = offset
+
+    def _read_xref_stream(self, pos):
+        section, data = self._read_indirect(pos)
+        widths = section["W"]
+        index = section.get("Index", [0, section["Size"]])
+        row_size = sum(widths)
+        row = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for num in range(first, first + count):
+                fields, start = [], row * row_size
+                for width in widths:
+                    fields.append(int.from_bytes(data[start:start + width], "big") if width else None)
+                    start += width
+                row += 1
+                kind = 1 if fields[0] is None else fields[0]
+                if num in self._xref or kind == 0:
+                    continue
+                self._xref[num] = fields[1] if kind == 1 else (fields[1], fields[2])
+        return section
+
+    def _decode_stream(self, value, data):
+        filters = value.get("Filter")
+        filters = filters if isinstance(filters, list) else [filters] if filters else []
+        if any(f != "FlateDecode" for f in filters):
+            raise PdfSyntaxError(f"Filter tidak didukung: {filters}")
+        for _ in filters:
+            data = zlib.decompress(data)
+        parms = value.get("DecodeParms") or {}
+        if isinstance(parms, list):
+            parms = parms[0] or {}
+        if parms.get("Predictor", 1) >= 10:
+            data = _png_unpredict(data, parms.get("Columns", 1), parms.get("Colors", 1),
+                                  parms.get("BitsPerComponent", 8))
+        return data
+
+    def _read_indirect(self, pos):
+        """Objek 'num gen obj' di pos; return (nilai, data stream mentah atau None)"""
+        _num, pos = self._parse(pos)
+        _gen, pos = self._parse(pos)
+        keyword, pos = self._parse(pos)
+        if keyword != "obj":
+            raise PdfSyntaxError(f"Objek rusak di offset {pos}")
+        value, pos = self._parse(pos)
+        after = self._skip(pos)
+        if self._buf[after:after + 6] != b"stream":
+            return value, None
+        start = after + 6
+        if self._buf[start:start + 2] == b"\r\n":
+            start += 2
+        elif self._buf[start:start + 1] in (b"\n", b"\r"):
+            start += 1
+        length = self.resolve(value.get("Length"))
+        data = bytes(self._buf[start:start + length])
+        if value.get("Type") in ("XRef", "ObjStm"):
+            data = self._decode_stream(value, data)
+        return value, data
+
+    def load(self, num):
+        """Return (nilai, data stream mentah atau None) untuk objek `num`"""
+        entry = self._xref.get(num)
+        if entry is None:
+            return None, None
+        if isinstance(entry, tuple):
+            stream_num, index = entry
+            if stream_num not in self._objstm_cache:
+                header, data = self.load(stream_num)
+                numbers = data[:header["First"]].split()
+                offsets = [int(o) for o in numbers[1::2]]
+                self._objstm_cache = {stream_num: (header["First"], offsets, data)}
+            first, offsets, data = self._objstm_cache[stream_num]
+            # Parse from the object stream's decoded bytes with a throwaway buffer
+            saved, self._buf = self._buf, data
+            try:
+                value, _ = self._parse(first + offsets[index])
+            finally:
+                self._buf = saved
+            return value, None
+        return self._read_indirect(entry)
+
+    def resolve(self, value):
+        while isinstance(value, PdfRef):
+            value = self.load(value.num)[0]
+        return value
+
+    def pages(self):
+        """Yield page dict (atribut turunan sudah digabung) sesuai urutan"""
+        root = self.resolve(self.trailer["Root"])
+        stack = [(root["Pages"], {})]
+        visited = set()
+        while stack:
+            node, inherited = stack.pop()
+            if isinstance(node, PdfRef):
+                if node.num in visited:
+                    continue  # broken page tree with a cycle
+                visited.add(node.num)
+                node = self.resolve(node)
+            inherited = dict(inherited, **{k: node[k] for k in _PDF_INHERITED if k in node})
+            kids = node.get("Kids")
+            if kids is None or node.get("Type") == "Page":
+                yield dict(inherited, **node)
+                continue
+            for kid in reversed(self.resolve(kids)):
+                stack.append((kid, inherited))
+
+
+class ImportedPage:
+    """Halaman dari PDF yang sudah ada, disalin apa adanya oleh PdfStreamWriter"""
+
+    def __init__(self, source, page_dict, memo):
+        self.source = source
+        self.page_dict = page_dict
+        self.memo = memo  # source object number -> PdfRef in the output, shared per file
+        self.orientation = 1
+        self.decode_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.bytes_in = None  # set by the writer to the stream bytes it copied
+
+
+def is_pdf(path):
+    return os.fspath(path).lower().endswith(".pdf")
+
+
+# Default names of merged PDFs ("Merged_All_..." in folder mode, "Merged_..." in files mode)
+_MERGED_NAME_RE = re.compile(r"Merged(_All)?_\d{8}_\d{6}(\(\d+\))?")
+
+
+def is_merged_output(name, merged_name=None):
+    """True untuk PDF gabungan buatan aplikasi ini (nama default, atau merged_name + "(n)")"""
+    base = os.path.splitext(os.path.basename(name))[0]
+    if _MERGED_NAME_RE.fullmatch(base):
+        return True
+    if merged_name:
+        merged_base = os.path.splitext(merged_name)[0]
+        return re.fullmatch(re.escape(merged_base) + r"(\(\d+\))?", base) is not None
+    return False
+
+
+def iter_pdf_pages(path, on_error=None):
+    """Yield (path, ImportedPage) untuk setiap halaman PDF; error dilaporkan ke on_error
+
+    Halaman harus ditulis sebelum halaman berikutnya diambil, karena file
+    PDF-nya ditutup begitu iterasi selesai.
+    """
+    try:
+        source = PdfFile(path)
+    except Exception as e:
+        if on_error is None:
+            raise
+        on_error(path, e)
+        return
+    memo = {}
+    with source:
+        try:
+            for page_dict in source.pages():
+                yield path, ImportedPage(source, page_dict, memo)
+        except PDF_READ_ERRORS as e:
+            if on_error is None:
+                raise
+            on_error(path, e)
+
+
+def iter_input_pages(paths, on_error=None, governor=None, cancel=None):
+    """Halaman dari campuran gambar, arsip dan PDF sesuai urutan
+
+    PDF diimpor di level objek (tanpa decode); gambar yang berurutan
+    di-encode paralel lewat iter_encoded_pages_parallel.
+    """
+    for pdf_group, group in itertools.groupby(paths, key=is_pdf):
+        if not pdf_group:
+            yield from iter_encoded_pages_parallel(iter_sources(group), on_error, governor, cancel)
+            continue
+        for path in group:
+            check_cancel(cancel)
+            yield from iter_pdf_pages(path, on_error)
+
+
+# ---------------------------------------------------------------------------
+# Atomic output files
+#
+# PDFs are written to a hidden ".part" file next to the destination, fsynced,
+# and only then published under their final name. Publishing uses os.link (or
+# an O_EXCL reservation where hard links are unsupported), so an existing
+# file is never clobbered and two concurrent runs can never pick the same
+# name. A crash leaves at most a ".part" file, which the next run removes.
+# The ".part" name carries host and PID: output folders may be shared by
+# several machines (distributed mode), and a PID only means something on the
+# host that wrote it, so another host's files are judged by their age.
+# ---------------------------------------------------------------------------
+
+PARTIAL_SUFFIX = ".part"
+_name_index = {}  # (folder, base, ext) -> next "(n)" counter worth trying after a collision
+_NUMBERED_NAME_RE = re.compile(r"(.+)\((\d+)\)")
+_name_index_lock = threading.Lock()
+_cleaned_folders = set()
+# .part files whose owner cannot be probed are only removed after this long
+STALE_PARTIAL_SECONDS = 24 * 3600
+
+
+def _windows_pid_alive(pid):
+    """OpenProcess + GetExitCodeProcess; None jika tidak bisa dicek"""
+    import ctypes
+    from ctypes import wintypes
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    ERROR_INVALID_PARAMETER = 87
+    STILL_ACTIVE = 259
+    try:
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Any error other than "no such process" (e.g. access denied) means it exists
+            return ctypes.get_last_error() != ERROR_INVALID_PARAMETER
+        try:
+            code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return None
+            return code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    except (AttributeError, OSError):
+        return None
+
+
+def _pid_alive(pid):
+    """True/False apakah proses `pid` masih hidup, None jika tidak bisa dicek
+
+    Tidak pernah mengirim sinyal: di Windows os.kill(pid, 0) justru
+    memanggil TerminateProcess, jadi di sana dipakai OpenProcess.
+    """
+    if os.name == "nt":
+        return _windows_pid_alive(pid)
+    try:
+        os.kill(pid, 0)  # signal 0 only checks permission/existence
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists but belongs to another user
+    except OSError:
+        return None
+    return True
+
+
+def host_tag():
+    """Nama host ini untuk nama file .part (tanpa titik)"""
+    import socket
+    return re.sub(r"[^A-Za-z0-9-]", "-", socket.gethostname()) or "host"
+
+
+def cleanup_stale_partials(folder):
+    """Hapus file .part sisa proses yang crash (PID pemiliknya sudah tidak hidup)
+
+    PID hanya dicek untuk file dari host ini. File dari host lain, atau
+    yang PID-nya tidak bisa dicek, hanya dihapus setelah
+    STALE_PARTIAL_SECONDS sejak terakhir ditulis.
+    """
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    host = host_tag()
+    for name in names:
+        if not (name.startswith(".") and name.endswith(PARTIAL_SUFFIX)):
+            continue
+        # .<name>.<host>.<pid>.<token>.part
+        parts = name[:-len(PARTIAL_SUFFIX)].rsplit(".", 3)
+        if len(parts) != 4 or not parts[2].isdigit():
+            continue
+        pid = int(parts[2])
+        if parts[1] != host:
+            alive = None  # another machine's process (or an older name format)
+        elif pid == os.getpid():
+            continue
+        else:
+            alive = _pid_alive(pid)
+        path = os.path.join(folder, name)
+        try:
+            if alive is None:
+                alive = time.time() - os.path.getmtime(path) < STALE_PARTIAL_SECONDS
+            if not alive:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _fsync_dir(folder):
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _links_unsupported(error):
+    """True jika os.link gagal karena filesystem tidak mendukung hard link"""
+    import errno
+    if error.errno in (errno.EPERM, errno.EOPNOTSUPP, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.EMLINK):
+        return True
+    # Windows: ERROR_INVALID_FUNCTION (FAT) and ERROR_NOT_SUPPORTED
+    return getattr(error, "winerror", None) in (1, 50)
+
+
+def _publish_exclusive(tmp_path, final_path):
+    """Pasang tmp_path di final_path hanya jika final_path belum ada"""
+    try:
+        os.link(tmp_path, final_path)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if not _links_unsupported(e):
+            raise  # e.g. the temp file is gone: nothing may be published
+        # No hard links here (FAT, some network shares): reserve the name with
+        # O_EXCL, then move the finished file over the empty placeholder
+        fd = os.open(final_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        try:
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(final_path)  # never leave the empty placeholder published
+            raise
+        return
+    os.remove(tmp_path)
+
+
+class AtomicOutput:
+    """Tulis file lewat file sementara lalu publish atomik dengan nama bebas bentrok
+
+    unique=True  -> "nama.pdf", "nama(1).pdf", ... (file lama tidak pernah ditimpa);
+                    "nama(2).pdf" yang sudah dipakai lanjut ke "nama(3).pdf"
+    unique=False -> file tujuan diganti secara atomik (os.replace)
+    """
+
+    def __init__(self, folder, file_name, unique=True):
+        self.folder = folder
+        self.file_name = file_name
+        self.unique = unique
+        self.path = None  # final path, set once published
+        self._tmp_path = None
+        self._file = None
+
+    def __enter__(self):
+        if self.folder not in _cleaned_folders:
+            _cleaned_folders.add(self.folder)
+            cleanup_stale_partials(self.folder)
+        token = os.urandom(4).hex()
+        self._tmp_path = os.path.join(
+            self.folder, f".{self.file_name}.{host_tag()}.{os.getpid()}.{token}{PARTIAL_SUFFIX}"
+        )
+        self._file = open(self._tmp_path, "xb")
+        return self._file
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            if exc_type is None:
+                self._publish()
+        finally:
+            if os.path.exists(self._tmp_path):
+                try:
+                    os.remove(self._tmp_path)
+                except OSError:
+                    pass
+        return False
+
+    def _publish(self):
+        if not self.unique:
+            self.path = os.path.join(self.folder, self.file_name)
+            os.replace(self._tmp_path, self.path)
+            _fsync_dir(self.folder)
+            return
+
+        base, ext = os.path.splitext(self.file_name)
+        counter = 0
+        numbered = _NUMBERED_NAME_RE.fullmatch(base)
+        if numbered:
+            # A name reserved as "(n)" (item_pdf_names) continues that sequence
+            base, counter = numbered.group(1), int(numbered.group(2))
+        key = (self.folder, base, ext)
+        while True:
+            name = f"{base}{ext}" if counter == 0 else f"{base}({counter}){ext}"
+            candidate = os.path.join(self.folder, name)
+            try:
+                _publish_exclusive(self._tmp_path, candidate)
+            except FileExistsError:
+                # The requested name is always tried first, so names freed
+                # since (folder emptied between runs) are used again; the index
+                # only skips the run of names already seen taken
+                with _name_index_lock:
+                    counter = max(counter + 1, _name_index.get(key, 0))
+                continue
+            break
+        with _name_index_lock:
+            _name_index[key] = max(_name_index.get(key, 0), counter + 1)
+        self.path = candidate
+        _fsync_dir(self.folder)
+
+
+# ---------------------------------------------------------------------------
+# Run log
+#
+# Every run can append JSON lines to a log file: one "input" record per
+# source image (output PDF, pages, bytes in/out, decode/encode seconds and
+# the error class/message if it failed) and one "summary" record at the end,
+# so missing pages are visible and throughput can be compared across runs.
+# ---------------------------------------------------------------------------
+
+class RunLog:
+    """Log JSON-lines per input + ringkasan; tanpa `path` hanya menghitung"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+        self.inputs = 0
+        self.failed = 0
+        self.pages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.outputs = 0
+        self.errors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(cancelled=isinstance(exc, ConversionCancelled))
+
+    def _emit(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record(self, source, output=None, pages=0, bytes_out=0,
+               decode_seconds=0.0, encode_seconds=0.0, error=None, bytes_in=None):
+        """Tulis satu record input"""
+        if bytes_in is None:
+            try:
+                bytes_in = source_size(source)
+            except OSError:
+                bytes_in = 0
+        source = os.fspath(source)
+        with self._lock:
+            self.inputs += 1
+            self.bytes_in += bytes_in
+            if error is not None:
+                self.failed += 1
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+            elif output is not None:
+                self.pages += pages
+                self.bytes_out += bytes_out
+            self._emit({
+                "type": "input",
+                "source": source,
+                "output": output,
+                "pages": pages,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "decode_seconds": round(decode_seconds, 4),
+                "encode_seconds": round(encode_seconds, 4),
+                "error": None if error is None else {"class": type(error).__name__, "message": str(error)},
+            })
+
+    def output(self, sources=()):
+        """Kumpulkan halaman untuk satu PDF; dicatat setelah nama finalnya diketahui"""
+        return OutputLog(self, sources)
+
+    def close(self, cancelled=False):
+        """Tulis record ringkasan lalu tutup file"""
+        with self._lock:
+            self._emit({
+                "type": "summary",
+                "started": datetime.fromtimestamp(self._started).isoformat(timespec="seconds"),
+                "seconds": round(time.time() - self._started, 3),
+                "inputs": self.inputs,
+                "ok": self.inputs - self.failed,
+                "failed": self.failed,
+                "pages": self.pages,
+                "outputs": self.outputs,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "errors": self.errors,
+                "cancelled": cancelled,
+            })
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class OutputLog:
+    """Input untuk satu output PDF; dipakai sebagai `with` di sekitar save_pdf
+
+    Jika save gagal atau dibatalkan, semua `sources` yang belum tercatat
+    (termasuk halaman yang sudah di-encode, karena PDF-nya tidak jadi
+    dipublish) dicatat dengan error tersebut.
+    """
+
+    def __init__(self, run_log, sources=()):
+        self._run_log = run_log
+        self._sources = sources
+        self._pages = []
+        self._failed = set()
+        self._written = False
+        self.path = None  # final output path, set by the caller after saving
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None and self.path and self._written:
+            with self._run_log._lock:
+                self._run_log.outputs += 1
+        for source, bytes_in, bytes_out, decode_seconds, encode_seconds in self._pages:
+            self._run_log.record(
+                source, self.path if exc is None else None, 1, bytes_out,
+                decode_seconds, encode_seconds, exc, bytes_in,
+            )
+        if exc is not None:
+            done = self._failed.union(source for source, *_ in self._pages)
+            for source in self._sources:
+                if source not in done:
+                    self._run_log.record(source, error=exc)
+
+    def on_page(self, path, page, bytes_out):
+        self._written = True
+        if os.fspath(path) in self._failed:
+            return  # OCR failed: already recorded with its error, the page itself is in the PDF
+        # Keep only the numbers; holding the page (or an archive member) would keep its data alive
+        bytes_in = getattr(page, "bytes_in", None)
+        if bytes_in is None:
+            try:
+                bytes_in = source_size(path)
+            except OSError:
+                bytes_in = 0
+        self._pages.append((os.fspath(path), bytes_in, bytes_out, page.decode_seconds, page.encode_seconds))
+
+    def on_error(self, path, error):
+        self._failed.add(os.fspath(path))
+        self._run_log.record(path, error=error)
+
+
+def save_pdf(pages, output, cancel=None, object_streams=False, on_page=None, title=None, outline=None,
+             on_error=None):
+    """Simpan halaman ke path, AtomicOutput atau stream biner
+
+    Tidak ada yang ditulis jika tidak ada halaman yang berhasil di-encode.
+    Jika dibatalkan, file sementara dihapus dan tidak ada output yang dipublish.
+    Tanpa `title`, judul PDF diambil dari nama file output.
+    """
+    pages = iter(pages)
+    first = next(pages, None)
+    if first is None:
+        return 0
+    pages = itertools.chain([first], pages)
+    if hasattr(output, "write"):
+        return write_pdf(pages, output, cancel, object_streams, on_page, title, outline, on_error)
+    if isinstance(output, str):
+        # An explicit path means "this file": replace it atomically
+        output = AtomicOutput(os.path.dirname(output) or ".", os.path.basename(output), unique=False)
+    if title is None:
+        title = os.path.splitext(output.file_name)[0]
+    with output as f:
+        return write_pdf(pages, f, cancel, object_streams, on_page, title, outline, on_error)
+
+
+def collect_images(inputs):
+    """Expand folder jadi daftar gambar (urut nama); path file dipakai apa adanya"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(list_folder_images(item))
+        else:
+            paths.append(item)
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Distributed folder conversion
+#
+# For backfills that need more than one machine, folder mode can be sharded
+# over a queue directory on a shared filesystem (NFS/SMB or a local disk for
+# testing). The coordinator turns every root image and every subfolder into a
+# work unit (one output PDF each) under pending/. Workers claim a unit by
+# renaming it into claimed/ (atomic, so only one worker wins), renew a lease
+# next to it while converting, and write a result manifest to done/.
+# Units whose lease expires (crashed worker) go back to pending/. Output
+# names are fixed by the coordinator, so a unit that runs twice simply
+# replaces its own PDF.
+#
+# The machines' clocks may disagree, so lease times are never taken from
+# time.time(): WorkQueue.shared_clock writes queue/clock and reads back the
+# mtime the file server gave it. The lease records that time and the holder.
+#
+#   queue/job.json        output folder, unit count
+#   queue/clock           probe file for the shared filesystem's clock
+#   queue/pending/*.json  work units not yet claimed
+#   queue/claimed/*.json  work units being converted
+#   queue/claimed/*.lease holder and last renewal (shared clock) per claim
+#   queue/done/*.json     result manifest per unit
+#   queue/logs/*.jsonl    run log per worker
+#   queue/manifest.json   all results, written by the coordinator at the end
+# ---------------------------------------------------------------------------
+
+LEASE_SECONDS = 60
+QUEUE_POLL_SECONDS = 0.5
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_folder(folder, output_folder):
+    """Bagi folder jadi work unit; nama output dibuat unik di sini, bukan di worker"""
+    units = []
+    items = list_folder_items(folder)
+    for index, ((_item_type, item_name, image_paths), name) in enumerate(zip(items, item_pdf_names(items))):
+        if name is None:
+            continue
+        units.append({
+            "id": f"{index:06d}",
+            "name": item_name,
+            "output": os.path.join(output_folder, name),
+            "sources": [os.path.abspath(path) for path in image_paths],
+        })
+    return units
+
+
+class WorkQueue:
+    """Antrian work unit berbasis direktori (lihat penjelasan di atas)"""
+
+    def __init__(self, root):
+        self.root = root
+        self.pending = os.path.join(root, "pending")
+        self.claimed = os.path.join(root, "claimed")
+        self.done = os.path.join(root, "done")
+        self.logs = os.path.join(root, "logs")
+        self.job_path = os.path.join(root, "job.json")
+        self.clock_path = os.path.join(root, "clock")
+        self.finished_path = os.path.join(root, "finished")
+        for folder in (self.pending, self.claimed, self.done, self.logs):
+            os.makedirs(folder, exist_ok=True)
+
+    def submit(self, units, job):
+        """Tulis unit ke pending lalu job.json (`job`: folder input, output dan opsi)"""
+        for unit in units:
+            _write_json_atomic(os.path.join(self.pending, f"{unit['id']}.json"), unit)
+        # job.json last: its presence means the queue is complete
+        _write_json_atomic(self.job_path, dict(job, units=len(units)))
+
+    def shared_clock(self):
+        """Waktu sekarang menurut filesystem antrian (mtime file probe), bukan jam mesin ini"""
+        # A write, unlike utime, has the file server stamp the mtime (NFS, SMB)
+        with open(self.clock_path, "w") as f:
+            f.write(f"{time.time():.3f}\n")
+        return os.stat(self.clock_path).st_mtime
+
+    def _lease_path(self, claimed_path):
+        return os.path.splitext(claimed_path)[0] + ".lease"
+
+    def claim(self, holder):
+        """Ambil satu unit; return (unit, path claim) atau None jika pending kosong"""
+        for name in sorted(os.listdir(self.pending)):
+            if not name.endswith(".json"):
+                continue
+            claimed_path = os.path.join(self.claimed, name)
+            try:
+                os.rename(os.path.join(self.pending, name), claimed_path)
+            except OSError:
+                continue  # another worker was faster
+            # rename keeps the submit time as mtime; refresh it for _lease_time's fallback
+            os.utime(claimed_path)
+            self.renew(claimed_path, holder, take=True)
+            return _read_json(claimed_path), claimed_path
+        return None
+
+    def renew(self, claimed_path, holder, take=False):
+        """Tulis lease (holder + waktu shared_clock); False jika unit sudah bukan milik `holder`"""
+        if not os.path.exists(claimed_path):
+            return False  # requeued meanwhile: don't leave a lease behind for it
+        if not take:
+            with contextlib.suppress(OSError, ValueError, AttributeError):
+                if _read_json(self._lease_path(claimed_path)).get("holder") != holder:
+                    return False  # requeued and claimed by another worker since
+        _write_json_atomic(self._lease_path(claimed_path), {"holder": holder, "renewed": self.shared_clock()})
+        return True
+
+    def _lease_time(self, claimed_path):
+        """Waktu renew terakhir menurut shared_clock"""
+        try:
+            return float(_read_json(self._lease_path(claimed_path))["renewed"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Lease not written yet (claimed a moment ago) or unreadable: the
+            # claim's mtime comes from the same file server clock
+            return os.path.getmtime(claimed_path)
+
+    def _drop_lease(self, claimed_path):
+        with contextlib.suppress(OSError):
+            os.remove(self._lease_path(claimed_path))
+
+    def release(self, claimed_path):
+        """Kembalikan unit yang belum selesai ke pending (worker berhenti)"""
+        with contextlib.suppress(OSError):
+            os.rename(claimed_path, os.path.join(self.pending, os.path.basename(claimed_path)))
+        self._drop_lease(claimed_path)
+
+    def complete(self, claimed_path, result):
+        _write_json_atomic(os.path.join(self.done, os.path.basename(claimed_path)), result)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(claimed_path)
+        self._drop_lease(claimed_path)
+
+    def results(self):
+        return {name[:-5]: _read_json(os.path.join(self.done, name))
+                for name in os.listdir(self.done) if name.endswith(".json")}
+
+    def requeue_expired(self, lease_seconds=LEASE_SECONDS):
+        """Kembalikan unit yang lease-nya habis (worker mati) ke pending"""
+        requeued = 0
+        now = self.shared_clock()
+        for name in os.listdir(self.claimed):
+            if not name.endswith(".json"):
+                continue  # leases and their temp files
+            claimed_path = os.path.join(self.claimed, name)
+            try:
+                expired = now - self._lease_time(claimed_path) > lease_seconds
+                if expired and not os.path.exists(os.path.join(self.done, name)):
+                    os.rename(claimed_path, os.path.join(self.pending, name))
+                    self._drop_lease(claimed_path)
+                    requeued += 1
+            except OSError:
+                continue  # completed or requeued meanwhile
+        return requeued
+
+
+@contextlib.contextmanager
+def _hold_lease(queue, claimed_path, holder, interval=LEASE_SECONDS / 4):
+    """Perbarui lease unit secara berkala selama blok berjalan"""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(interval):
+            with contextlib.suppress(OSError):
+                queue.renew(claimed_path, holder)
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def convert_work_unit(unit, run_log, governor=None, cancel=None):
+    """Convert satu work unit jadi PDF-nya; return manifest hasil"""
+    started = time.time()
+    failed = []
+
+    def on_error(path, e):
+        failed.append({"source": path, "error": {"class": type(e).__name__, "message": str(e)}})
+        rec.on_error(path, e)
+
+    pages = iter_encoded_pages(unit["sources"], on_error, governor, cancel)
+    try:
+        with run_log.output(unit["sources"]) as rec:
+            # The name was made unique by the coordinator: replace, don't suffix
+            page_count = save_pdf(pages, unit["output"], cancel, on_page=rec.on_page, on_error=on_error)
+            rec.path = unit["output"] if page_count else None
+    except Exception as e:
+        return {"id": unit["id"], "output": None, "pages": 0, "failed": failed,
+                "error": {"class": type(e).__name__, "message": str(e)},
+                "seconds": round(time.time() - started, 3)}
+    return {"id": unit["id"], "output": unit["output"] if page_count else None, "pages": page_count,
+            "failed": failed, "error": None, "seconds": round(time.time() - started, 3)}
+
+
+def run_worker(queue_root, governor=None, cancel=None, worker_id=None):
+    """Proses unit dari antrian sampai coordinator menandai selesai; return jumlah unit"""
+    import socket
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_root)
+    handled = 0
+    with RunLog(os.path.join(queue.logs, f"{worker_id}.jsonl")) as run_log:
+        while not os.path.exists(queue.finished_path):
+            check_cancel(cancel)
+            claim = queue.claim(worker_id) if os.path.exists(queue.job_path) else None
+            if claim is None:
+                time.sleep(QUEUE_POLL_SECONDS)
+                continue
+            unit, claimed_path = claim
+            print(f"[INFO] {worker_id}: {unit['name']} ({len(unit['sources'])} gambar)", file=sys.stderr)
+            try:
+                with _hold_lease(queue, claimed_path, worker_id):
+                    result = convert_work_unit(unit, run_log, governor, cancel)
+            except ConversionCancelled:
+                queue.release(claimed_path)
+                raise
+            result["worker"] = worker_id
+            queue.complete(claimed_path, result)
+            handled += 1
+    return handled
+
+
+class QueueMismatchError(ValueError):
+    """Folder antrian yang ada dibuat untuk input, output atau opsi yang berbeda"""
+
+
+def run_coordinator(folder, output_folder, queue_root, local_workers=0, worker_args=(), cancel=None,
+                    resume=False):
+    """Shard folder ke antrian, tunggu semua unit selesai, tulis manifest.json
+
+    `local_workers` menjalankan worker sebagai subprocess di mesin ini
+    (untuk testing atau satu mesin dengan banyak core). Antrian yang sudah
+    ada hanya dilanjutkan jika folder input, output dan opsinya sama, atau
+    jika `resume` (--resume). Return manifest.
+    """
+    import subprocess
+    queue = WorkQueue(queue_root)
+    job = {
+        "folder": os.path.abspath(folder),
+        "output_folder": os.path.abspath(output_folder),
+        "options": list(worker_args),
+    }
+    if os.path.exists(queue.job_path):
+        existing = _read_json(queue.job_path)
+        labels = {"folder": "folder input", "output_folder": "folder output", "options": "opsi"}
+        different = [labels[key] for key in job if existing.get(key) != job[key]]
+        if different and not resume:
+            raise QueueMismatchError(
+                f"Antrian {queue_root} dibuat dengan {', '.join(different)} yang berbeda; "
+                "pakai folder antrian baru, atau --resume untuk tetap melanjutkannya"
+            )
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(queue.finished_path)
+    if os.path.exists(queue.job_path):
+        # Resume an interrupted backfill instead of sharding again
+        total = existing["units"]
+        print(f"[INFO] Melanjutkan antrian yang ada: {total} unit", file=sys.stderr)
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+        units = shard_folder(folder, job["output_folder"])
+        queue.submit(units, job)
+        total = len(units)
+        print(f"[INFO] {total} unit dibuat di {queue_root}", file=sys.stderr)
+
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", queue_root, *worker_args])
+        for _ in range(local_workers)
+    ]
+    try:
+        reported = -1
+        while True:
+            check_cancel(cancel)
+            results = queue.results()
+            if len(results) >= total:
+                break
+            if len(results) != reported:
+                reported = len(results)
+                print(f"[INFO] {reported}/{total} unit selesai", file=sys.stderr)
+            queue.requeue_expired()
+            time.sleep(QUEUE_POLL_SECONDS)
+    finally:
+        # Tells idle workers (local and remote) to exit
+        with open(queue.finished_path, "w"):
+            pass
+        for process in workers:
+            process.wait()
+
+    manifest = {
+        "folder": os.path.abspath(folder) if folder else None,
+        "units": total,
+        "outputs": sorted(r["output"] for r in results.values() if r["output"]),
+        "pages": sum(r["pages"] for r in results.values()),
+        "failed_sources": [f for r in results.values() for f in r["failed"]],
+        "failed_units": [r for r in results.values() if r["error"]],
+        "results": [results[key] for key in sorted(results)],
+    }
+    _write_json_atomic(os.path.join(queue_root, "manifest.json"), manifest)
+    return manifest
+
+
+def run_cli(argv):
+    """Mode command line: gabung gambar jadi 1 PDF ke file atau stdout"""
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser(
+        prog="init.py",
+        description="Convert gambar ke 1 PDF tanpa GUI. Tanpa argumen, GUI yang dijalankan."
+    )
+    parser.add_argument("inputs", nargs="*", help="file gambar, folder berisi gambar, arsip ZIP/TAR, atau PDF yang sudah jadi")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file PDF tujuan, '-' untuk stdout (default); folder output untuk --coordinator")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help=f"batas RAM untuk decode gambar (default: ${MEMORY_BUDGET_ENV} atau 1/4 RAM)")
+    parser.add_argument("--max-pixels", type=int, default=DEFAULT_MAX_IMAGE_PIXELS,
+                        help="tolak gambar dengan jumlah pixel lebih dari ini (0 = tanpa batas)")
+    parser.add_argument("--scan", action="store_true",
+                        help="hanya scan header: tampilkan jumlah halaman dan perkiraan ukuran output")
+    parser.add_argument("--background", metavar="WARNA",
+                        help=f"warna di belakang gambar transparan, mis. white atau '#F0F0F0' (default: ${PAGE_BACKGROUND_ENV} atau putih)")
+    parser.add_argument("--preprocess", metavar="OPS",
+                        help=f"rapikan scan sebelum di-encode: daftar dipisah koma dari crop, deskew, contrast (default: ${PREPROCESS_ENV})")
+    parser.add_argument("--ocr", nargs="?", const=DEFAULT_OCR_LANGUAGE, metavar="BAHASA",
+                        help=f"tambahkan text layer OCR via tesseract agar PDF bisa dicari (bahasa default: {DEFAULT_OCR_LANGUAGE}, mis. ind+eng)")
+    parser.add_argument("--log", metavar="FILE",
+                        help="tambahkan log JSON-lines (1 record per gambar + ringkasan) ke FILE")
+    parser.add_argument("--object-streams", action="store_true",
+                        help="tulis PDF 1.5 dengan object stream dan xref stream terkompresi (lebih kecil untuk ribuan halaman)")
+    distributed = parser.add_argument_group(
+        "mode terdistribusi",
+        "folder mode (1 PDF per subfolder) dibagi ke beberapa worker lewat folder antrian bersama"
+    )
+    distributed.add_argument("--coordinator", metavar="QUEUE",
+                             help="bagi 1 folder input ke antrian QUEUE, tunggu worker, tulis QUEUE/manifest.json")
+    distributed.add_argument("--workers", type=int, default=0, metavar="N",
+                             help="dengan --coordinator: jalankan juga N worker lokal")
+    distributed.add_argument("--resume", action="store_true",
+                             help="dengan --coordinator: lanjutkan antrian yang ada walaupun folder/opsinya berbeda")
+    distributed.add_argument("--worker", metavar="QUEUE",
+                             help="jalankan worker yang memproses unit dari antrian QUEUE")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.worker:
+        parser.error("minimal 1 input diperlukan")
+    if args.coordinator and (len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]) or args.output == "-"):
+        parser.error("--coordinator butuh tepat 1 folder input dan -o FOLDER_OUTPUT")
+    if args.background:
+        try:
+            set_page_background(args.background)
+        except ValueError:
+            parser.error(f"warna tidak dikenal: {args.background}")
+    if args.preprocess is not None:
+        try:
+            set_preprocessing(args.preprocess.split(","))
+        except ValueError as e:
+            parser.error(str(e))
+        except ImportError:
+            parser.error("--preprocess butuh NumPy (pip install numpy)")
+    if args.ocr is not None:
+        try:
+            set_ocr_language(args.ocr)
+        except FileNotFoundError:
+            parser.error(f"--ocr butuh tesseract di PATH atau ${TESSERACT_ENV}")
+    governor = ResourceGovernor(
+        memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+        max_image_pixels=args.max_pixels,
+    )
+
+    # First Ctrl+C / SIGTERM stops after the current page and removes the
+    # partial output; a second Ctrl+C falls back to the default behaviour
+    cancel = CancelToken()
+
+    def on_signal(signum, frame):
+        cancel.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        print("\n[INFO] Membatalkan...", file=sys.stderr)
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    if args.worker or args.coordinator:
+        return _run_distributed(args, governor, cancel)
+
+    def on_error(path, e):
+        print(f"[WARN] Gagal load: {path} - {e}", file=sys.stderr)
+        rec.on_error(path, e)
+
+    paths = collect_images(args.inputs)
+    # Archives are read once, while converting, and PDFs are copied as they
+    # are, so neither is pre-scanned
+    files = [path for path in paths if not is_archive(path)]
+    images = [path for path in files if not is_pdf(path)]
+    summary = ScanSummary(scan_images(images))
+    archives = len(paths) - len(files)
+    pdfs = len(files) - len(images)
+    print(f"[INFO] {summary.describe()}" + (f" + isi {archives} arsip" if archives else "")
+          + (f" + {pdfs} PDF" if pdfs else ""), file=sys.stderr)
+    if args.scan:
+        for info in summary.infos.values():
+            detail = f"{info.format} {info.width}x{info.height}, {info.frames} frame" if info.ok else f"ERROR {info.error}"
+            print(f"{info.path}\t{detail}", file=sys.stderr)
+        return 0 if summary.pages else 1
+
+    def on_write_error(path, e):
+        label = "Gagal salin PDF" if isinstance(e, PdfImportError) else "OCR gagal"
+        print(f"[WARN] {label}: {path} - {e}", file=sys.stderr)
+        rec.on_error(path, e)
+
+    pages = iter_input_pages(paths, on_error, governor, cancel)
+    output = sys.stdout.buffer if args.output == "-" else args.output
+    run_log = RunLog(args.log)
+    try:
+        with run_log, run_log.output(files) as rec:
+            page_count = save_pdf(pages, output, cancel, args.object_streams, rec.on_page, outline=outline_title,
+                                  on_error=on_write_error)
+            rec.path = "<stdout>" if args.output == "-" else os.path.abspath(args.output)
+    except BrokenPipeError:
+        # Reader on the other end of the pipe went away
+        return 1
+    except ConversionCancelled:
+        print("[INFO] Dibatalkan", file=sys.stderr)
+        return 130
+    if not page_count:
+        print("[ERROR] Tidak ada gambar yang berhasil dikonversi", file=sys.stderr)
+        return 1
+    print(f"[INFO] {page_count} halaman ditulis", file=sys.stderr)
+    return 0
+
+
+def _run_distributed(args, governor, cancel):
+    """Bagian CLI untuk --worker dan --coordinator"""
+    try:
+        if args.worker:
+            handled = run_worker(args.worker, governor, cancel)
+            print(f"[INFO] Worker selesai: {handled} unit", file=sys.stderr)
+            return 0
+        worker_args = []
+        if args.memory_budget:
+            worker_args += ["--memory-budget", str(args.memory_budget)]
+        if args.max_pixels != DEFAULT_MAX_IMAGE_PIXELS:
+            worker_args += ["--max-pixels", str(args.max_pixels)]
+        if args.background:
+            worker_args += ["--background", args.background]
+        if args.preprocess is not None:
+            worker_args += ["--preprocess", args.preprocess]
+        if args.ocr is not None:
+            worker_args += ["--ocr", args.ocr]
+        manifest = run_coordinator(
+            args.inputs[0], args.output, args.coordinator, args.workers, worker_args, cancel, args.resume
+        )
+    except QueueMismatchError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+    except ConversionCancelled:
+        print("[INFO] Dibatalkan; jalankan ulang perintah yang sama untuk melanjutkan", file=sys.stderr)
+        return 130
+    print(
+        f"[INFO] {len(manifest['outputs'])} PDF, {manifest['pages']} halaman, "
+        f"{len(manifest['failed_sources'])} gambar gagal, {len(manifest['failed_units'])} unit gagal",
+        file=sys.stderr
+    )
+    return 1 if manifest["failed_units"] else 0
+
+
+# ---------------------------------------------------------------------------
+# GUI update statistics
+#
+# _flush_ui records every queue drain in app.ui_stats: how many updates were
+# waiting (queue depth) and how many widgets were redrawn for them.
+# bench_gui.py reads these to check that the main loop keeps up and that
+# updates are coalesced.
+# ---------------------------------------------------------------------------
+
+UI_REFRESH_MS = 50
+
+
+class UiStats:
+    """Statistik update UI yang dikumpulkan oleh _flush_ui"""
+
+    def __init__(self):
+        self.flushes = 0
+        self.updates = 0
+        self.redraws = 0
+        self.depths = []
+
+    def record(self, depth, redraws):
+        self.flushes += 1
+        self.updates += depth
+        self.redraws += redraws
+        if depth:
+            self.depths.append(depth)
+
+
+class FileSelection:
+    """Daftar file terpilih: urutan terjaga, cek duplikat O(1) lewat set"""
+
+    def __init__(self):
+        self._paths = []
+        self._members = set()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __getitem__(self, index):
+        return self._paths[index]
+
+    def __contains__(self, path):
+        return path in self._members
+
+    def add_many(self, paths):
+        """Tambah path baru (duplikat dilewati); return path yang benar-benar ditambah"""
+        added = []
+        for path in paths:
+            if path not in self._members:
+                self._members.add(path)
+                self._paths.append(path)
+                added.append(path)
+        return added
+
+    def remove_indices(self, indices):
+        """Hapus beberapa index sekaligus dalam satu pass O(n)"""
+        indices = set(indices)
+        kept = []
+        for i, path in enumerate(self._paths):
+            if i in indices:
+                self._members.discard(path)
+            else:
+                kept.append(path)
+        self._paths = kept
+
+    def clear(self):
+        self._paths = []
+        self._members = set()
 
 
 class ImageToPDFConverter:
@@ -50,10 +4155,15 @@ class ImageToPDFConverter:
         self.input_folder = tk.StringVar(value="")
         self.output_folder = tk.StringVar(value=os.path.join(documents_folder, "HASIL"))
         self.is_converting = False
+        self.closing = False
+        self.cancel_token = None
+        self.worker_thread = None
+        self.run_log = RunLog()
         
         # Mode selection
         self.mode = tk.StringVar(value="folder")  # "folder" or "files"
-        self.selected_files = []
+        self.selected_files = FileSelection()
+        self._listbox_batch_id = 0  # bumps to cancel pending listbox inserts
         self.merge_files = tk.BooleanVar(value=False)
         self.custom_name = tk.StringVar(value="")
         
@@ -61,8 +4171,21 @@ class ImageToPDFConverter:
         self.merge_folder_pdfs = tk.BooleanVar(value=False)
         self.folder_custom_name = tk.StringVar(value="")
         
+        # Scan clean-up (crop, deskew, contrast) for both modes
+        try:
+            self.clean_scans = tk.BooleanVar(value=bool(preprocessing()))
+        except (ValueError, ImportError):
+            self.clean_scans = tk.BooleanVar(value=False)
+        self.searchable = tk.BooleanVar(value=bool(ocr_language()))
+        
+        # Status/progress updates from the worker thread, drawn by _flush_ui
+        self._ui_updates = queue.Queue()
+        self.ui_stats = UiStats()
+        
         self.setup_ui()
         self.setup_button_hover_effects()
+        self.root.after(UI_REFRESH_MS, self._flush_ui)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def setup_ui(self):
         # Modern gradient-style header
@@ -212,8 +4335,11 @@ class ImageToPDFConverter:
             fg=self.colors['dark']
         ).grid(row=0, column=0, sticky="w", pady=(0, 12))
         
+        folder_buttons = tk.Frame(self.folder_frame, bg=self.colors['light'])
+        folder_buttons.grid(row=1, column=0, pady=(0, 12))
+        
         self.folder_select_btn = tk.Button(
-            self.folder_frame, 
+            folder_buttons, 
             text="🔍  Pilih Folder", 
             command=self.select_folder_to_convert,
             bg=self.colors['primary'],
@@ -227,7 +4353,25 @@ class ImageToPDFConverter:
             activebackground=self.colors['primary_hover'],
             activeforeground="white"
         )
-        self.folder_select_btn.grid(row=1, column=0, pady=(0, 12))
+        self.folder_select_btn.pack(side=tk.LEFT, padx=(0, 8))
+        
+        # ZIP/TAR works like a folder, read without extracting
+        self.archive_select_btn = tk.Button(
+            folder_buttons,
+            text="📦  Pilih ZIP/TAR",
+            command=self.select_archive_to_convert,
+            bg=self.colors['primary'],
+            fg="white",
+            font=("Segoe UI", 10, "bold"),
+            cursor="hand2",
+            padx=25,
+            pady=12,
+            relief=tk.FLAT,
+            bd=0,
+            activebackground=self.colors['primary_hover'],
+            activeforeground="white"
+        )
+        self.archive_select_btn.pack(side=tk.LEFT)
         
         self.folder_status_label = tk.Label(
             self.folder_frame,
@@ -383,7 +4527,7 @@ class ImageToPDFConverter:
             font=("Segoe UI", 9),
             height=6,
             yscrollcommand=scrollbar.set,
-            selectmode=tk.SINGLE,
+            selectmode=tk.EXTENDED,
             relief=tk.FLAT,
             bd=1,
             highlightthickness=1,
@@ -452,7 +4596,7 @@ class ImageToPDFConverter:
         
         tk.Label(
             list_actions,
-            text="Klik foto untuk pilih, lalu klik tombol hapus",
+            text="Klik foto (Shift/Ctrl untuk banyak), lalu klik tombol hapus",
             font=("Segoe UI", 8),
             fg=self.colors['text_light'],
             bg="white"
@@ -565,6 +4709,32 @@ class ImageToPDFConverter:
         )
         self.change_output_btn.pack(side=tk.RIGHT, padx=(10, 0))
         
+        tk.Checkbutton(
+            output_info_frame,
+            text="🧹 Rapikan hasil scan (potong tepi, luruskan, kontras)",
+            variable=self.clean_scans,
+            font=("Segoe UI", 10),
+            fg=self.colors['dark'],
+            bg="white",
+            selectcolor="white",
+            activebackground="white",
+            cursor="hand2"
+        ).pack(anchor="w", pady=(10, 0))
+        
+        has_tesseract = tesseract_path() is not None
+        tk.Checkbutton(
+            output_info_frame,
+            text="🔍 PDF bisa dicari (OCR)" if has_tesseract else "🔍 PDF bisa dicari (OCR) — tesseract belum terpasang",
+            variable=self.searchable,
+            state=tk.NORMAL if has_tesseract else tk.DISABLED,
+            font=("Segoe UI", 10),
+            fg=self.colors['dark'],
+            bg="white",
+            selectcolor="white",
+            activebackground="white",
+            cursor="hand2"
+        ).pack(anchor="w", pady=(4, 0))
+        
         content_frame.columnconfigure(0, weight=1)
         
         # Progress section
@@ -613,6 +4783,16 @@ class ImageToPDFConverter:
         )
         self.status_label.pack()
         
+        # Pages done + ETA, filled in from the header pre-scan
+        self.eta_label = tk.Label(
+            progress_frame,
+            text="",
+            font=("Segoe UI", 9),
+            fg=self.colors['text_light'],
+            bg="white"
+        )
+        self.eta_label.pack()
+        
         # Buttons
         button_frame = tk.Frame(content_frame, bg=self.colors['light'])
         button_frame.grid(row=5, column=0, pady=(0, 18))
@@ -634,6 +4814,25 @@ class ImageToPDFConverter:
         )
         self.convert_btn.pack(side=tk.LEFT, padx=10)
         
+        # Only enabled while a conversion is running
+        self.cancel_btn = tk.Button(
+            button_frame,
+            text="⛔  BATALKAN",
+            command=self.cancel_conversion,
+            bg=self.colors['secondary'],
+            fg="white",
+            font=("Segoe UI", 13, "bold"),
+            cursor="hand2",
+            padx=30,
+            pady=15,
+            relief=tk.FLAT,
+            bd=0,
+            state=tk.DISABLED,
+            activebackground=self.colors['danger_hover'],
+            activeforeground="white"
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=10)
+        
         # Footer info with card style
         footer_frame = tk.Frame(
             content_frame,
@@ -662,6 +4861,21 @@ class ImageToPDFConverter:
                 fg=self.colors['success']
             )
     
+    def select_archive_to_convert(self):
+        archive = filedialog.askopenfilename(
+            title="Pilih Arsip ZIP/TAR yang Berisi Gambar",
+            filetypes=[
+                ("Arsip gambar", " ".join(f"*{ext}" for ext in ARCHIVE_FORMATS)),
+                ("All files", "*.*"),
+            ]
+        )
+        if archive:
+            self.input_folder.set(archive)
+            self.folder_status_label.config(
+                text=f"✓ Arsip dipilih: {archive}",
+                fg=self.colors['success']
+            )
+    
     def browse_output(self):
         folder = filedialog.askdirectory(
             title="Pilih Lokasi Penyimpanan PDF",
@@ -686,7 +4900,7 @@ class ImageToPDFConverter:
             self.merge_folder_pdfs.set(False)
             self.folder_custom_name.set("")
             self.folder_custom_name_frame.grid_remove()
-            self.status_label.config(text="Ready to convert...", fg=self.colors['text_light'])
+            self.update_status("Ready to convert...", self.colors['text_light'])
         else:
             # Switch to file mode
             self.folder_frame.grid_remove()
@@ -701,8 +4915,8 @@ class ImageToPDFConverter:
             self.merge_folder_pdfs.set(False)
             self.folder_custom_name.set("")
             self.folder_custom_name_frame.grid_remove()
-            self.status_label.config(text="Ready to convert...", fg=self.colors['text_light'])
-            self.progress_bar['value'] = 0
+            self.update_status("Ready to convert...", self.colors['text_light'])
+            self.update_progress(0)
     
     def on_merge_change(self):
         if self.merge_files.get():
@@ -724,16 +4938,36 @@ class ImageToPDFConverter:
             title="Pilih File Foto",
             filetypes=[
                 ("Image Files", "*.png *.jpg *.jpeg *.gif *.bmp *.tiff *.heic"),
+                ("PDF (untuk digabung)", "*.pdf"),
                 ("All Files", "*.*")
             ]
         )
         if files:
-            for file in files:
-                if file not in self.selected_files:
-                    self.selected_files.append(file)
-                    self.files_listbox.insert(tk.END, os.path.basename(file))
+            added = self.selected_files.add_many(files)
+            self._append_to_listbox([os.path.basename(file) for file in added])
             self.files_label.config(text=f"{len(self.selected_files)} file dipilih")
     
+    def _append_to_listbox(self, names, batch_size=5000):
+        """Insert nama ke listbox per batch lewat after() agar GUI tetap responsif"""
+        batch_id = self._listbox_batch_id
+        
+        def insert_batch(start):
+            if batch_id != self._listbox_batch_id:
+                return  # list was cleared meanwhile
+            self.files_listbox.insert(tk.END, *names[start:start + batch_size])
+            if start + batch_size < len(names):
+                self.root.after(1, insert_batch, start + batch_size)
+        
+        if names:
+            insert_batch(0)
+    
+    def _reset_file_list(self):
+        """Kosongkan pilihan file, listbox dan label jumlah file"""
+        self._listbox_batch_id += 1
+        self.selected_files.clear()
+        self.files_listbox.delete(0, tk.END)
+        self.files_label.config(text="0 file dipilih")
+    
     def on_file_select(self, event):
         """Show preview when a file is selected from the listbox"""
         selection = self.files_listbox.curselection()
@@ -747,15 +4981,13 @@ class ImageToPDFConverter:
         file_path = self.selected_files[index]
         
         try:
+            from PIL import ImageOps, ImageTk
+            
             # Load image
-            if file_path.lower().endswith(".heic"):
-                if HEIF_SUPPORTED:
-                    img = Image.open(file_path)
-                else:
-                    img_array = imageio.imread(file_path)
-                    img = Image.fromarray(img_array)
+            if is_heif(file_path) and not heif_supported():
+                img = read_with_imageio(file_path)
             else:
-                img = Image.open(file_path)
+                img = open_checked(file_path, default_governor())
             
             # Get preview container size (approximately)
             preview_width = 180
@@ -770,6 +5002,12 @@ class ImageToPDFConverter:
             # Resize image
             img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
+            # Match the PDF page: rotate the small preview, not the full image
+            orientation = read_orientation(img)
+            if orientation != 1:
+                img_resized.getexif()[EXIF_ORIENTATION] = orientation
+                img_resized = ImageOps.exif_transpose(img_resized)
+            
             # Convert to PhotoImage
             photo = ImageTk.PhotoImage(img_resized)
             
@@ -790,14 +5028,19 @@ class ImageToPDFConverter:
         """Remove selected file from list"""
         selection = self.files_listbox.curselection()
         if selection:
-            index = selection[0]
-            # Remove from listbox
-            self.files_listbox.delete(index)
-            # Remove from selected files
-            del self.selected_files[index]
+            # Remove from selected files in one pass
+            self.selected_files.remove_indices(selection)
+            # Remove from listbox; many scattered rows are cheaper to rebuild
+            if len(selection) > 1000:
+                self._listbox_batch_id += 1
+                self.files_listbox.delete(0, tk.END)
+                self._append_to_listbox([os.path.basename(file) for file in self.selected_files])
+            else:
+                for index in sorted(selection, reverse=True):
+                    self.files_listbox.delete(index)
             # Update label
             self.files_label.config(text=f"{len(self.selected_files)} file dipilih")
-            self.status_label.config(text="Foto dihapus dari list", fg=self.colors['warning'])
+            self.update_status("Foto dihapus dari list", self.colors['warning'])
             
             # Clear preview
             self.preview_label.config(
@@ -810,11 +5053,9 @@ class ImageToPDFConverter:
             messagebox.showinfo("Info", "Pilih foto yang ingin dihapus dari list terlebih dahulu")
     
     def clear_files(self):
-        self.selected_files = []
-        self.files_listbox.delete(0, tk.END)
-        self.files_label.config(text="0 file dipilih")
+        self._reset_file_list()
         self.custom_name.set("")
-        self.status_label.config(text="Files cleared", fg=self.colors['warning'])
+        self.update_status("Files cleared", self.colors['warning'])
         
         # Clear preview
         self.preview_label.config(
@@ -840,30 +5081,98 @@ class ImageToPDFConverter:
             messagebox.showwarning("Warning", "Pilih minimal 1 file foto terlebih dahulu!")
             return
         
+        try:
+            set_preprocessing(PREPROCESS_OPERATIONS if self.clean_scans.get() else ())
+        except ImportError:
+            messagebox.showerror("Error", "Rapikan hasil scan butuh NumPy.\nInstall dengan: pip install numpy")
+            return
+        try:
+            language = os.environ.get(OCR_LANGUAGE_ENV, "").strip() or DEFAULT_OCR_LANGUAGE
+            set_ocr_language(language if self.searchable.get() else "")
+        except FileNotFoundError:
+            messagebox.showerror("Error", "OCR butuh tesseract.\nInstall tesseract lalu buka ulang aplikasi.")
+            return
+        
         # Create output folder if not exist
         os.makedirs(self.output_folder.get(), exist_ok=True)
         
         # Start conversion in separate thread
         self.is_converting = True
+        self.cancel_token = CancelToken()
+        # One JSON-lines log per run, next to the results
+        self.run_log = RunLog(os.path.join(
+            self.output_folder.get(), "logs", f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        ))
         self.convert_btn.config(state=tk.DISABLED, bg=self.colors['secondary'])
+        self.cancel_btn.config(state=tk.NORMAL, bg=self.colors['danger'])
         
-        if self.mode.get() == "folder":
-            thread = threading.Thread(target=self.convert_images, daemon=True)
-        else:
-            thread = threading.Thread(target=self.convert_selected_files, daemon=True)
-        thread.start()
+        target = self.convert_images if self.mode.get() == "folder" else self.convert_selected_files
+        # Tk variables are read here, on the main thread; the worker only gets the values
+        self.worker_thread = threading.Thread(
+            target=self._run_conversion, args=(target, self._conversion_settings()), daemon=True
+        )
+        self.worker_thread.start()
     
-    def convert_images(self):
-        supported_formats = [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".heic"]
-        
-        folder_path = self.input_folder.get()
-        result_folder = self.output_folder.get()
+    def _conversion_settings(self):
+        """Snapshot isian form untuk worker thread"""
+        return {
+            "folder": self.input_folder.get(),
+            "output": self.output_folder.get(),
+            "merge_folder": self.merge_folder_pdfs.get(),
+            "folder_name": self.folder_custom_name.get().strip(),
+            "merge_files": self.merge_files.get(),
+            "files_name": self.custom_name.get().strip(),
+        }
+    
+    def _run_conversion(self, target, settings):
+        """Jalankan konversi di worker thread; tangani pembatalan"""
+        try:
+            with self.run_log:
+                target(settings)
+        except ConversionCancelled:
+            # Finished PDFs are kept; the one being written was discarded by AtomicOutput
+            self.update_status("⛔ Konversi dibatalkan", self.colors['warning'])
+            self.update_eta("")
+            self.update_progress(0)
+            self._call_in_ui(self._conversion_done, messagebox.showinfo, "Dibatalkan",
+                             "Konversi dibatalkan.\n\nPDF yang sudah selesai tetap tersimpan.")
+        finally:
+            self._call_in_ui(self.cancel_btn.config, state=tk.DISABLED, bg=self.colors['secondary'])
+    
+    def _conversion_done(self, show=None, title="", message="", reset=False):
+        """Akhir konversi (main loop): tombol aktif lagi, tampilkan pesan, lalu reset form jika diminta"""
+        self.is_converting = False
+        self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
+        if show is not None and not self.closing:
+            show(title, message)
+        if reset:
+            self.update_progress(0)
+            self.reset_after_conversion()
+    
+    def cancel_conversion(self):
+        if self.is_converting and self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_btn.config(state=tk.DISABLED, bg=self.colors['secondary'])
+            self.update_status("Membatalkan... menunggu halaman yang sedang diproses", self.colors['warning'])
+    
+    def on_close(self):
+        """Tutup window; konversi yang berjalan dibatalkan dulu supaya tidak ada file setengah jadi"""
+        self.closing = True
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            self.cancel_conversion()
+            self.root.after(100, self.on_close)
+            return
+        self.root.destroy()
+    
+    def convert_images(self, settings=None):
+        settings = settings or self._conversion_settings()
+        folder_path = settings["folder"]
+        result_folder = settings["output"]
         
         # Validate folder path
         if not folder_path or not os.path.exists(folder_path):
             self.update_status("Error: Folder tidak valid!", self.colors['danger'])
-            self.is_converting = False
-            self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
+            self._call_in_ui(self._conversion_done)
             return
         
         try:
@@ -873,244 +5182,290 @@ class ImageToPDFConverter:
             os.makedirs(result_folder_with_date, exist_ok=True)
             
             converted_files = []
-            all_images = []  # For merge mode
             
             # JIKA MERGE DICENTANG - KUMPULKAN SEMUA IMAGE
-            if self.merge_folder_pdfs.get():
+            if settings["merge_folder"]:
                 self.update_status("Mengumpulkan semua gambar...", self.colors['info'])
                 
-                # Kumpulkan semua image dari root folder
+                # Kumpulkan semua path gambar dari root folder dan subfolder
+                all_paths = []
+                archive = is_archive(folder_path)
                 try:
-                    for item_name in os.listdir(folder_path):
+                    for item_name in ([] if archive else os.listdir(folder_path)):
                         item_path = os.path.join(folder_path, item_name)
                         
-                        # File individual di root
-                        if os.path.isfile(item_path) and any(item_name.lower().endswith(ext) for ext in supported_formats):
-                            try:
-                                if item_name.lower().endswith(".heic"):
-                                    img = imageio.imread(item_path)
-                                    img = Image.fromarray(img).convert("RGB")
-                                else:
-                                    img = Image.open(item_path).convert("RGB")
-                                all_images.append(img)
-                                self.update_status(f"Loading: {item_name}", self.colors['info'])
-                            except Exception as e:
-                                self.update_status(f"⚠️ Gagal load: {item_name}", self.colors['warning'])
+                        # File individual di root (gambar atau PDF)
+                        if os.path.isfile(item_path) and (is_supported_image(item_name) or is_pdf(item_name)):
+                            all_paths.append(item_path)
                         
-                        # Gambar dalam subfolder
-                        elif os.path.isdir(item_path):
-                            try:
-                                subfolder_items = sorted(os.listdir(item_path))
-                                for file_name in subfolder_items:
-                                    file_path = os.path.join(item_path, file_name)
-                                    if os.path.isfile(file_path) and any(file_name.lower().endswith(ext) for ext in supported_formats):
-                                        try:
-                                            if file_name.lower().endswith(".heic"):
-                                                img = imageio.imread(file_path)
-                                                img = Image.fromarray(img).convert("RGB")
-                                            else:
-                                                img = Image.open(file_path).convert("RGB")
-                                            all_images.append(img)
-                                            self.update_status(f"Loading: {file_name}", self.colors['info'])
-                                        except:
-                                            pass
-                            except:
-                                pass
+                        # Gambar dan PDF dalam subfolder; folder output run ini bukan input
+                        elif os.path.isdir(item_path) and not os.path.samefile(item_path, result_folder_with_date):
+                            all_paths.extend(list_folder_images(item_path, pdfs=True))
                 except Exception as e:
                     self.update_status(f"Error: {e}", self.colors['danger'])
-                    self.is_converting = False
-                    self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
+                    self._call_in_ui(self._conversion_done)
                     return
                 
-                # SIMPAN SEMUA JADI 1 PDF
-                if all_images:
-                    self.update_status("Menggabungkan semua gambar jadi 1 PDF...", self.colors['info'])
-                    
-                    # Get custom name
-                    custom_name = self.folder_custom_name.get().strip()
-                    if custom_name:
-                        if custom_name.lower().endswith('.pdf'):
-                            custom_name = custom_name[:-4]
-                        custom_name = "".join(c for c in custom_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                        merged_pdf_name = f"{custom_name}.pdf"
-                    else:
-                        merged_pdf_name = f"Merged_All_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                    
-                    merged_pdf_path = os.path.join(result_folder_with_date, merged_pdf_name)
-                    
-                    # Check if file already exists
-                    if os.path.exists(merged_pdf_path):
-                        counter = 1
-                        base_name = os.path.splitext(merged_pdf_name)[0]
-                        while os.path.exists(merged_pdf_path):
-                            merged_pdf_name = f"{base_name}({counter}).pdf"
-                            merged_pdf_path = os.path.join(result_folder_with_date, merged_pdf_name)
-                            counter += 1
-                    
-                    # Save merged PDF
-                    self.update_status("Menyimpan PDF gabungan...", self.colors['info'])
-                    all_images[0].save(
-                        merged_pdf_path,
-                        save_all=True,
-                        append_images=all_images[1:] if len(all_images) > 1 else []
-                    )
-                    
+                # Get custom name
+                custom_name = settings["folder_name"]
+                if custom_name:
+                    if custom_name.lower().endswith('.pdf'):
+                        custom_name = custom_name[:-4]
+                    custom_name = "".join(c for c in custom_name if c.isalnum() or c in (' ', '-', '_')).strip()
+                    merged_pdf_name = f"{custom_name}.pdf"
+                else:
+                    merged_pdf_name = f"Merged_All_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+                
+                # PDFs (e.g. the per-item results of an earlier run) are merged at
+                # the object level, without decoding their images again. Earlier
+                # merged PDFs are skipped, otherwise every re-run would nest the
+                # previous result inside the new one
+                all_paths = [
+                    path for path in all_paths if not (is_pdf(path) and is_merged_output(path, merged_pdf_name))
+                ]
+                if any(is_pdf(path) for path in all_paths) and os.path.isdir(result_folder_with_date) \
+                        and os.path.samefile(result_folder_with_date, folder_path):
+                    # Input is the dated result folder itself: write next to it instead
+                    result_folder_with_date = result_folder
+                
+                # Pre-scan image headers for weighted progress, page count and size
+                # estimate; archive members are only read once, while converting
+                tracker = None if archive else self._start_tracking(path for path in all_paths if not is_pdf(path))
+                sources = iter_archive_images(folder_path) if archive else all_paths
+                
+                # SIMPAN SEMUA JADI 1 PDF (halaman ditulis satu per satu, tidak ditumpuk di memori)
+                self.update_status("Menggabungkan semua gambar jadi 1 PDF...", self.colors['info'])
+                
+                def on_error(path, e):
+                    self.update_status(f"⚠️ Gagal load: {os.path.basename(path)}", self.colors['warning'])
+                    rec.on_error(path, e)
+                    self._advance_progress(tracker, path)
+                
+                if archive:
+                    pages = iter_encoded_pages_parallel(sources, on_error=on_error, cancel=self.cancel_token)
+                else:
+                    pages = iter_input_pages(all_paths, on_error=on_error, cancel=self.cancel_token)
+                pages = self._report_pages(pages, tracker=tracker)
+                # Written atomically; "(n)" is appended if the name is already taken
+                output = AtomicOutput(result_folder_with_date, merged_pdf_name)
+                with self.run_log.output(all_paths) as rec:
+                    # One bookmark per subfolder (or root file / top-level archive directory)
+                    page_count = save_pdf(pages, output, self.cancel_token, object_streams=True, on_page=rec.on_page,
+                                          outline=lambda path: outline_title(path, folder_path), on_error=rec.on_error)
+                    rec.path = output.path
+                
+                # Message, then reset, on the main loop
+                if page_count:
+                    merged_pdf_name = os.path.basename(output.path)
                     self.update_progress(100)
                     self.update_status(f"✓ Semua gambar berhasil digabung jadi 1 PDF!", self.colors['success'])
-                    messagebox.showinfo(
-                        "Success!",
-                        f"Semua gambar berhasil digabung!\n\nFile: {merged_pdf_name}\nJumlah halaman: {len(all_images)}\nLokasi: {result_folder_with_date}"
+                    self._call_in_ui(
+                        self._conversion_done, messagebox.showinfo, "Success!",
+                        f"Semua gambar berhasil digabung!\n\nFile: {merged_pdf_name}\nJumlah halaman: {page_count}\nLokasi: {result_folder_with_date}"
+                        + self._failure_note(),
+                        reset=True
                     )
                 else:
                     self.update_status("⚠️ Tidak ada gambar ditemukan!", self.colors['warning'])
-                    messagebox.showwarning("Warning", "Tidak ada gambar ditemukan di folder")
-                
-                # Reset after merge
-                self.is_converting = False
-                self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
-                self.progress_bar['value'] = 0
-                self.reset_after_conversion()
+                    self._call_in_ui(self._conversion_done, messagebox.showwarning, "Warning",
+                                     "Tidak ada gambar ditemukan di folder", reset=True)
             
             # JIKA MERGE TIDAK DICENTANG - PER FILE INDIVIDUAL
             else:
                 self.update_status("Mengonversi gambar...", self.colors['info'])
-                total_items = 0
-                processed_items = 0
-                items_list = []
                 
-                # Hitung total items
-                try:
-                    for item_name in os.listdir(folder_path):
-                        item_path = os.path.join(folder_path, item_name)
-                        if os.path.isfile(item_path) and any(item_name.lower().endswith(ext) for ext in supported_formats):
-                            total_items += 1
-                            items_list.append(("file", item_name, item_path))
-                        elif os.path.isdir(item_path):
-                            total_items += 1
-                            items_list.append(("folder", item_name, item_path))
-                except Exception as e:
-                    self.update_status(f"Error: {e}", self.colors['danger'])
-                    self.is_converting = False
-                    self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
-                    return
+                if is_archive(folder_path):
+                    # Archive members are streamed, so items run one after another
+                    converted_files = self._convert_archive_items(folder_path, result_folder_with_date)
+                else:
+                    # Hitung total items (setiap item membawa daftar gambarnya)
+                    try:
+                        items_list = list_folder_items(folder_path)
+                        total_items = len(items_list)
+                    except Exception as e:
+                        self.update_status(f"Error: {e}", self.colors['danger'])
+                        self._call_in_ui(self._conversion_done)
+                        return
                 
-                if total_items == 0:
-                    self.update_status("⚠️ Tidak ada gambar di folder ini!", self.colors['warning'])
-                    self.is_converting = False
-                    self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
-                    messagebox.showwarning("Warning", "Folder tidak berisi gambar atau subfolder dengan gambar")
-                    return
+                    if total_items == 0:
+                        self.update_status("⚠️ Tidak ada gambar di folder ini!", self.colors['warning'])
+                        self._call_in_ui(self._conversion_done, messagebox.showwarning, "Warning",
+                                         "Folder tidak berisi gambar atau subfolder dengan gambar")
+                        return
                 
-                # Process individual files
-                for item_type, item_name, item_path in items_list:
-                    
-                    if item_type == "file":
-                        try:
-                            self.update_status(f"Converting: {item_name}", self.colors['info'])
-                            
-                            base_name = os.path.splitext(item_name)[0]
-                            output_pdf_path = os.path.join(result_folder_with_date, f"{base_name}.pdf")
-                            
-                            # Handle duplicate names
-                            counter = 1
-                            while os.path.exists(output_pdf_path):
-                                output_pdf_path = os.path.join(result_folder_with_date, f"{base_name}({counter}).pdf")
-                                counter += 1
-                            
-                            # Convert image
-                            if item_name.lower().endswith(".heic"):
-                                img = imageio.imread(item_path)
-                                img = Image.fromarray(img).convert("RGB")
-                            else:
-                                img = Image.open(item_path).convert("RGB")
-                            
-                            img.save(output_pdf_path)
-                            converted_files.append(output_pdf_path)
-                            
-                            processed_items += 1
-                            progress = (processed_items / total_items) * 100
-                            self.update_progress(progress)
-                            
-                        except Exception as e:
-                            self.update_status(f"Error: {item_name} - {str(e)}", self.colors['danger'])
-                            processed_items += 1
-                    
-                    elif item_type == "folder":
-                        try:
-                            self.update_status(f"Processing folder: {item_name}", self.colors['info'])
-                            
-                            image_list = []
-                            
+                    # Pre-scan headers so progress follows the real work per item
+                    tracker = self._start_tracking(
+                        path for _item_type, _item_name, image_paths in items_list for path in image_paths
+                    )
+                
+                    # Process items in parallel; the governor holds workers back
+                    # whenever the images in flight would exceed the RAM budget.
+                    # Names are reserved first, so which item gets "(n)" does not
+                    # depend on which one finishes first
+                    governor = default_governor()
+                    names = item_pdf_names(items_list)
+                    with encoder_pool(min(governor.max_workers, total_items)) as pool:
+                        futures = {
+                            pool.submit(self._convert_folder_item, item, result_folder_with_date, governor, tracker,
+                                        name): item
+                            for item, name in zip(items_list, names)
+                        }
+                        for future in as_completed(futures):
+                            item_type, item_name, image_paths = futures[future]
                             try:
-                                subfolder_items = sorted(os.listdir(item_path))
-                            except:
-                                processed_items += 1
-                                continue
-                            
-                            for file_name in subfolder_items:
-                                file_path = os.path.join(item_path, file_name)
-                                
-                                if os.path.isfile(file_path) and any(file_name.lower().endswith(ext) for ext in supported_formats):
-                                    try:
-                                        if file_name.lower().endswith(".heic"):
-                                            img = imageio.imread(file_path)
-                                            img = Image.fromarray(img).convert("RGB")
-                                        else:
-                                            img = Image.open(file_path).convert("RGB")
-                                        
-                                        image_list.append(img)
-                                    except:
-                                        pass
-                            
-                            if image_list:
-                                output_pdf_path = os.path.join(result_folder_with_date, f"{item_name}.pdf")
-                                
-                                # Handle duplicate names
-                                counter = 1
-                                while os.path.exists(output_pdf_path):
-                                    output_pdf_path = os.path.join(result_folder_with_date, f"{item_name}({counter}).pdf")
-                                    counter += 1
-                                
-                                image_list[0].save(
-                                    output_pdf_path,
-                                    save_all=True,
-                                    append_images=image_list[1:] if len(image_list) > 1 else []
-                                )
-                                converted_files.append(output_pdf_path)
-                            
-                            processed_items += 1
-                            progress = (processed_items / total_items) * 100
-                            self.update_progress(progress)
-                            
-                        except Exception as e:
-                            self.update_status(f"Error: {item_name} - {str(e)}", self.colors['danger'])
-                            processed_items += 1
+                                output_pdf_path = future.result()
+                                if output_pdf_path:
+                                    converted_files.append(output_pdf_path)
+                            except Exception as e:
+                                self.update_status(f"Error: {item_name} - {str(e)}", self.colors['danger'])
+                                if item_type == "file":
+                                    self._advance_progress(tracker, image_paths[0])
                 
                 # Regular completion message (no merge)
                 self.update_progress(100)
                 self.update_status(f"✓ Conversion complete! {len(converted_files)} PDFs created", self.colors['success'])
-                self.is_converting = False
-                self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
-                
-                messagebox.showinfo(
-                    "Success!", 
+                self._call_in_ui(
+                    self._conversion_done, messagebox.showinfo, "Success!",
                     f"Conversion completed!\n\n{len(converted_files)} PDF files created in:\n{result_folder_with_date}"
+                    + self._failure_note(),
+                    reset=True
                 )
-                self.progress_bar['value'] = 0
-                self.reset_after_conversion()
             
         except Exception as e:
             self.update_status(f"Error: {str(e)}", self.colors['danger'])
-            self.is_converting = False
-            self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
+            self._call_in_ui(self._conversion_done)
+    
+    def _convert_folder_item(self, item, result_folder_with_date, governor, tracker, pdf_name=None):
+        """Convert satu item folder mode (file atau subfolder) jadi 1 PDF; return path PDF
+
+        `pdf_name` dari item_pdf_names; tanpa itu nama diambil dari nama item.
+        """
+        item_type, item_name, image_paths = item
+        # Archive items carry a one-shot member iterator instead of a list
+        sources = image_paths if isinstance(image_paths, list) else ()
+        pdf_name = pdf_name or item_pdf_names([item])[0]
+        
+        if item_type == "file":
+            self.update_status(f"Converting: {item_name}", self.colors['info'])
+            
+            # Convert image (a file left by an earlier run gets a "(n)" suffix)
+            output = AtomicOutput(result_folder_with_date, pdf_name)
+            pages = iter_encoded_pages(image_paths, governor=governor, cancel=self.cancel_token)
+            with self.run_log.output(sources) as rec:
+                save_pdf(self._report_pages(pages, "Converting", tracker), output, self.cancel_token,
+                         on_page=rec.on_page, on_error=rec.on_error)
+                rec.path = output.path
+            return output.path
+        
+        self.update_status(f"Processing folder: {item_name}", self.colors['info'])
+        if not image_paths:
+            return None
+        output = AtomicOutput(result_folder_with_date, pdf_name)
+        
+        def on_error(path, e):
+            rec.on_error(path, e)
+            self._advance_progress(tracker, path)
+        
+        pages = iter_encoded_pages(image_paths, on_error=on_error, governor=governor, cancel=self.cancel_token)
+        pages = self._report_pages(pages, f"{item_name}", tracker)
+        with self.run_log.output(sources) as rec:
+            page_count = save_pdf(pages, output, self.cancel_token, on_page=rec.on_page, on_error=rec.on_error)
+            rec.path = output.path
+        return output.path if page_count else None
+    
+    def _convert_archive_items(self, archive, result_folder_with_date):
+        """Folder mode untuk ZIP/TAR: 1 PDF per direktori top-level / gambar di root"""
+        converted_files = []
+        governor = default_governor()
+        self.update_eta("Arsip dibaca berurutan, tanpa diekstrak")
+        for item in iter_archive_items(archive):
+            check_cancel(self.cancel_token)
+            try:
+                output_pdf_path = self._convert_folder_item(item, result_folder_with_date, governor, None)
+                if output_pdf_path:
+                    converted_files.append(output_pdf_path)
+            except Exception as e:
+                self.update_status(f"Error: {item[1]} - {str(e)}", self.colors['danger'])
+        return converted_files
+    
+    def _start_tracking(self, paths):
+        """Scan header semua gambar lalu buat ProgressTracker"""
+        self.update_status("Memindai header gambar...", self.colors['info'])
+        summary = ScanSummary(scan_images(paths))
+        self.update_status(f"Ditemukan {summary.describe()}", self.colors['info'])
+        self.update_eta(f"0/{summary.pages} halaman • ±{format_bytes(summary.estimated_output_bytes)}")
+        return ProgressTracker(summary)
+    
+    def _advance_progress(self, tracker, path):
+        if tracker is None or is_pdf(path):
+            return  # PDFs are copied, not pre-scanned: they carry no progress weight
+        percent, eta = tracker.advance(path)
+        self.update_progress(percent)
+        self.update_eta(tracker.describe(eta))
+    
+    def _report_pages(self, pages, label="Loading", tracker=None):
+        """Teruskan halaman sambil menampilkan nama file dan progress"""
+        for path, page in pages:
+            self.update_status(f"{label}: {os.path.basename(path)}", self.colors['info'])
+            if tracker is not None:
+                self._advance_progress(tracker, path)
+            yield path, page
     
+    def _failure_note(self):
+        """Catatan jumlah file gagal + lokasi log untuk pesan selesai"""
+        if not self.run_log.failed:
+            return ""
+        note = f"\n\n⚠️ {self.run_log.failed} file gagal dikonversi."
+        if self.run_log.path:
+            note += f" Detail di log:\n{self.run_log.path}"
+        return note
+    
+    # Widgets are only touched by the Tk main loop. The worker thread posts
+    # updates to a queue that _flush_ui drains every UI_REFRESH_MS; only the
+    # newest value per widget is drawn, so thousands of files per second cost
+    # at most one redraw per widget per tick. Anything else (dialogs, button
+    # states, resetting the form) is posted with _call_in_ui and runs, in
+    # order, after those values.
     def update_progress(self, value):
-        self.progress_bar['value'] = value
-        self.root.update_idletasks()
+        self._ui_updates.put(("progress", value))
     
     def update_status(self, text, color="#000000"):
-        self.status_label.config(text=text, fg=color)
-        self.root.update_idletasks()
+        self._ui_updates.put(("status", (text, color)))
+    
+    def update_eta(self, text):
+        self._ui_updates.put(("eta", text))
+    
+    def _call_in_ui(self, callback, *args, **kwargs):
+        """Jalankan callback(*args, **kwargs) di main loop Tk (dari thread mana pun)"""
+        self._ui_updates.put(("call", (callback, args, kwargs)))
+    
+    def _flush_ui(self):
+        """Terapkan update UI yang antre (dijalankan oleh main loop Tk)"""
+        latest = {}
+        calls = []
+        depth = 0
+        while True:
+            try:
+                kind, value = self._ui_updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "call":
+                calls.append(value)
+            else:
+                latest[kind] = value
+            depth += 1
+        if "progress" in latest:
+            self.progress_bar['value'] = latest["progress"]
+        if "status" in latest:
+            text, color = latest["status"]
+            self.status_label.config(text=text, fg=color)
+        if "eta" in latest:
+            self.eta_label.config(text=latest["eta"])
+        self.ui_stats.record(depth, len(latest))
+        self.root.after(UI_REFRESH_MS, self._flush_ui)
+        # After rescheduling: a modal dialog in a call keeps the loop (and this queue) running
+        for callback, args, kwargs in calls:
+            callback(*args, **kwargs)
     
     def reset_after_conversion(self):
         """Reset UI after conversion complete"""
@@ -1125,166 +5480,118 @@ class ImageToPDFConverter:
         self.folder_custom_name_frame.grid_remove()
         
         # Reset file mode
-        self.selected_files = []
-        self.files_listbox.delete(0, tk.END)
-        self.files_label.config(text="0 file dipilih")
+        self._reset_file_list()
         self.merge_files.set(False)
         self.custom_name.set("")
         self.custom_name_frame.grid_remove()
         
         # Reset progress
-        self.progress_bar['value'] = 0
-        self.status_label.config(text="Ready to convert...", fg=self.colors['text_light'])
+        self.update_progress(0)
+        self.update_eta("")
+        self.update_status("Ready to convert...", self.colors['text_light'])
         
         # Reset button
         self.is_converting = False
         self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
     
-    def convert_selected_files(self):
+    def convert_selected_files(self, settings=None):
         """Convert selected individual files"""
-        result_folder = self.output_folder.get()
+        settings = settings or self._conversion_settings()
+        result_folder = settings["output"]
         
         # Create result folder with date
         date_str = datetime.now().strftime("%Y-%m-%d")
         result_folder_with_date = os.path.join(result_folder, date_str)
         os.makedirs(result_folder_with_date, exist_ok=True)
         
-        total_files = len(self.selected_files)
         converted_files = []
+        selected_files = list(self.selected_files)
+        tracker = self._start_tracking(path for path in selected_files if not is_pdf(path))
         
-        if self.merge_files.get():
+        if settings["merge_files"]:
             # Merge all files into 1 PDF
             self.update_status("Menggabungkan semua foto jadi 1 PDF...", self.colors['info'])
             
-            image_list = []
-            for i, file_path in enumerate(self.selected_files):
-                try:
-                    file_name = os.path.basename(file_path)
-                    self.update_status(f"Loading: {file_name}", self.colors['info'])
-                    
-                    if file_name.lower().endswith(".heic") and HEIF_SUPPORTED:
-                        # Prefer Pillow with pillow-heif if available
-                        img = Image.open(file_path).convert("RGB")
-                    else:
-                        # Fallback to PIL for common formats and imageio for HEIC when pillow-heif is unavailable
-                        if file_name.lower().endswith(".heic") and not HEIF_SUPPORTED:
-                            arr = imageio.imread(file_path)
-                            if getattr(arr, "size", 0) == 0:
-                                raise ValueError("Gagal membaca file HEIC (kosong). Coba konversi ke JPG/PNG atau pasang pillow-heif.")
-                            img = Image.fromarray(arr).convert("RGB")
-                        else:
-                            img = Image.open(file_path).convert("RGB")
-                    
-                    image_list.append(img)
-                    
-                    progress = ((i + 1) / total_files) * 80
-                    self.update_progress(progress)
-                    
-                except Exception as e:
-                    self.update_status(f"Error: {file_name} - {e}", self.colors['danger'])
+            custom_name = settings["files_name"]
+            if custom_name:
+                # Remove .pdf extension if user added it
+                if custom_name.lower().endswith('.pdf'):
+                    custom_name = custom_name[:-4]
+                # Clean filename from invalid characters
+                custom_name = "".join(c for c in custom_name if c.isalnum() or c in (' ', '-', '_')).strip()
+                output_pdf_name = f"{custom_name}.pdf"
+            else:
+                output_pdf_name = f"Merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
-            if image_list:
-                # Save as merged PDF
-                custom_name = self.custom_name.get().strip()
-                if custom_name:
-                    # Remove .pdf extension if user added it
-                    if custom_name.lower().endswith('.pdf'):
-                        custom_name = custom_name[:-4]
-                    # Clean filename from invalid characters
-                    custom_name = "".join(c for c in custom_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                    output_pdf_name = f"{custom_name}.pdf"
-                else:
-                    output_pdf_name = f"Merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                
-                output_pdf_path = os.path.join(result_folder_with_date, output_pdf_name)
-                
-                # Check if file already exists
-                if os.path.exists(output_pdf_path):
-                    counter = 1
-                    base_name = os.path.splitext(output_pdf_name)[0]
-                    while os.path.exists(output_pdf_path):
-                        output_pdf_name = f"{base_name}({counter}).pdf"
-                        output_pdf_path = os.path.join(result_folder_with_date, output_pdf_name)
-                        counter += 1
-                    self.update_status(f"⚠️ File sudah ada, disimpan sebagai: {output_pdf_name}", self.colors['warning'])
-                
-                self.update_status("Menyimpan PDF...", self.colors['info'])
-                image_list[0].save(
-                    output_pdf_path,
-                    save_all=True,
-                    append_images=image_list[1:] if len(image_list) > 1 else []
+            def on_error(path, e):
+                self.update_status(f"Error: {os.path.basename(path)} - {e}", self.colors['danger'])
+                rec.on_error(path, e)
+                self._advance_progress(tracker, path)
+            
+            # Pages are written as soon as they are encoded, then published atomically
+            output = AtomicOutput(result_folder_with_date, output_pdf_name)
+            # Selected PDFs are copied at the object level, images encoded in parallel
+            pages = iter_input_pages(selected_files, on_error=on_error, cancel=self.cancel_token)
+            with self.run_log.output(selected_files) as rec:
+                page_count = save_pdf(
+                    self._report_pages(pages, tracker=tracker), output, self.cancel_token,
+                    object_streams=True, on_page=rec.on_page, outline=outline_title, on_error=rec.on_error
                 )
-                converted_files.append(output_pdf_path)
+                rec.path = output.path
+            if page_count:
+                converted_files.append(output.path)
+                if os.path.basename(output.path) != output_pdf_name:
+                    self.update_status(f"⚠️ File sudah ada, disimpan sebagai: {os.path.basename(output.path)}", self.colors['warning'])
             
             self.update_progress(100)
             
         else:
             # Convert each file separately
-            for i, file_path in enumerate(self.selected_files):
+            for file_path in selected_files:
                 try:
                     file_name = os.path.basename(file_path)
                     base_name = os.path.splitext(file_name)[0]
                     
                     self.update_status(f"Converting: {file_name}", self.colors['info'])
                     
-                    output_pdf_path = os.path.join(result_folder_with_date, f"{base_name}.pdf")
-                    
-                    # Handle duplicate names
-                    counter = 1
-                    while os.path.exists(output_pdf_path):
-                        output_pdf_path = os.path.join(result_folder_with_date, f"{base_name}({counter}).pdf")
-                        counter += 1
-                    
-                    # Convert image
-                    if file_name.lower().endswith(".heic") and HEIF_SUPPORTED:
-                        img = Image.open(file_path).convert("RGB")
-                    else:
-                        if file_name.lower().endswith(".heic") and not HEIF_SUPPORTED:
-                            arr = imageio.imread(file_path)
-                            if getattr(arr, "size", 0) == 0:
-                                raise ValueError("Gagal membaca file HEIC (kosong). Coba konversi ke JPG/PNG atau pasang pillow-heif.")
-                            img = Image.fromarray(arr).convert("RGB")
-                        else:
-                            img = Image.open(file_path).convert("RGB")
-                    
-                    img.save(output_pdf_path)
-                    converted_files.append(output_pdf_path)
-                    
-                    progress = ((i + 1) / total_files) * 100
-                    self.update_progress(progress)
+                    # Convert image (duplicate names get a "(n)" suffix)
+                    output = AtomicOutput(result_folder_with_date, f"{base_name}.pdf")
+                    with self.run_log.output([file_path]) as rec:
+                        save_pdf(iter_encoded_pages([file_path], cancel=self.cancel_token), output,
+                                 self.cancel_token, on_page=rec.on_page, on_error=rec.on_error)
+                        rec.path = output.path
+                    converted_files.append(output.path)
                     
                 except Exception as e:
                     self.update_status(f"Error: {file_name} - {e}", self.colors['danger'])
+                self._advance_progress(tracker, file_path)
         
-        # Done
+        # Done: message and form reset run on the main loop
         self.update_progress(100)
         self.update_status(f"✓ Conversion complete! {len(converted_files)} PDF created", self.colors['success'])
-        self.is_converting = False
-        self.convert_btn.config(state=tk.NORMAL, bg=self.colors['success'])
-        self.selected_files = []
-        self.files_listbox.delete(0, tk.END)
-        self.files_label.config(text="0 file dipilih")
-        self.custom_name.set("")
         
-        if self.merge_files.get():
+        if settings["merge_files"]:
             if converted_files:
-                messagebox.showinfo(
-                    "Success!", 
+                self._call_in_ui(
+                    self._conversion_done, messagebox.showinfo, "Success!",
                     f"Semua foto berhasil digabung!\n\nFile: {os.path.basename(converted_files[0])}\nLokasi: {result_folder_with_date}"
+                    + self._failure_note(),
+                    reset=True
                 )
             else:
                 # No output produced (e.g., all inputs failed to load). Inform the user gracefully.
-                messagebox.showwarning(
-                    "Warning",
-                    "Tidak ada foto valid yang berhasil digabung. Pastikan file tidak rusak dan formatnya didukung (PNG/JPG/JPEG/GIF/BMP/TIFF/HEIC)."
+                self._call_in_ui(
+                    self._conversion_done, messagebox.showwarning, "Warning",
+                    "Tidak ada foto valid yang berhasil digabung. Pastikan file tidak rusak dan formatnya didukung (PNG/JPG/JPEG/GIF/BMP/TIFF/HEIC).",
+                    reset=True
                 )
         else:
-            messagebox.showinfo(
-                "Success!", 
+            self._call_in_ui(
+                self._conversion_done, messagebox.showinfo, "Success!",
                 f"Conversion completed!\n\n{len(converted_files)} PDF files created in:\n{result_folder_with_date}"
+                + self._failure_note(),
+                reset=True
             )
-        self.progress_bar['value'] = 0
-        self.reset_after_conversion()
     
     def setup_button_hover_effects(self):
         """Setup hover effects for buttons"""
@@ -1295,6 +5602,8 @@ class ImageToPDFConverter:
         # Only add buttons that exist at initialization
         if hasattr(self, 'folder_select_btn'):
             buttons.append((self.folder_select_btn, self.colors['primary'], self.colors['primary_hover']))
+        if hasattr(self, 'archive_select_btn'):
+            buttons.append((self.archive_select_btn, self.colors['primary'], self.colors['primary_hover']))
         if hasattr(self, 'browse_files_btn'):
             buttons.append((self.browse_files_btn, self.colors['primary'], self.colors['primary_hover']))
         if hasattr(self, 'clear_files_btn'):
@@ -1304,56 +5613,23 @@ class ImageToPDFConverter:
         if hasattr(self, 'change_output_btn'):
             buttons.append((self.change_output_btn, self.colors['secondary'], self.colors['secondary_hover']))
         
+        if hasattr(self, 'cancel_btn'):
+            buttons.append((self.cancel_btn, self.colors['danger'], self.colors['danger_hover']))
+        
         for btn, normal_color, hover_color in buttons:
             btn.bind('<Enter>', lambda e, b=btn, hc=hover_color: b.config(bg=hc) if b['state'] != 'disabled' else None)
             btn.bind('<Leave>', lambda e, b=btn, nc=normal_color: b.config(bg=nc) if b['state'] != 'disabled' else None)
 
 
 if __name__ == "__main__":
-    # Prevent multiple instances (simple PID file lock)
-    import tempfile, atexit, sys
-    LOCK_PATH = os.path.join(tempfile.gettempdir(), "convert_img_pdf.lock")
-    def _cleanup_lock():
-        try:
-            if os.path.exists(LOCK_PATH):
-                os.remove(LOCK_PATH)
-        except Exception:
-            pass
-
-    if os.path.exists(LOCK_PATH):
-        try:
-            with open(LOCK_PATH, "r") as f:
-                pid_str = f.read().strip()
-            pid = int(pid_str) if pid_str.isdigit() else None
-        except Exception:
-            pid = None
-
-        still_running = False
-        if pid:
-            try:
-                os.kill(pid, 0)
-                still_running = True
-            except Exception:
-                still_running = False
-        if still_running:
-            # Show a small notice and exit
-            tk.Tk().withdraw()
-            messagebox.showinfo("Already Running", "Aplikasi sudah berjalan. Tutup aplikasi yang sedang berjalan sebelum membuka yang baru.")
-            sys.exit(0)
-        else:
-            # Stale lock; remove
-            try:
-                os.remove(LOCK_PATH)
-            except Exception:
-                pass
-
-    try:
-        with open(LOCK_PATH, "w") as f:
-            f.write(str(os.getpid()))
-        atexit.register(_cleanup_lock)
-    except Exception:
-        pass
-
+    # Any argument switches to headless CLI mode (e.g. `python init.py foto/ -o - | gzip`)
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    
+    # More instances may run side by side; they share the machine through the
+    # local job scheduler instead of refusing to start
+    job_scheduler()
+    
     root = tk.Tk()
     app = ImageToPDFConverter(root)
     root.mainloop()
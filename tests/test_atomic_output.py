@@ -0,0 +1,109 @@
+import errno
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import init
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _partial(folder, host, pid, age=0):
+    path = folder / f".doc.pdf.{host}.{pid}.abcd{init.PARTIAL_SUFFIX}"
+    path.write_bytes(b"%PDF")
+    if age:
+        old = time.time() - age
+        os.utime(path, (old, old))
+    return path
+
+
+def test_publish_uses_hard_link(tmp_path):
+    with init.AtomicOutput(str(tmp_path), "doc.pdf") as f:
+        f.write(b"%PDF-1.4")
+    assert (tmp_path / "doc.pdf").read_bytes() == b"%PDF-1.4"
+    assert os.listdir(tmp_path) == ["doc.pdf"]
+
+
+def _publish(folder, name):
+    output = init.AtomicOutput(str(folder), name)
+    with output as f:
+        f.write(b"%PDF")
+    return os.path.basename(output.path)
+
+
+def test_taken_names_get_a_flat_counter(tmp_path):
+    names = [_publish(tmp_path, name) for name in ("a.pdf", "a.pdf", "a(1).pdf", "a(1).pdf")]
+    assert names == ["a.pdf", "a(1).pdf", "a(2).pdf", "a(3).pdf"]
+
+
+def test_names_are_reused_after_the_folder_is_emptied(tmp_path):
+    for _ in range(2):
+        _publish(tmp_path, "doc.pdf")
+    for name in os.listdir(tmp_path):
+        os.remove(tmp_path / name)
+    assert _publish(tmp_path, "doc.pdf") == "doc.pdf"
+
+
+def test_link_failure_is_not_a_fallback(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise FileNotFoundError(errno.ENOENT, "gone", src)
+
+    monkeypatch.setattr(init.os, "link", link)
+    with pytest.raises(FileNotFoundError):
+        with init.AtomicOutput(str(tmp_path), "doc.pdf") as f:
+            f.write(b"%PDF-1.4")
+    assert os.listdir(tmp_path) == []
+
+
+def test_fallback_removes_placeholder_when_replace_fails(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise PermissionError(errno.EPERM, "no hard links", src)
+
+    def replace(src, dst):
+        raise FileNotFoundError(errno.ENOENT, "gone", src)
+
+    monkeypatch.setattr(init.os, "link", link)
+    monkeypatch.setattr(init.os, "replace", replace)
+    with pytest.raises(FileNotFoundError):
+        with init.AtomicOutput(str(tmp_path), "doc.pdf") as f:
+            f.write(b"%PDF-1.4")
+    assert os.listdir(tmp_path) == []
+
+
+def test_fallback_publishes_without_hard_links(tmp_path, monkeypatch):
+    def link(src, dst):
+        raise OSError(errno.EOPNOTSUPP, "no hard links", src)
+
+    monkeypatch.setattr(init.os, "link", link)
+    (tmp_path / "doc.pdf").write_bytes(b"old")
+    with init.AtomicOutput(str(tmp_path), "doc.pdf") as output:
+        output.write(b"%PDF-1.4")
+    assert (tmp_path / "doc.pdf").read_bytes() == b"old"
+    assert (tmp_path / "doc(1).pdf").read_bytes() == b"%PDF-1.4"
+
+
+def test_cleanup_keeps_other_hosts_partials(tmp_path):
+    foreign = _partial(tmp_path, "other-node", _dead_pid())
+    init.cleanup_stale_partials(str(tmp_path))
+    assert foreign.exists()
+
+
+def test_cleanup_removes_old_partials_of_other_hosts(tmp_path):
+    foreign = _partial(tmp_path, "other-node", 1, age=init.STALE_PARTIAL_SECONDS + 60)
+    init.cleanup_stale_partials(str(tmp_path))
+    assert not foreign.exists()
+
+
+def test_cleanup_probes_pids_of_this_host(tmp_path):
+    dead = _partial(tmp_path, init.host_tag(), _dead_pid())
+    alive = _partial(tmp_path, init.host_tag(), os.getppid())
+    init.cleanup_stale_partials(str(tmp_path))
+    assert not dead.exists()
+    assert alive.exists()
@@ -0,0 +1,33 @@
+import os
+
+from PIL import Image
+
+import init
+
+
+def _image(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", (20, 10), "red").save(path)
+    return str(path)
+
+
+def test_item_names_are_reserved_in_item_order():
+    items = [
+        ("folder", "a", ["a/1.png"]),
+        ("file", "a.png", ["a.png"]),
+        ("file", "A.jpg", ["A.jpg"]),
+        ("folder", "b", []),
+        ("file", "b.png", ["b.png"]),
+    ]
+    assert init.item_pdf_names(items) == ["a.pdf", "a(1).pdf", "A(2).pdf", None, "b.pdf"]
+
+
+def test_shard_folder_uses_the_same_names(tmp_path):
+    _image(tmp_path / "a.png")
+    _image(tmp_path / "a" / "1.png")
+    (tmp_path / "empty").mkdir()
+    units = init.shard_folder(str(tmp_path), "out")
+    assert [(unit["name"], unit["output"]) for unit in units] == [
+        ("a", os.path.join("out", "a.pdf")),
+        ("a.png", os.path.join("out", "a(1).pdf")),
+    ]
@@ -0,0 +1,44 @@
+import pytest
+from PIL import Image
+
+import init
+
+pillow_heif = pytest.importorskip("pillow_heif")
+
+
+@pytest.fixture
+def heic_files(tmp_path):
+    paths = []
+    for index in range(4):
+        path = tmp_path / f"img{index}.heic"
+        pillow_heif.from_pillow(Image.new("RGB", (64, 48), "red")).save(path, quality=50)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def opened_with(monkeypatch):
+    """DECODE_THREADS yang berlaku setiap kali pillow-heif membuka file"""
+    if not init.heif_supported():
+        pytest.skip("pillow-heif tidak aktif")
+    monkeypatch.setattr(init.os, "cpu_count", lambda: 8)
+    seen = []
+    real_open = pillow_heif.open_heif
+
+    def open_heif(*args, **kwargs):
+        seen.append(pillow_heif.options.DECODE_THREADS)
+        return real_open(*args, **kwargs)
+    monkeypatch.setattr(pillow_heif, "open_heif", open_heif)
+    return seen
+
+
+def test_sequential_decode_uses_all_cores(heic_files, opened_with):
+    pages = list(init.iter_encoded_pages(heic_files))
+    assert len(pages) == len(heic_files)
+    assert opened_with == [8] * len(heic_files)
+
+
+def test_parallel_workers_share_the_cores(heic_files, opened_with):
+    pages = list(init.iter_encoded_pages_parallel(heic_files, workers=4))
+    assert len(pages) == len(heic_files)
+    assert opened_with == [2] * len(heic_files)
@@ -0,0 +1,33 @@
+import io
+
+import pytest
+from PIL import Image, ImageCms
+
+import init
+
+
+@pytest.fixture
+def srgb_profile():
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+
+
+@pytest.mark.parametrize("budget", [None, 1])
+def test_rgba_page_keeps_icc_profile(tmp_path, srgb_profile, budget):
+    path = tmp_path / "alpha.png"
+    Image.new("RGBA", (64, 48), (200, 40, 40, 128)).save(path, icc_profile=srgb_profile)
+    # A tiny memory budget goes through the reduced-decode path
+    governor = init.ResourceGovernor(memory_budget=budget) if budget else None
+    page = init.encode_image_file(str(path), governor)
+    assert page.icc_profile == srgb_profile
+
+    out = io.BytesIO()
+    assert init.write_pdf([(str(path), page)], out) == 1
+    assert b"/ICCBased" in out.getvalue()
+
+
+def test_flatten_keeps_icc_profile(srgb_profile):
+    img = Image.new("RGBA", (4, 4))
+    img.info["icc_profile"] = srgb_profile
+    page = init.flatten_for_page(img)
+    assert page.mode == "RGB"
+    assert page.info["icc_profile"] == srgb_profile
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+from PIL import Image
+
+import init
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def ocr(tmp_path, monkeypatch):
+    """Gambar yang diterima tesseract palsu; OCR aktif dengan cache kosong"""
+    monkeypatch.setattr(init, "OCR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv(init.TESSERACT_ENV, "tesseract")
+    monkeypatch.setattr(init, "_ocr_language", "eng")
+    monkeypatch.setattr(init, "_preprocessing", ("contrast",))
+    received = []
+
+    def run_tesseract(data, language, cancel=None):
+        received.append(Image.open(io.BytesIO(data)))
+        return "level\n5\t1\t1\t1\t1\t1\t2\t3\t4\t5\t90\tword\n"
+    monkeypatch.setattr(init, "_run_tesseract", run_tesseract)
+    return received
+
+
+def test_preprocessed_page_is_not_decoded_again(tmp_path, monkeypatch, ocr):
+    path = tmp_path / "a.png"
+    Image.new("RGB", (40, 30), "gray").save(path)
+    reread = []
+    real_input = init._ocr_input
+    monkeypatch.setattr(init, "_ocr_input", lambda *args: reread.append(args[0]) or real_input(*args))
+    pages = list(init.attach_text_layers(init.iter_encoded_pages([str(path)]), "eng"))
+    assert [page.text_layer for _path, page in pages] == [(40, 30, [[2, 3, 4, 5, "word"]])]
+    assert [(img.format, img.size) for img in ocr] == [("PNG", (40, 30))]
+    assert pages[0][1].ocr_input is None
+    assert reread == []
+
+
+def test_page_without_prepared_input_reads_the_source(tmp_path, ocr):
+    path = tmp_path / "a.bmp"
+    Image.new("RGB", (40, 30), "gray").save(path)
+    assert init.ocr_image(str(path), "eng") == (40, 30, [[2, 3, 4, 5, "word"]])
+    assert [(img.format, img.size) for img in ocr] == [("PNG", (40, 30))]
@@ -0,0 +1,77 @@
+import io
+import re
+
+import pytest
+from PIL import Image
+
+import init
+
+
+def _image(folder, name, color):
+    path = folder / name
+    Image.new("RGB", (40, 30), color).save(path)
+    return str(path)
+
+
+def _pdf(folder, name, *images):
+    path = folder / name
+    pages = init.iter_encoded_pages(list(images))
+    assert init.save_pdf(pages, str(path)) == len(images)
+    return str(path)
+
+
+def _break_image_object(path):
+    """Rusak header objek gambar pertama; page tree tetap terbaca"""
+    data = bytearray(open(path, "rb").read())
+    image = data.index(b"/Subtype /Image")
+    header = re.compile(rb"\d+ 0 obj")
+    start = [m for m in header.finditer(data, 0, image)][-1]
+    data[start.start():start.end()] = b"x" * (start.end() - start.start())
+    open(path, "wb").write(bytes(data))
+
+
+def _page_count(data):
+    return len(re.findall(rb"/Type /Page\b", data))
+
+
+def test_mixed_inputs_import_pdfs_at_object_level(tmp_path):
+    first = _image(tmp_path, "a.png", "red")
+    pdf = _pdf(tmp_path, "b.pdf", _image(tmp_path, "b1.png", "green"), _image(tmp_path, "b2.png", "blue"))
+    pages = list(init.iter_input_pages([first, pdf]))
+    assert [type(page) for _path, page in pages] == [init.EncodedPage, init.ImportedPage, init.ImportedPage]
+
+
+def test_broken_pdf_is_reported_and_skipped(tmp_path):
+    good = _pdf(tmp_path, "good.pdf", _image(tmp_path, "g.png", "green"))
+    broken = _pdf(tmp_path, "broken.pdf", _image(tmp_path, "b1.png", "red"), _image(tmp_path, "b2.png", "blue"))
+    _break_image_object(broken)
+    image = _image(tmp_path, "c.png", "white")
+    errors = []
+    out = io.BytesIO()
+    count = init.write_pdf(init.iter_input_pages([good, broken, image]), out,
+                           on_error=lambda path, e: errors.append((path, e)))
+    assert count == 2
+    assert _page_count(out.getvalue()) == 2
+    # Reported once: the second page of the same file is skipped, not retried
+    assert [(path, type(e)) for path, e in errors] == [(broken, init.PdfImportError)]
+
+
+def test_broken_pdf_without_on_error_raises(tmp_path):
+    broken = _pdf(tmp_path, "broken.pdf", _image(tmp_path, "b.png", "red"))
+    _break_image_object(broken)
+    with pytest.raises(init.PdfImportError):
+        init.write_pdf(init.iter_input_pages([broken]), io.BytesIO())
+
+
+def test_merge_does_not_leave_partial_file(tmp_path):
+    broken = _pdf(tmp_path, "broken.pdf", _image(tmp_path, "b.png", "red"))
+    _break_image_object(broken)
+    image = _image(tmp_path, "c.png", "white")
+    out = tmp_path / "out"
+    out.mkdir()
+    output = init.AtomicOutput(str(out), "merged.pdf")
+    errors = []
+    assert init.save_pdf(init.iter_input_pages([broken, image]), output,
+                         on_error=lambda path, e: errors.append(path)) == 1
+    assert sorted(p.name for p in out.iterdir()) == ["merged.pdf"]
+    assert errors == [broken]
@@ -0,0 +1,104 @@
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import init
+
+HOST_SCRIPT = """
+import sys
+import init
+scheduler = init.JobScheduler(port=int(sys.argv[1]))
+with scheduler._lock:
+    scheduler._connect()
+print("host" if scheduler.is_host else "client", flush=True)
+sys.stdin.read()
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def host_process():
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "-c", HOST_SCRIPT, str(port)], cwd=init.os.path.dirname(init.__file__),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert proc.stdout.readline().strip() == "host"
+        yield port, proc
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _connected(port):
+    scheduler = init.JobScheduler(port=port)
+    with scheduler._lock:
+        scheduler._connect()
+    assert not scheduler.is_host
+    return scheduler
+
+
+def _wait_until(check, seconds=init.SCHEDULER_TIMEOUT_SECONDS + 2):
+    deadline = time.monotonic() + seconds
+    while not check():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_survivors_take_over_when_host_exits(host_process):
+    port, proc = host_process
+    survivors = [_connected(port), _connected(port)]
+    proc.kill()
+    proc.wait()
+    _wait_until(lambda: any(s.is_host for s in survivors) and all(s._sock is not None for s in survivors))
+    assert [s.is_host for s in survivors].count(True) == 1
+    assert not any(s.disabled for s in survivors)
+    for scheduler in survivors:
+        with scheduler.slot():
+            pass
+    assert not any(s.disabled for s in survivors)
+
+
+def test_host_exit_while_waiting_keeps_request(host_process):
+    port, proc = host_process
+    scheduler = _connected(port)
+    with scheduler._lock:
+        scheduler._send(b"A\n")
+        scheduler._waiting += 1
+    proc.kill()
+    proc.wait()
+    # The pending acquire is re-sent to the new host and granted there
+    assert scheduler._await_grant(None)
+    assert scheduler.is_host and not scheduler.disabled
+    with scheduler._lock:
+        scheduler._send(b"R\n")
+
+
+def test_foreign_port_disables_then_rejoins(monkeypatch, capsys):
+    port = _free_port()
+    foreign = socket.socket()
+    foreign.bind(("127.0.0.1", port))
+    foreign.listen(4)
+    monkeypatch.setattr(init, "SCHEDULER_TIMEOUT_SECONDS", 0.3)
+    scheduler = init.JobScheduler(port=port)
+    try:
+        with scheduler._lock:
+            with pytest.raises(init.SchedulerMismatchError):
+                scheduler._connect()
+        with scheduler.slot():
+            pass
+        assert scheduler.disabled
+        assert "dicoba lagi" in capsys.readouterr().err
+    finally:
+        foreign.close()
+    scheduler._retry_at = time.monotonic()
+    with scheduler.slot():
+        pass
+    assert scheduler.is_host and not scheduler.disabled
@@ -0,0 +1,64 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import init
+
+
+def _jpeg(size, quality=90):
+    buf = io.BytesIO()
+    Image.effect_noise(size, 60).convert("RGB").save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("size", [(64, 48), (300, 200)])
+def test_small_valid_jpeg_passes(tmp_path, size):
+    data = _jpeg(size)
+    assert len(data) < init.TAIL_BYTES
+    assert init.validate_image(_write(tmp_path, "ok.jpg", data)) == "JPEG"
+
+
+@pytest.mark.parametrize("size", [(64, 48), (300, 200)])
+def test_small_truncated_jpeg_is_rejected(tmp_path, size):
+    data = _jpeg(size)
+    with pytest.raises(init.InvalidImageError):
+        init.validate_image(_write(tmp_path, "cut.jpg", data[:len(data) // 2]))
+
+
+def test_large_truncated_jpeg_is_rejected(tmp_path):
+    data = _jpeg((1200, 900))
+    assert len(data) > 2 * init.TAIL_BYTES
+    with pytest.raises(init.InvalidImageError):
+        init.validate_image(_write(tmp_path, "cut.jpg", data[:len(data) // 2]))
+
+
+def test_jpeg_with_long_trailer_passes(tmp_path):
+    # Motion photos append a video after EOI
+    data = _jpeg((300, 200)) + os.urandom(4 * init.TAIL_BYTES)
+    assert init.validate_image(_write(tmp_path, "motion.jpg", data)) == "JPEG"
+
+
+def test_png_trailers_are_tolerated(tmp_path):
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(buf, "PNG")
+    png = buf.getvalue()
+    iend = png.rfind(b"IEND") - 4
+    assert init.validate_image(_write(tmp_path, "extra.png", png + b"x" * 200)) == "PNG"
+    assert init.validate_image(_write(tmp_path, "noiend.png", png[:iend])) == "PNG"
+    with pytest.raises(init.InvalidImageError):
+        init.validate_image(_write(tmp_path, "cut.png", png[:iend - 10]))
+
+
+def test_empty_and_unknown_files_are_rejected(tmp_path):
+    with pytest.raises(init.InvalidImageError):
+        init.validate_image(_write(tmp_path, "empty.png", b""))
+    with pytest.raises(init.InvalidImageError):
+        init.validate_image(_write(tmp_path, "text.jpg", b"hello world"))
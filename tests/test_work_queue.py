@@ -0,0 +1,56 @@
+import json
+import os
+
+import init
+
+
+def _queue(tmp_path, count=1):
+    queue = init.WorkQueue(str(tmp_path / "queue"))
+    units = [{"id": f"{index:06d}", "name": f"u{index}", "output": "out.pdf", "sources": []} for index in range(count)]
+    queue.submit(units, {"folder": "in", "output_folder": "out", "options": []})
+    return queue
+
+
+def _lease(queue, claimed_path):
+    with open(os.path.splitext(claimed_path)[0] + ".lease", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_claim_writes_holder_and_shared_clock_time(tmp_path):
+    queue = _queue(tmp_path)
+    _unit, claimed_path = queue.claim("host-a-1")
+    lease = _lease(queue, claimed_path)
+    assert lease["holder"] == "host-a-1"
+    assert lease["renewed"] == os.stat(queue.clock_path).st_mtime
+
+
+def test_local_clock_skew_does_not_expire_leases(tmp_path, monkeypatch):
+    queue = _queue(tmp_path)
+    queue.claim("host-a-1")
+    # The coordinator's clock runs an hour ahead of the file server
+    real_time = init.time.time
+    monkeypatch.setattr(init.time, "time", lambda: real_time() + 3600)
+    assert queue.requeue_expired() == 0
+    assert os.listdir(queue.pending) == []
+
+
+def test_lease_expires_by_the_shared_clock(tmp_path):
+    queue = _queue(tmp_path)
+    _unit, claimed_path = queue.claim("host-a-1")
+    lease_path = os.path.splitext(claimed_path)[0] + ".lease"
+    init._write_json_atomic(lease_path, {"holder": "host-a-1",
+                                         "renewed": queue.shared_clock() - 2 * init.LEASE_SECONDS})
+    assert queue.requeue_expired() == 1
+    assert os.listdir(queue.pending) == ["000000.json"]
+    assert os.listdir(queue.claimed) == []
+
+
+def test_stale_holder_cannot_renew_a_reclaimed_unit(tmp_path):
+    queue = _queue(tmp_path)
+    _unit, claimed_path = queue.claim("host-a-1")
+    queue.release(claimed_path)
+    _unit, claimed_again = queue.claim("host-b-2")
+    assert claimed_again == claimed_path
+    assert not queue.renew(claimed_path, "host-a-1")
+    assert queue.renew(claimed_path, "host-b-2")
+    assert _lease(queue, claimed_path)["holder"] == "host-b-2"